@@ -1,45 +1,252 @@
 # agent_logic.py
-import re
-import json
+import copy
+import threading
 from typing import TypedDict
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
+from langchain_core.runnables import RunnableLambda
 from datetime import datetime
 
-from gemini_chain import run_gemini_chain  # ✅ Imported cleanly
+import gemini_chain
+import metrics
+from gemini_chain import run_gemini_chain, arun_gemini_chain, arun_gemini_chain_batch, today_str  # ✅ Imported cleanly
+from json_extract import extract_first_object, validate_booking
+from parse_cache import ParseCache, make_key
+from rate_limit import RateLimited
+from fast_parser import fast_parse
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+# ✅ Minimum rule-parser confidence needed to skip Gemini
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+# ✅ Same, while Gemini is unavailable; lower it to accept the rules' best guess over a 503
+RULES_FALLBACK_MIN_CONFIDENCE = float(os.getenv("RULES_FALLBACK_MIN_CONFIDENCE", str(FAST_PATH_MIN_CONFIDENCE)))
+# ✅ Max concurrent Gemini calls per batch (gemini_limiter caps all calls process-wide)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
 
 # Define the LangGraph state
 class AgentState(TypedDict):
     input: str
     result: dict
+    route: str
+
+def _confident_fast_parse(user_text):
+    result, confidence = fast_parse(user_text, now=gemini_chain.now())
+    return result if result is not None and confidence >= FAST_PATH_MIN_CONFIDENCE else None
+
+# ⚡ Rule-based fast path; falls through to Gemini when unsure
+def fast_parse_node(state: AgentState) -> AgentState:
+    result = _confident_fast_parse(state["input"])
+    if result is not None:
+        return {"result": result, "route": "fast"}
+    return {"route": "llm"}
 
-# Define LangGraph node
+def route_after_fast_parse(state: AgentState) -> str:
+    return "parse" if state.get("route") == "llm" else END
+
+def _extract_json(output: str) -> AgentState:
+    try:
+        obj = extract_first_object(output)
+        if obj is None:
+            return {"result": {"error": "No JSON found"}}
+        return {"result": validate_booking(obj)}
+    except ValueError as e:
+        return {"result": {"error": f"Invalid response from model: {e}"}}
+
+# 🛟 Gemini is down (or its circuit is open with no fallback model): the rule parser answers
+# if it is at least RULES_FALLBACK_MIN_CONFIDENCE sure. Not cached, so the model answers
+# again once it is back.
+def _rules_fallback(user_text, error):
+    result, confidence = fast_parse(user_text, now=gemini_chain.now())
+    if result is not None and confidence >= RULES_FALLBACK_MIN_CONFIDENCE:
+        print(f"⚠️ Gemini unavailable, answered by the rule parser: {error}")
+        return {"result": result, "route": "rules"}
+    return None
+
+# Define LangGraph node. Rate limiting is not a parse failure: when the rule parser cannot
+# help either, RateLimited propagates so the API can answer 503 (and nothing is cached).
 def parse_node(state: AgentState) -> AgentState:
     user_text = state["input"]
     try:
         output = run_gemini_chain(user_text)
-        json_match = re.search(r"\{.*?\}", output, re.DOTALL)
-        if json_match:
-            return {"result": json.loads(json_match.group())}
-        else:
-            return {"result": {"error": "No JSON found"}}
+        return _extract_json(output)
     except Exception as e:
+        fallback = _rules_fallback(user_text, e)
+        if fallback is not None:
+            return fallback
+        if isinstance(e, RateLimited):
+            raise
+        return {"result": {"error": str(e)}}
+
+# Async twin of parse_node, used when the graph runs via ainvoke/astream.
+# Gemini output is streamed so callers using stream_mode="custom" see it live.
+async def aparse_node(state: AgentState) -> AgentState:
+    user_text = state["input"]
+    writer = get_stream_writer()
+    try:
+        output = await arun_gemini_chain(user_text, on_chunk=lambda chunk: writer({"text": chunk}))
+        return _extract_json(output)
+    except Exception as e:
+        fallback = _rules_fallback(user_text, e)
+        if fallback is not None:
+            return fallback
+        if isinstance(e, RateLimited):
+            raise
         return {"result": {"error": str(e)}}
 
 # Build LangGraph flow
 def build_parser_graph():
     graph = StateGraph(AgentState)
-    graph.add_node("parse", parse_node)
-    graph.set_entry_point("parse")
+    graph.add_node("fast_parse", fast_parse_node)
+    graph.add_node("parse", RunnableLambda(parse_node, afunc=aparse_node))
+    graph.set_entry_point("fast_parse")
+    graph.add_conditional_edges("fast_parse", route_after_fast_parse, {"parse": "parse", END: END})
     graph.set_finish_point("parse")
     return graph.compile()
 
+
+# 🔥 Process-wide runtime: compiled graph + Gemini chain, built once and reused
+class AgentRuntime:
+    def __init__(self):
+        self.graph = build_parser_graph()
+        self.chain = gemini_chain.get_chain()
+        self.llm = gemini_chain.get_llm()
+        self.warmed_at = datetime.now()
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+def warm_up() -> AgentRuntime:
+    """Build the shared runtime once; later calls return the same instance."""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = AgentRuntime()
+    return _runtime
+
+def get_runtime() -> AgentRuntime:
+    return _runtime or warm_up()
+
+def is_ready() -> bool:
+    return _runtime is not None
+
+# 🗃️ Parsed results keyed by (today, normalised input); errors are never cached
+parse_cache = ParseCache()
+
+# 📊 Which path answered each request: parse cache, rule parser, Gemini, or the rule
+# parser standing in for an unavailable Gemini
+parser_stats = {"cache": 0, "fast": 0, "llm": 0, "rules": 0}
+_stats_lock = threading.Lock()
+
+def _count_route(route):
+    with _stats_lock:
+        parser_stats[route] = parser_stats.get(route, 0) + 1
+    metrics.PARSE_ROUTES.labels(route).inc()
+
+metrics.gauge("tailortalk_parse_cache_hit_ratio", "Parse requests answered from the parse cache",
+              lambda: parse_cache.stats()["hit_ratio"])
+
+def get_parser_stats() -> dict:
+    total = sum(parser_stats.values())
+    return {
+        "counts": dict(parser_stats),
+        "hit_ratios": {route: (count / total if total else 0.0) for route, count in parser_stats.items()},
+        "parse_cache": parse_cache.stats(),
+    }
+
+def _cached_parse(key):
+    cached = parse_cache.get(key)
+    if cached is not None:
+        _count_route("cache")
+        return copy.deepcopy(cached)
+    return None
+
+def _store_parse(key, result):
+    _count_route(result.get("route", "llm"))
+    parsed = result.get("result", {"error": "No result returned"})
+    if "error" not in parsed and result.get("route") != "rules":
+        parse_cache.set(key, parsed)
+    return copy.deepcopy(parsed)
+
 # Public function for use in Streamlit or API
 def run_langgraph_agent(user_input: str) -> dict:
-    graph = build_parser_graph()
-    result = graph.invoke({"input": user_input})
-    return result.get("result", {"error": "No result returned"})
+    key = make_key(user_input, today_str())
+    cached = _cached_parse(key)
+    if cached is not None:
+        return cached
+
+    graph = get_runtime().graph
+    with metrics.span("parse"):
+        return _store_parse(key, graph.invoke({"input": user_input}))
+
+# Async variant for the FastAPI pipeline
+async def arun_langgraph_agent(user_input: str) -> dict:
+    key = make_key(user_input, today_str())
+    cached = _cached_parse(key)
+    if cached is not None:
+        return cached
+
+    graph = get_runtime().graph
+    with metrics.span("parse"):
+        return _store_parse(key, await graph.ainvoke({"input": user_input}))
+
+
+# Streaming variant: yields (event, data) as graph stages finish, ending with "parsed"
+async def astream_langgraph_agent(user_input: str):
+    key = make_key(user_input, today_str())
+    cached = _cached_parse(key)
+    if cached is not None:
+        yield "parsed", {**cached, "route": "cache"}
+        return
+
+    graph = get_runtime().graph
+    final = {}
+    with metrics.span("parse"):
+        async for mode, chunk in graph.astream({"input": user_input}, stream_mode=["updates", "custom"]):
+            if mode == "custom":
+                yield "token", chunk
+                continue
+            for node, update in chunk.items():
+                final.update(update or {})
+                yield "stage", {"node": node, "route": final.get("route")}
+    route = final.get("route", "llm")
+    yield "parsed", {**_store_parse(key, final), "route": route}
+
+# Batch variant: cache and rule parser first, then the rest via arun_gemini_chain_batch
+# (concurrent ainvoke calls, at most LLM_MAX_CONCURRENCY at once, each under the Gemini limiter)
+async def arun_langgraph_agent_batch(user_inputs: list) -> list:
+    today = today_str()
+    results = [None] * len(user_inputs)
+    pending = []
+    for i, user_input in enumerate(user_inputs):
+        key = make_key(user_input, today)
+        cached = _cached_parse(key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        fast = _confident_fast_parse(user_input)
+        if fast is not None:
+            results[i] = _store_parse(key, {"result": fast, "route": "fast"})
+            continue
+        pending.append((i, key))
+
+    if pending:
+        get_runtime()
+        outputs = await arun_gemini_chain_batch(
+            [user_inputs[i] for i, _ in pending], max_concurrency=LLM_MAX_CONCURRENCY
+        )
+        for (i, key), output in zip(pending, outputs):
+            state = {"route": "llm"}
+            try:
+                if isinstance(output, Exception):
+                    raise output
+                state.update(_extract_json(output))
+            except Exception as e:
+                state = _rules_fallback(user_inputs[i], e) or {"result": {"error": str(e)}, "route": "llm"}
+            results[i] = _store_parse(key, state)
+    return results
@@ -0,0 +1,122 @@
+# api_client.py
+# Thin HTTP client for the FastAPI backend (main.py), used by the Streamlit UI in API mode.
+# One pooled keep-alive session is shared by every browser session of the UI process.
+
+import os
+import json
+import threading
+
+# ✅ Client settings; leave TAILORTALK_API_URL unset to run the pipeline in-process
+TAILORTALK_API_URL = os.getenv("TAILORTALK_API_URL", "").rstrip("/")
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "16"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "60"))
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _auth(token):
+    # The backend takes the user from this token (see POST /auth/callback); no token = its anonymous user
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def _raise_for_status(response):
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        raise ApiError(response.status_code, detail)
+
+
+class BookingApiClient:
+    def __init__(self, base_url=TAILORTALK_API_URL, pool_size=API_POOL_SIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+        self.session = requests.Session()
+        # Only connection failures are retried; a booking POST is never sent twice
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _url(self, path):
+        return f"{self.base_url}{path}"
+
+    def health(self, token=None):
+        response = self.session.get(self._url("/health"), headers=_auth(token), timeout=self.timeout)
+        _raise_for_status(response)
+        return response.json()
+
+    def auth_url(self, token=None):
+        response = self.session.get(self._url("/auth/url"), headers=_auth(token), timeout=self.timeout)
+        _raise_for_status(response)
+        return response.json()["auth_url"]
+
+    def exchange_code(self, code, state):
+        """Hand the OAuth redirect's code and state to the backend; returns the API token for this user."""
+        response = self.session.post(self._url("/auth/callback"), json={"code": code, "state": state},
+                                     timeout=self.timeout)
+        _raise_for_status(response)
+        return response.json()["token"]
+
+    def stream_booking(self, user_input, token=None, session_id=None):
+        """Yield (event, data) from POST /book/stream until the server sends `done`."""
+        with self.session.post(
+            self._url("/book/stream"),
+            json={"user_input": user_input, "session_id": session_id},
+            headers={"Accept": "text/event-stream", **_auth(token)},
+            stream=True,
+            timeout=self.timeout,
+        ) as response:
+            _raise_for_status(response)
+            event, data = "message", []
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data.append(line[len("data:"):].strip())
+                elif not line and data:
+                    # A blank line ends the event
+                    if event == "done":
+                        return
+                    yield event, json.loads("\n".join(data))
+                    event, data = "message", []
+
+    def book_slot(self, start_time, invitees, description, duration_minutes=30, token=None):
+        response = self.session.post(
+            self._url("/book/slot"),
+            json={"start_time": start_time, "invitees": invitees, "description": description,
+                  "duration_minutes": duration_minutes},
+            headers=_auth(token),
+            timeout=self.timeout,
+        )
+        _raise_for_status(response)
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_api_client():
+    """The shared client, or None when TAILORTALK_API_URL is not set."""
+    global _client
+    if not TAILORTALK_API_URL:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BookingApiClient()
+    return _client
@@ -0,0 +1,56 @@
+# auth_tokens.py
+# Signed tokens for the API: the OAuth `state` that binds a Google callback to the user
+# who started it, and the bearer token the callback hands back for that user's requests.
+
+import os
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+
+# ✅ Token settings; set AUTH_SECRET so tokens survive restarts and work across workers
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+AUTH_TOKEN_TTL = float(os.getenv("AUTH_TOKEN_TTL", str(30 * 24 * 3600)))
+AUTH_STATE_TTL = float(os.getenv("AUTH_STATE_TTL", "600"))  # time allowed to finish the Google consent screen
+
+if not AUTH_SECRET:
+    print("⚠️ AUTH_SECRET not set: API tokens are signed with a per-process key")
+    AUTH_SECRET = secrets.token_hex(32)
+
+
+def _signature(payload):
+    return hmac.new(AUTH_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+def _sign(purpose, user_id, ttl):
+    payload = f"{purpose}|{user_id}|{int(time.time() + ttl)}"
+    encoded = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+    return f"{encoded}.{_signature(payload)}"
+
+def _verify(purpose, token):
+    """The user_id in a valid, unexpired token for `purpose`, else None."""
+    try:
+        encoded, signature = token.split(".")
+        payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode()
+        token_purpose, user_id, expires = payload.split("|")
+        expires = int(expires)
+    except (AttributeError, ValueError):
+        return None
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    if token_purpose != purpose or expires < time.time():
+        return None
+    return user_id
+
+
+def new_state(user_id):
+    return _sign("state", user_id, AUTH_STATE_TTL)
+
+def state_user(state):
+    return _verify("state", state)
+
+def issue_token(user_id):
+    return _sign("token", user_id, AUTH_TOKEN_TTL)
+
+def token_user(token):
+    return _verify("token", token)
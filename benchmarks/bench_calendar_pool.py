@@ -0,0 +1,76 @@
+# benchmarks/bench_calendar_pool.py
+# Before/after: per-call unpickle + discovery build vs the pooled Calendar service.
+#
+#   python benchmarks/bench_calendar_pool.py --calls 200 --threads 8
+
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar import start_fake_calendar, prepare_workdir
+
+
+def legacy_list(endpoint):
+    # What every calendar_utils call used to do
+    from googleapiclient.discovery import build
+
+    with open("token.pkl", "rb") as token_file:
+        creds = pickle.load(token_file)
+    service = build("calendar", "v3", credentials=creds, static_discovery=True,
+                    client_options={"api_endpoint": endpoint})
+    return service.events().list(calendarId="primary").execute()
+
+
+def pooled_list():
+    import calendar_utils
+
+    with calendar_utils.calendar_service() as service:
+        return service.events().list(calendarId="primary").execute()
+
+
+def run(label, fn, calls, threads):
+    latencies = []
+
+    def timed(_):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(timed, range(calls)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<8} {calls / elapsed:8.1f} req/s   p50 {statistics.median(latencies):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    server, endpoint = start_fake_calendar()
+    prepare_workdir()
+    os.environ["CALENDAR_API_ENDPOINT"] = endpoint
+
+    import calendar_utils
+
+    run("before", lambda: legacy_list(endpoint), args.calls, args.threads)
+    run("after", pooled_list, args.calls, args.threads)
+    pool = calendar_utils._service_pool
+    print(f"pool hits {pool.hits}, misses {pool.misses}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
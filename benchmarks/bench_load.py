@@ -0,0 +1,162 @@
+# benchmarks/bench_load.py
+# End-to-end load test of POST /book against a fake Gemini and a fake Calendar.
+# No network or Google/Gemini credentials needed.
+#
+#   python benchmarks/bench_load.py --requests 500 --concurrency 32
+#   python benchmarks/bench_load.py --llm-latency 0.8 --calendar-latency 0.05 --error-rate 0.05
+#   python benchmarks/bench_load.py --json >> load_history.jsonl
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar import FakeCalendar, start_fake_calendar, prepare_workdir
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def summarise(values):
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+    }
+
+def make_inputs(count, fast_ratio, rng):
+    """Unique requests: `fast_ratio` of them plain enough for the rule parser, the rest need the LLM."""
+    inputs = []
+    for i in range(count):
+        day = datetime.now() + timedelta(days=rng.randrange(1, 60))
+        if rng.random() < fast_ratio:
+            hour = rng.randrange(9, 18)
+            inputs.append(f"Book a meeting on {day:%B} {day.day} at {hour}:{rng.choice(('00', '30'))} "
+                          f"with user{i}@example.com")
+        else:
+            inputs.append(f"Find 30 minutes with user{i}@example.com sometime in the afternoon on {day:%B} {day.day}")
+    return inputs
+
+def start_api(app):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}"
+
+async def drive(base_url, inputs, concurrency):
+    import httpx
+
+    latencies, statuses = [], Counter()
+    queue = list(reversed(inputs))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            while queue:
+                user_input = queue.pop()
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/book", json={"user_input": user_input})
+                    status = response.status_code
+                    if status == 200 and not response.json().get("success"):
+                        status = "200 (slot taken)"
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[str(status)] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--fast-ratio", type=float, default=0.5, help="share of requests the rule parser can answer")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--calendar-latency", type=float, default=0.02)
+    parser.add_argument("--calendar-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of Calendar requests that fail")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[429, 500, 503])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print one JSON line for tracking over time")
+    args = parser.parse_args()
+
+    calendar = FakeCalendar(latency=args.calendar_latency, jitter=args.calendar_jitter,
+                            error_rate=args.error_rate, error_statuses=args.error_statuses, seed=args.seed)
+    _, endpoint = start_fake_calendar(calendar)
+    prepare_workdir()
+    os.environ["CALENDAR_API_ENDPOINT"] = endpoint
+    os.environ.setdefault("GEMINI_API_KEY", "offline-bench")
+
+    # Imported only now so they pick up the fake endpoint
+    import gemini_chain
+    import metrics
+    from prometheus_client import REGISTRY
+    from fake_llm import FakeGeminiChat
+
+    llm = FakeGeminiChat(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed)
+    gemini_chain.set_llm(llm)
+    stages = defaultdict(list)
+    metrics.add_span_listener(lambda stage, seconds, _rid: stages[stage].append(seconds))
+
+    import main as api
+
+    server, base_url = start_api(api.app)
+    inputs = make_inputs(args.requests, args.fast_ratio, random.Random(args.seed))
+    elapsed, latencies, statuses = asyncio.run(drive(base_url, inputs, args.concurrency))
+    server.should_exit = True
+
+    report = {
+        "timestamp": time.time(),
+        "config": vars(args),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "elapsed_s": round(elapsed, 2),
+        "statuses": dict(statuses),
+        "end_to_end": summarise(latencies),
+        "stages": {stage: summarise(values) for stage, values in sorted(stages.items())},
+        "llm_calls": llm.calls,
+        "llm_tokens": {kind: int(REGISTRY.get_sample_value("tailortalk_llm_tokens_total", {"kind": kind}) or 0)
+                       for kind in ("input", "output")},
+        "calendar_requests": calendar.request_count,
+        "calendar_injected_errors": {str(k): v for k, v in calendar.injected_errors.items()},
+    }
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}: "
+          f"{report['throughput_rps']} req/s over {report['elapsed_s']} s")
+    print(f"statuses: {report['statuses']}")
+    tokens = report["llm_tokens"]
+    print(f"LLM calls {llm.calls} ({tokens['input']} in / {tokens['output']} out tokens), "
+          f"Calendar requests {calendar.request_count}, "
+          f"injected errors {report['calendar_injected_errors'] or 'none'}")
+    print(f"\n{'stage':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in [("end_to_end", report["end_to_end"])] + list(report["stages"].items()):
+        print(f"{stage:<18}{row['count']:>7}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/bench_parser.py
+# Latency and extraction accuracy of agent_logic.run_langgraph_agent on a golden dataset.
+# Gemini calls are served from a cassette, so runs are reproducible and offline.
+#
+#   GEMINI_API_KEY=... python benchmarks/bench_parser.py --mode record   # once, against real Gemini
+#   python benchmarks/bench_parser.py                                    # replay with recorded latency
+#   python benchmarks/bench_parser.py --latency 0 --json >> parser_history.jsonl
+#   python benchmarks/bench_parser.py --fake-llm                         # fake model, no cassette
+#
+# The committed cassette was recorded with --fake-llm --mode record, so replay runs offline
+# out of the box but its LLM answers are canned; record against Gemini to measure accuracy.
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET = os.path.join(HERE, "data", "golden_parses.jsonl")
+DEFAULT_CASSETTE = os.path.join(HERE, "data", "golden_parses.cassette.jsonl.gz")
+
+
+def load_cases(path):
+    with open(path, encoding="utf-8") as dataset:
+        return [json.loads(line) for line in dataset if line.strip()]
+
+def is_correct(result, expected):
+    if expected.get("error"):
+        return "error" in result
+    if "error" in result:
+        return False
+    return (result["start_time"] == expected["start_time"]
+            and result["end_time"] == expected["end_time"]
+            and sorted(result.get("invitees", [])) == sorted(expected["invitees"]))
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--mode", choices=("replay", "record", "live"), default="replay")
+    parser.add_argument("--latency", default="recorded", help='replay delay: "recorded" or seconds')
+    parser.add_argument("--fake-llm", action="store_true",
+                        help="use benchmarks/fake_llm.py instead of Gemini (exercises the plumbing, not accuracy)")
+    parser.add_argument("--json", action="store_true", help="print one JSON line for tracking over time")
+    parser.add_argument("--verbose", action="store_true", help="print every wrong or unrecorded case")
+    args = parser.parse_args()
+
+    # Replay never reaches Gemini, but building the runtime still wants a key
+    os.environ.setdefault("GEMINI_API_KEY", "offline-bench")
+
+    import agent_logic
+    import gemini_chain
+    import llm_cassette
+    from prometheus_client import REGISTRY
+
+    if args.fake_llm:
+        from fake_llm import FakeGeminiChat
+        gemini_chain.set_llm(FakeGeminiChat(latency=0.2, jitter=0.1, seed=0))
+    cassette = None
+    # The fake model answers for itself; a cassette would replay over it (record still works)
+    if args.mode == "record" or (args.mode == "replay" and not args.fake_llm):
+        cassette = llm_cassette.Cassette(args.cassette, args.mode, args.latency)
+    llm_cassette.set_cassette(cassette)
+    agent_logic.warm_up()
+
+    def tokens(kind):
+        return REGISTRY.get_sample_value("tailortalk_llm_tokens_total", {"kind": kind}) or 0
+
+    rows = []
+    tokens_before = {kind: tokens(kind) for kind in ("input", "output")}
+    for case in load_cases(args.dataset):
+        gemini_chain.freeze_now(datetime.fromisoformat(case["now"]))
+        agent_logic.parse_cache.clear()
+        routes_before = dict(agent_logic.parser_stats)
+        misses_before = cassette.misses if cassette else 0
+
+        started = time.perf_counter()
+        result = agent_logic.run_langgraph_agent(case["input"])
+        elapsed = time.perf_counter() - started
+
+        route = next(r for r, count in agent_logic.parser_stats.items() if count != routes_before.get(r, 0))
+        # Only a model call can miss; a fast-path case may see a late hedged call of the previous one
+        unrecorded = route in ("llm", "rules") and cassette is not None and cassette.misses > misses_before
+        rows.append({"input": case["input"], "route": route, "seconds": elapsed, "result": result,
+                     "expected": case["expected"], "unrecorded": unrecorded,
+                     "correct": not unrecorded and is_correct(result, case["expected"])})
+    gemini_chain.freeze_now(None)
+
+    by_route = defaultdict(list)
+    for row in rows:
+        by_route[row["route"]].append(row)
+    scored = [row for row in rows if not row["unrecorded"]]
+
+    def summary(group):
+        covered = [row for row in group if not row["unrecorded"]]
+        seconds = [row["seconds"] for row in covered]
+        return {
+            "cases": len(group),
+            "unrecorded": len(group) - len(covered),
+            "correct": sum(row["correct"] for row in covered),
+            "accuracy": round(sum(row["correct"] for row in covered) / len(covered), 3) if covered else None,
+            "p50_ms": round(statistics.median(seconds) * 1000, 1) if seconds else None,
+            "p95_ms": round(percentile(seconds, 95) * 1000, 1) if seconds else None,
+        }
+
+    report = {
+        "timestamp": time.time(),
+        "mode": "fake-llm" if args.fake_llm and cassette is None else args.mode,
+        "prompt_id": gemini_chain.prompt_id(),
+        "overall": summary(rows),
+        "routes": {route: summary(group) for route, group in sorted(by_route.items())},
+        "llm_tokens": {kind: int(tokens(kind) - tokens_before[kind]) for kind in ("input", "output")},
+    }
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    overall = report["overall"]
+    print(f"{len(rows)} cases ({report['mode']}, prompt {report['prompt_id']}): "
+          f"{overall['correct']}/{len(scored)} correct"
+          + (f", {overall['unrecorded']} not in the cassette" if overall["unrecorded"] else ""))
+    print(f"LLM tokens: {report['llm_tokens']['input']} in / {report['llm_tokens']['output']} out")
+    print(f"\n{'route':<8}{'cases':>7}{'accuracy':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for route, row in report["routes"].items():
+        accuracy = "-" if row["accuracy"] is None else f"{row['accuracy']:.0%}"
+        print(f"{route:<8}{row['cases']:>7}{accuracy:>10}{row['p50_ms'] or '-':>10}{row['p95_ms'] or '-':>10}")
+    if overall["unrecorded"] and args.mode == "replay":
+        print("\nRecord the missing calls once with a real key: python benchmarks/bench_parser.py --mode record")
+    if args.verbose:
+        for row in rows:
+            if not row["correct"]:
+                label = "NOT RECORDED" if row["unrecorded"] else "WRONG"
+                print(f"\n{label} [{row['route']}] {row['input']}\n  got      {row['result']}\n  expected {row['expected']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/bench_reservations.py
+# Contention test for slot reservations: many concurrent bookings of the same slots
+# (should produce exactly one event per slot) and of distinct slots (should not serialise).
+# Calendar is the in-process fake, so no credentials are needed.
+#
+#   python benchmarks/bench_reservations.py --slots 20 --attempts 8 --calendar-latency 0.05
+#   python benchmarks/bench_reservations.py --json >> reservations_history.jsonl
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_calendar import FakeCalendar, start_fake_calendar, prepare_workdir
+
+
+def slot_starts(day_offset, count):
+    day = (datetime.now() + timedelta(days=day_offset)).replace(hour=9, minute=0, second=0, microsecond=0)
+    return [day + timedelta(minutes=30 * i) for i in range(count)]
+
+async def book_unguarded(start):
+    """The old check-then-insert, with nothing between the two steps."""
+    from calendar_utils import ais_time_slot_free, abook_event_at
+
+    end = start + timedelta(minutes=30)
+    if not await ais_time_slot_free(start.isoformat(), end.isoformat()):
+        return False
+    await abook_event_at(start, 30, "contention bench", [])
+    return True
+
+async def book_reserved(start):
+    from booking_pipeline import abook_at_slot
+
+    return (await abook_at_slot(start, [], "contention bench"))["success"]
+
+async def run_scenario(calendar, book, starts, attempts):
+    """`attempts` concurrent bookings of every slot in `starts`; (seconds, successes, events per slot)."""
+    before = {event_id for events in calendar.events.values() for event_id in events}
+    jobs = [start for start in starts for _ in range(attempts)]
+    random.Random(0).shuffle(jobs)
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(book(start) for start in jobs))
+    elapsed = time.perf_counter() - started
+
+    per_slot = Counter()
+    for events in calendar.events.values():
+        for event_id, event in events.items():
+            if event_id not in before:
+                per_slot[event["start"]["dateTime"][:16]] += 1
+    return elapsed, sum(outcomes), per_slot
+
+def lock_throughput(stripes, threads, seconds, overlap_slots):
+    """reserve/release operations per second from `threads` threads on one manager."""
+    from slot_reservations import ReservationManager
+
+    manager = ReservationManager(stripes=stripes)
+    base = datetime(2030, 1, 1, 9).timestamp()
+    done = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def worker(n):
+        rng = random.Random(n)
+        while time.perf_counter() < stop:
+            start = base + 1800 * rng.randrange(overlap_slots)
+            reservation = manager.reserve("bench", start, start + 1800)
+            if reservation is not None:
+                reservation.release()
+            done[n] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return round(sum(done) / seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slots", type=int, default=20, help="distinct slots contended for")
+    parser.add_argument("--attempts", type=int, default=8, help="concurrent bookings per slot")
+    parser.add_argument("--calendar-latency", type=float, default=0.05)
+    parser.add_argument("--calendar-jitter", type=float, default=0.02)
+    parser.add_argument("--lock-threads", type=int, default=8)
+    parser.add_argument("--lock-seconds", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true", help="print one JSON line for tracking over time")
+    args = parser.parse_args()
+
+    calendar = FakeCalendar(latency=args.calendar_latency, jitter=args.calendar_jitter, seed=0)
+    _, endpoint = start_fake_calendar(calendar)
+    prepare_workdir()
+    os.environ["CALENDAR_API_ENDPOINT"] = endpoint
+    os.environ.setdefault("GEMINI_API_KEY", "offline-bench")
+    import booking_pipeline  # noqa: F401  (imported up front so import time is not measured)
+
+    scenarios = {}
+    day = 1
+    for name, book in (("unguarded", book_unguarded), ("reserved", book_reserved)):
+        for kind, attempts in (("contended", args.attempts), ("distinct", 1)):
+            starts = slot_starts(day, args.slots)
+            day += 1
+            elapsed, successes, per_slot = asyncio.run(run_scenario(calendar, book, starts, attempts))
+            scenarios[f"{name}/{kind}"] = {
+                "bookings": len(starts) * attempts,
+                "seconds": round(elapsed, 3),
+                "successes": successes,
+                "events": sum(per_slot.values()),
+                "double_booked_slots": sum(1 for count in per_slot.values() if count > 1),
+            }
+
+    report = {
+        "timestamp": time.time(),
+        "config": vars(args),
+        "scenarios": scenarios,
+        "lock_ops_per_s": {
+            f"{stripes}_stripes": lock_throughput(stripes, args.lock_threads, args.lock_seconds, args.slots)
+            for stripes in (1, 64)
+        },
+    }
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f"{args.slots} slots x {args.attempts} concurrent attempts, Calendar latency {args.calendar_latency}s\n")
+    print(f"{'scenario':<22}{'bookings':>9}{'seconds':>9}{'success':>9}{'events':>8}{'double':>8}")
+    for name, row in scenarios.items():
+        print(f"{name:<22}{row['bookings']:>9}{row['seconds']:>9}{row['successes']:>9}"
+              f"{row['events']:>8}{row['double_booked_slots']:>8}")
+    print("\nreserve+release ops/s: " + ", ".join(f"{k} {v}" for k, v in report["lock_ops_per_s"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_slot_finder.py
+# Common free-slot search for many attendees over a multi-week window.
+#
+#   python benchmarks/bench_slot_finder.py --attendees 50 --days 14
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slot_finder import find_common_slots
+
+
+def random_busy(window_start, days, events_per_day, rng):
+    spans = []
+    for day in range(days):
+        for _ in range(events_per_day):
+            start = window_start + timedelta(days=day, minutes=rng.randrange(0, 24 * 60, 15))
+            spans.append((start, start + timedelta(minutes=rng.choice((15, 30, 60, 90)))))
+    return spans
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attendees", type=int, default=50)
+    parser.add_argument("--days", type=int, default=14)
+    # Events land anywhere in the day; at 2 per attendee, 50 attendees cover every 30-minute workday slot
+    parser.add_argument("--events-per-day", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    window_start = datetime(2025, 7, 7, tzinfo=timezone.utc)
+    window_end = window_start + timedelta(days=args.days)
+    busy = {f"user{i}@example.com": random_busy(window_start, args.days, args.events_per_day, rng)
+            for i in range(args.attendees)}
+
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        slots = find_common_slots(busy, window_start, window_end, duration_minutes=30, top_k=3,
+                                  tz="Asia/Kolkata")
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    spans = sum(len(v) for v in busy.values())
+    print(f"{args.attendees} attendees, {args.days} days, {spans} busy spans")
+    print(f"p50 {statistics.median(timings):.2f} ms   p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms")
+    for start, end in slots:
+        print(f"  {start:%a %d %b %H:%M} - {end:%H:%M}")
+    if not slots:
+        print("  no common free slot in the window")
+
+
+if __name__ == "__main__":
+    main()
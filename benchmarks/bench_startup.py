@@ -0,0 +1,91 @@
+# benchmarks/bench_startup.py
+# Cold-start import cost of the app modules, measured with `python -X importtime`.
+#
+#   python benchmarks/bench_startup.py --runs 5
+#   python benchmarks/bench_startup.py --json >> startup_history.jsonl
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["calendar_utils", "gemini_chain", "agent_logic", "main"]
+
+
+def measure(module):
+    """One fresh interpreter: (wall ms, total import ms, {package: cumulative import ms})."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.setdefault("GEMINI_API_KEY", "startup-bench")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    # Children are printed before their parent; the indent gives the nesting depth
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1000))
+
+    packages = defaultdict(float)
+    total = 0.0
+    for i, (depth, name, cumulative) in enumerate(entries):
+        if depth == 0:
+            total += cumulative
+            continue
+        parent = next((n for d, n, _ in entries[i + 1:] if d < depth), "")
+        root = name.split(".")[0]
+        # Charge each package once, where something outside it first pulled it in
+        if parent.split(".")[0] != root and root != module:
+            packages[root] += cumulative
+    return wall, total, dict(packages)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--json", action="store_true", help="print one JSON line for tracking over time")
+    args = parser.parse_args()
+
+    report = {"timestamp": time.time(), "python": sys.version.split()[0], "modules": {}}
+    for module in args.modules:
+        walls, imports, packages = [], [], defaultdict(list)
+        for _ in range(args.runs):
+            wall, total, by_package = measure(module)
+            walls.append(wall)
+            imports.append(total)
+            for name, ms in by_package.items():
+                packages[name].append(ms)
+        top = sorted(((name, statistics.median(v)) for name, v in packages.items()),
+                     key=lambda item: item[1], reverse=True)[:args.top]
+        report["modules"][module] = {
+            "wall_ms": round(statistics.median(walls), 1),
+            "import_ms": round(statistics.median(imports), 1),
+            "top": {name: round(ms, 1) for name, ms in top},
+        }
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    for module, result in report["modules"].items():
+        print(f"{module}: wall {result['wall_ms']:.0f} ms, imports {result['import_ms']:.0f} ms")
+        for name, ms in result["top"].items():
+            print(f"  {name:<28} {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# benchmarks/fake_calendar.py
+# In-process stand-in for the Google Calendar v3 REST API, for offline benchmarks.
+
+import json
+import email
+import os
+import pickle
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+EVENTS_PATH = re.compile(r"/calendars/(?P<calendar_id>[^/]+)/events/?$")
+EVENT_PATH = re.compile(r"/calendars/(?P<calendar_id>[^/]+)/events/(?P<event_id>[^/]+)$")
+FREEBUSY_PATH = re.compile(r"/freeBusy/?$")
+BATCH_PATH = re.compile(r"^/batch/")
+
+
+def _parse_time(value, tz=None):
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo:
+        return parsed
+    # Like the real API, naive event times are read in the event's timeZone
+    return parsed.replace(tzinfo=ZoneInfo(tz)) if tz else parsed.astimezone()
+
+
+def _event_bounds(event):
+    start, end = event["start"], event["end"]
+    return (_parse_time(start.get("dateTime") or start["date"], start.get("timeZone")),
+            _parse_time(end.get("dateTime") or end["date"], end.get("timeZone")))
+
+
+class FakeCalendar:
+    """
+    latency/jitter (seconds) delay every response; error_rate of requests fail with a
+    status picked from error_statuses (429s carry a Retry-After header, like the real API).
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_statuses=(429, 500, 503), seed=None):
+        self.events = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.injected_errors = {}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self._rng = random.Random(seed)
+        self._seq = 0
+
+    def delay_and_fault(self):
+        """Sleep for the configured latency; return an HTTP status to fail with, or None."""
+        with self.lock:
+            self.request_count += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            status = self._rng.choice(self.error_statuses) if self._rng.random() < self.error_rate else None
+            if status is not None:
+                self.injected_errors[status] = self.injected_errors.get(status, 0) + 1
+        if delay > 0:
+            time.sleep(delay)
+        return status
+
+    def list_events(self, calendar_id, params):
+        with self.lock:
+            events = list(self.events.get(calendar_id, {}).values())
+            seq = self._seq
+        if "syncToken" in params:
+            since = int(params["syncToken"])
+            events = [e for e in events if e["_seq"] > since]
+        if "timeMin" in params:
+            time_min = _parse_time(params["timeMin"])
+            events = [e for e in events if _event_bounds(e)[1] > time_min]
+        if "timeMax" in params:
+            time_max = _parse_time(params["timeMax"])
+            events = [e for e in events if _event_bounds(e)[0] < time_max]
+        if params.get("showDeleted") != "true":
+            events = [e for e in events if e["status"] != "cancelled"]
+        return {"kind": "calendar#events", "items": events, "nextSyncToken": str(seq)}
+
+    def freebusy(self, body):
+        time_min, time_max = _parse_time(body["timeMin"]), _parse_time(body["timeMax"])
+        calendars = {}
+        for item in body.get("items", []):
+            with self.lock:
+                events = list(self.events.get(item["id"], {}).values())
+            busy = []
+            for event in events:
+                start, end = _event_bounds(event)
+                if event["status"] != "cancelled" and start < time_max and end > time_min:
+                    busy.append({"start": start.isoformat(), "end": end.isoformat()})
+            calendars[item["id"]] = {"busy": sorted(busy, key=lambda span: span["start"])}
+        return {"kind": "calendar#freeBusy", "calendars": calendars}
+
+    def get_event(self, calendar_id, event_id):
+        with self.lock:
+            return self.events.get(calendar_id, {}).get(event_id)
+
+    def insert_event(self, calendar_id, body):
+        """The new event, or None when the client-supplied id is taken (the API answers 409)."""
+        event = dict(body)
+        event.setdefault("id", uuid.uuid4().hex)
+        event["status"] = "confirmed"
+        event["htmlLink"] = f"https://calendar.example.test/event?eid={event['id']}"
+        with self.lock:
+            if event["id"] in self.events.get(calendar_id, {}):
+                return None
+            self._seq += 1
+            event["_seq"] = self._seq
+            self.events.setdefault(calendar_id, {})[event["id"]] = event
+        return event
+
+
+_DUPLICATE = {"error": {"code": 409, "message": "The requested identifier already exists."}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # otherwise small keep-alive responses wait on delayed ACKs (~40 ms)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _injected_fault(self):
+        status = self.server.calendar.delay_and_fault()
+        if status is None:
+            return False
+        if self.command == "POST":
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        reason = "Rate Limit Exceeded" if status == 429 else "Backend Error"
+        headers = {"Retry-After": "1"} if status == 429 else None
+        self._send_json(status, {"error": {"code": status, "message": reason}}, headers)
+        return True
+
+    def do_GET(self):
+        calendar = self.server.calendar
+        if self._injected_fault():
+            return
+        url = urlparse(self.path)
+        single = EVENT_PATH.search(url.path)
+        if single:
+            event = calendar.get_event(single["calendar_id"], single["event_id"])
+            if event is None:
+                return self._send_json(404, {"error": {"code": 404, "message": "Not Found"}})
+            return self._send_json(200, event)
+        match = EVENTS_PATH.search(url.path)
+        if not match:
+            return self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self._send_json(200, calendar.list_events(match["calendar_id"], params))
+
+    def _handle_batch(self):
+        # multipart/mixed of application/http parts, as sent by BatchHttpRequest
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self.rfile.read(length)
+        boundary = uuid.uuid4().hex
+        parts = []
+        for part in email.message_from_bytes(raw).get_payload():
+            head, _, body = part.get_payload().partition("\r\n\r\n") if "\r\n\r\n" in part.get_payload() else part.get_payload().partition("\n\n")
+            method, path = head.split()[0], head.split()[1]
+            match = EVENTS_PATH.search(urlparse(path).path)
+            if method == "POST" and match:
+                status, payload = "200 OK", self.server.calendar.insert_event(match["calendar_id"], json.loads(body or "{}"))
+                if payload is None:
+                    status, payload = "409 Conflict", _DUPLICATE
+            else:
+                status, payload = "404 Not Found", {"error": {"code": 404, "message": "Not found"}}
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        body = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        calendar = self.server.calendar
+        if self._injected_fault():
+            return
+        url = urlparse(self.path)
+        if BATCH_PATH.search(url.path):
+            return self._handle_batch()
+        body = self._read_json()
+        if FREEBUSY_PATH.search(url.path):
+            return self._send_json(200, calendar.freebusy(body))
+        match = EVENTS_PATH.search(url.path)
+        if not match:
+            return self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+        event = calendar.insert_event(match["calendar_id"], body)
+        if event is None:
+            return self._send_json(409, _DUPLICATE)
+        self._send_json(200, event)
+
+
+def start_fake_calendar(calendar=None, host="127.0.0.1", port=0):
+    """Serve a FakeCalendar in a daemon thread; returns (server, endpoint URL)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.calendar = calendar or FakeCalendar()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://{host}:{server.server_address[1]}/calendar/v3/"
+    return server, endpoint
+
+
+def prepare_workdir():
+    """chdir into a temp dir holding a fake token.pkl and Streamlit secrets."""
+    from google.oauth2.credentials import Credentials
+
+    workdir = tempfile.mkdtemp(prefix="tailortalk-bench-")
+    os.chdir(workdir)
+    with open("token.pkl", "wb") as token_file:
+        pickle.dump(Credentials(token="fake-token"), token_file)
+    os.makedirs(".streamlit", exist_ok=True)
+    with open(os.path.join(".streamlit", "secrets.toml"), "w") as secrets:
+        secrets.write("GOOGLE_CREDENTIALS_JSON = '{\"web\": {}}'\n")
+    return workdir
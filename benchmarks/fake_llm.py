@@ -0,0 +1,108 @@
+# benchmarks/fake_llm.py
+# Offline stand-in for the Gemini chat model: canned booking JSON with configurable latency.
+#
+#   gemini_chain.set_llm(FakeGeminiChat(latency=0.4, jitter=0.2))
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+
+class FakeGeminiChat(BaseChatModel):
+    """
+    Answers every prompt with a booking for a random 30-minute slot in the next
+    `horizon_days`, inviting whatever emails the user message contains. `latency` plus
+    up to `jitter` seconds is spread over `chunks` streamed pieces.
+    """
+
+    latency: float = 0.3
+    jitter: float = 0.1
+    chunks: int = 4
+    horizon_days: int = 30
+    seed: Optional[int] = None
+    calls: int = 0
+
+    _rng: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _plan(self, messages):
+        """(response text, per-chunk delay, prompt token estimate) for one call."""
+        user_text = str(messages[-1].content)
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            day = (datetime.now() + timedelta(days=self._rng.randrange(1, self.horizon_days + 1))).replace(
+                hour=0, minute=0, second=0, microsecond=0)
+            start = day + timedelta(minutes=30 * self._rng.randrange(18, 36))  # 09:00-17:30
+        booking = {
+            "start_time": start.strftime("%Y-%m-%dT%H:%M:%S"),
+            "end_time": (start + timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "invitees": EMAIL_RE.findall(user_text),
+        }
+        text = "```json\n" + json.dumps(booking, indent=2) + "\n```"
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return text, delay / max(self.chunks, 1), prompt_tokens
+
+    def _pieces(self, text):
+        size = max(1, -(-len(text) // max(self.chunks, 1)))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    @staticmethod
+    def _usage(input_tokens, text):
+        # Like Gemini, streamed chunks carry their own share of the usage
+        output_tokens = max(1, len(text) // 4)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, step, prompt_tokens = self._plan(messages)
+        time.sleep(step * self.chunks)
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt_tokens, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, step, prompt_tokens = self._plan(messages)
+        await asyncio.sleep(step * self.chunks)
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt_tokens, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, step, prompt_tokens = self._plan(messages)
+        pieces = self._pieces(text)
+        for i, piece in enumerate(pieces):
+            time.sleep(step)
+            usage = self._usage(prompt_tokens if i == 0 else 0, piece)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, step, prompt_tokens = self._plan(messages)
+        pieces = self._pieces(text)
+        for i, piece in enumerate(pieces):
+            await asyncio.sleep(step)
+            usage = self._usage(prompt_tokens if i == 0 else 0, piece)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
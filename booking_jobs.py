@@ -0,0 +1,316 @@
+# booking_jobs.py
+# Queued bookings: POST /bookings stores a job and returns at once; a pool of worker
+# threads runs the parse and Calendar steps, and GET /bookings/{id} reports progress.
+# Jobs live in memory, or in SQLite (JOB_BACKEND=sqlite) so they survive restarts.
+
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+
+import metrics
+from booking_pipeline import book_from_text, booked_event, ParseError, IdempotencyConflict
+from rate_limit import RateLimited
+
+# ✅ Queue settings
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory").lower()  # memory | sqlite
+JOB_DB = os.getenv("JOB_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+# Finished jobs are kept this long (seconds) for polling
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+# A job "running" for longer than this is assumed lost with its worker and is run again
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class QueueFull(Exception):
+    """More jobs are waiting than JOB_QUEUE_SIZE allows."""
+
+
+def _new_job(user_input, user_id, idempotency_key):
+    return {
+        "id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "user_input": user_input,
+        "idempotency_key": idempotency_key,
+        "status": QUEUED,
+        "result": None,
+        "error": None,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+class MemoryJobStore:
+    def __init__(self):
+        self._jobs = {}
+        self._keys = {}  # (user_id, idempotency_key) -> job id
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        """Stores `job`, or returns the existing job with the same idempotency key."""
+        with self._lock:
+            key = (job["user_id"], job["idempotency_key"])
+            if job["idempotency_key"] and key in self._keys:
+                return dict(self._jobs[self._keys[key]])
+            self._jobs[job["id"]] = dict(job)
+            if job["idempotency_key"]:
+                self._keys[key] = job["id"]
+            return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def find(self, user_id, idempotency_key):
+        with self._lock:
+            job_id = self._keys.get((user_id, idempotency_key))
+            return dict(self._jobs[job_id]) if job_id else None
+
+    def claim(self, job_id):
+        """queued → running; False if another worker got there first."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != QUEUED:
+                return False
+            job.update(status=RUNNING, started_at=time.time())
+            return True
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._jobs[job_id].update(status=status, result=result, error=error, finished_at=time.time())
+
+    def recoverable(self, stale_before):
+        """Ids of queued jobs, and of running jobs started before `stale_before` (reset to queued)."""
+        with self._lock:
+            ids = []
+            for job in sorted(self._jobs.values(), key=lambda j: j["created_at"]):
+                if job["status"] == RUNNING and job["started_at"] < stale_before:
+                    job["status"] = QUEUED
+                if job["status"] == QUEUED:
+                    ids.append(job["id"])
+            return ids
+
+    def purge(self, finished_before):
+        with self._lock:
+            old = [job for job in self._jobs.values()
+                   if job["status"] in FINISHED and job["finished_at"] < finished_before]
+            for job in old:
+                del self._jobs[job["id"]]
+                self._keys.pop((job["user_id"], job["idempotency_key"]), None)
+            return len(old)
+
+
+class SqliteJobStore:
+    def __init__(self, db_path=JOB_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, user_input TEXT NOT NULL, idempotency_key TEXT, "
+                "status TEXT NOT NULL, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS jobs_by_key ON jobs (user_id, idempotency_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["error"] = json.loads(job["error"]) if job["error"] else None
+        return job
+
+    def create(self, job):
+        with self._connect() as conn:
+            # NULL keys never collide, so only keyed jobs are de-duplicated
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, user_id, user_input, idempotency_key, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job["id"], job["user_id"], job["user_input"], job["idempotency_key"], job["status"], job["created_at"]),
+            )
+        if job["idempotency_key"]:
+            return self.find(job["user_id"], job["idempotency_key"])
+        return dict(job)
+
+    def get(self, job_id):
+        return self._row(self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def find(self, user_id, idempotency_key):
+        return self._row(self._connect().execute(
+            "SELECT * FROM jobs WHERE user_id = ? AND idempotency_key = ?", (user_id, idempotency_key),
+        ).fetchone())
+
+    def claim(self, job_id):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None,
+                 json.dumps(error) if error is not None else None, time.time(), job_id),
+            )
+
+    def recoverable(self, stale_before):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ? WHERE status = ? AND started_at < ?",
+                         (QUEUED, RUNNING, stale_before))
+            rows = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, finished_before):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (*FINISHED, finished_before),
+            )
+        return cursor.rowcount
+
+
+class BookingQueue:
+    """
+    A bounded in-process queue of job ids in front of `workers` threads. The store is the
+    source of truth: on start, and whenever a worker is idle, queued jobs and stale running
+    jobs are picked up again, and `claim` makes sure each job runs in one worker only.
+    Each job's Calendar event is named after the job id: a job interrupted mid-booking
+    first looks for that event (`lookup`), and a second insert cannot add another.
+    """
+
+    def __init__(self, store, workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE, handler=book_from_text,
+                 lookup=booked_event):
+        self.store = store
+        self.workers = workers
+        self.handler = handler
+        self.lookup = lookup
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._submitted = 0
+
+    def start(self):
+        if self._threads:
+            return
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"booking-job-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.store.purge(time.time() - JOB_RETENTION)
+        self._recover()
+
+    def stop(self, timeout=5):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _recover(self):
+        for job_id in self.store.recoverable(time.time() - JOB_STALE_SECONDS):
+            try:
+                self._queue.put_nowait(job_id)
+            except queue.Full:
+                break  # the rest are picked up on a later idle pass
+
+    def submit(self, user_input, user_id, idempotency_key=None):
+        # A retry gets its existing job back, even while the queue is full
+        job = self.store.find(user_id, idempotency_key) if idempotency_key else None
+        if job is None:
+            if self._queue.full():
+                raise QueueFull(f"{self._queue.maxsize} bookings are already waiting")
+            job = self.store.create(_new_job(user_input, user_id, idempotency_key))
+            if job["status"] == QUEUED:
+                try:
+                    self._queue.put_nowait(job["id"])
+                except queue.Full:
+                    pass  # stored as queued; an idle worker recovers it
+        if job["user_input"] != user_input:
+            raise IdempotencyConflict("This idempotency key was already used for a different request")
+        self._submitted += 1
+        if self._submitted % 100 == 0:
+            self.store.purge(time.time() - JOB_RETENTION)
+        return job
+
+    def get(self, job_id, user_id):
+        """The job, or None when it does not exist or belongs to another user."""
+        job = self.store.get(job_id)
+        return job if job is not None and job["user_id"] == user_id else None
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=30)
+            except queue.Empty:
+                self._recover()
+                continue
+            if job_id is None:
+                return
+            # Read before claiming: a start time means an earlier worker was lost mid-job
+            job = self.store.get(job_id)
+            if job is not None and self.store.claim(job_id):
+                self._run(job, resumed=job["started_at"] is not None)
+
+    def _run(self, job, resumed=False):
+        token = metrics.request_id.set(job["id"])
+        try:
+            with metrics.span("booking_job"):
+                result = self.lookup(job["id"], job["user_id"]) if resumed else None
+                if result is None:
+                    result = self.handler(job["user_input"], job["user_id"], event_id=job["id"])
+            self.store.finish(job["id"], SUCCEEDED, result=result)
+        except ParseError as e:
+            self.store.finish(job["id"], FAILED, error={"status": 400, "detail": str(e)})
+        except RateLimited as e:
+            self.store.finish(job["id"], FAILED, error={"status": 503, "detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            print(f"❌ Booking job {job['id']} failed: {e}")
+            self.store.finish(job["id"], FAILED, error={"status": 500, "detail": str(e)})
+        finally:
+            metrics.request_id.reset(token)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_booking_queue() -> BookingQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                store = SqliteJobStore() if JOB_BACKEND == "sqlite" else MemoryJobStore()
+                _queue = BookingQueue(store)
+    return _queue
+
+def set_booking_queue(booking_queue):
+    global _queue
+    _queue = booking_queue
+
+
+metrics.gauge("tailortalk_booking_queue_depth", "Booking jobs waiting for a worker",
+              lambda: get_booking_queue().depth() if _queue is not None else 0)
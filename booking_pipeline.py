@@ -0,0 +1,234 @@
+# booking_pipeline.py
+# Parse → availability check → insert, shared by the API endpoints.
+# The check and the insert run under a slot reservation (slot_reservations.py), so two
+# overlapping requests cannot both see "free" and both insert.
+
+from datetime import timedelta
+
+from dateutil.parser import isoparse
+
+from agent_logic import run_langgraph_agent, arun_langgraph_agent, arun_langgraph_agent_batch, astream_langgraph_agent
+from conversation import run_conversation_turn, arun_conversation_turn, record_booked
+from calendar_utils import (
+    is_time_slot_free, book_event_at, get_event, ais_time_slot_free, abook_event_at,
+    acheck_slots, abook_events_batch, asuggest_slots,
+)
+from credential_store import DEFAULT_USER
+from gemini_chain import today_str
+from parse_cache import normalise
+from single_flight import SingleFlight, IdempotencyConflict
+from slot_reservations import reserve_slot, get_reservation_manager
+
+MEETING_MINUTES = 30
+
+
+class ParseError(Exception):
+    """The request could not be turned into a start/end time."""
+
+
+def _booking_fields(parsed):
+    if "error" in parsed:
+        raise ParseError(parsed["error"])
+    return isoparse(parsed["start_time"]), isoparse(parsed["end_time"]), parsed.get("invitees", [])
+
+def _minutes(start, end):
+    """The parsed meeting length; a follow-up that moves the start keeps it."""
+    return int((end - start).total_seconds() // 60)
+
+def _slot_taken():
+    return {"success": False, "message": "Time slot is already booked. Try another."}
+
+def _slot_in_progress():
+    return {"success": False, "message": "Another booking for this time is in progress. Try another."}
+
+def _booked(result):
+    return {
+        "success": True,
+        "message": "Meeting booked successfully!",
+        "start_time": result["start"],
+        "end_time": result["end"],
+        "calendar_link": result["link"],
+    }
+
+# 💬 In a conversation, the event an earlier turn booked stays on the calendar; say so
+# rather than let "make it 4pm instead" look like a move
+def _booked_in_session(result, user_id, session_id):
+    response = _booked(result)
+    if session_id is None:
+        return response
+    previous = record_booked(session_id, user_id, {
+        key: response[key] for key in ("start_time", "end_time", "calendar_link")
+    })
+    if previous:
+        response["message"] += (f" The meeting booked earlier in this conversation ({previous['start_time']})"
+                                " is still on your calendar.")
+        response["previous_booking"] = previous
+    return response
+
+# 💬 With a session_id the input is a conversation turn (conversation.py): follow-ups like
+# "make it 4pm instead" keep the earlier fields, and the first turn's text stays the description
+def _parse(user_input, user_id, session_id):
+    if session_id is None:
+        return run_langgraph_agent(user_input)
+    return run_conversation_turn(user_input, session_id, user_id)
+
+async def _aparse(user_input, user_id, session_id):
+    if session_id is None:
+        return await arun_langgraph_agent(user_input)
+    return await arun_conversation_turn(user_input, session_id, user_id)
+
+# `event_id` names the Calendar event, so a repeated run cannot insert it twice (booking_jobs.py)
+def book_from_text(user_input: str, user_id: str = DEFAULT_USER, session_id: str = None, event_id: str = None) -> dict:
+    parsed = _parse(user_input, user_id, session_id)
+    start, end, invitees = _booking_fields(parsed)
+    with reserve_slot(user_id, start, end) as reservation:
+        if reservation is None:
+            return _slot_in_progress()
+        if not is_time_slot_free(start.isoformat(), end.isoformat(), user_id=user_id):
+            return _slot_taken()
+        result = book_event_at(start, _minutes(start, end), parsed.get("description", user_input), invitees,
+                               user_id=user_id, event_id=event_id)
+        reservation.confirm()
+    return _booked_in_session(result, user_id, session_id)
+
+def booked_event(event_id: str, user_id: str = DEFAULT_USER):
+    """The booked result for an event made by book_from_text(event_id=...), or None."""
+    event = get_event(event_id, user_id)
+    if event is None:
+        return None
+    return _booked({"start": event["start"].get("dateTime"), "end": event["end"].get("dateTime"), "link": event.get("htmlLink")})
+
+async def abook_from_text(user_input: str, user_id: str = DEFAULT_USER, session_id: str = None) -> dict:
+    parsed = await _aparse(user_input, user_id, session_id)
+    start, end, invitees = _booking_fields(parsed)
+    return await _abook_reserved(start, end, invitees, parsed.get("description", user_input), user_id, session_id)
+
+async def _abook_reserved(start, end, invitees, description, user_id, session_id=None):
+    """Availability check and insert under a reservation, so overlapping requests cannot both insert."""
+    with reserve_slot(user_id, start, end) as reservation:
+        if reservation is None:
+            return _slot_in_progress()
+        if not await ais_time_slot_free(start.isoformat(), end.isoformat(), user_id=user_id):
+            return _slot_taken()
+        result = await abook_event_at(start, _minutes(start, end), description, invitees, user_id=user_id)
+        reservation.confirm()
+    return _booked_in_session(result, user_id, session_id)
+
+
+# 🔁 Duplicate suppression for /book: identical requests in flight share one parse and
+# one insert; with an Idempotency-Key the result is also replayed to later retries
+_booking_flights = SingleFlight("book")
+
+async def abook_from_text_once(user_input: str, user_id: str = DEFAULT_USER, idempotency_key: str = None,
+                               session_id: str = None) -> dict:
+    # What the request says, not when it arrived: a retry after midnight still matches its key.
+    # The same words mean different things in different conversations.
+    fingerprint = f"{user_id}|{session_id or ''}|{normalise(user_input)}"
+    if idempotency_key:
+        key = f"{user_id}|key|{idempotency_key}"
+    else:
+        # Without a key only in-flight duplicates are shared, and "tomorrow" changes at midnight
+        key = f"{user_id}|text|{today_str()}|{fingerprint}"
+    return await _booking_flights.run(
+        key, lambda: abook_from_text(user_input, user_id, session_id),
+        fingerprint=fingerprint, remember=bool(idempotency_key),
+    )
+
+def get_booking_flight_stats() -> dict:
+    return {**_booking_flights.stats, "stored": len(_booking_flights.results)}
+
+
+# ⏱ Book a given start time (e.g. a suggested alternate); nothing to parse
+async def abook_at_slot(start, invitees: list, description: str, user_id: str = DEFAULT_USER,
+                       minutes: int = MEETING_MINUTES) -> dict:
+    end = start + timedelta(minutes=minutes)
+    return await _abook_reserved(start, end, invitees, description, user_id)
+
+
+# 📡 Streaming booking: yields (event, data) as each stage finishes
+async def astream_booking(user_input: str, user_id: str = DEFAULT_USER, session_id: str = None):
+    parsed = None
+    if session_id is not None:
+        # Follow-ups are small edits, so the turn is not streamed token by token
+        yield "stage", {"node": "conversation"}
+        parsed = await arun_conversation_turn(user_input, session_id, user_id)
+    else:
+        async for event, data in astream_langgraph_agent(user_input):
+            if event == "parsed":
+                parsed = data
+            else:
+                yield event, data
+
+    try:
+        start, end, invitees = _booking_fields(parsed)
+    except ParseError as e:
+        yield "error", {"status": 400, "detail": str(e)}
+        return
+    yield "parsed", parsed
+
+    with reserve_slot(user_id, start, end) as reservation:
+        free = reservation is not None and await ais_time_slot_free(start.isoformat(), end.isoformat(), user_id=user_id)
+        if not free:
+            alternates = await asuggest_slots(start, _minutes(start, end), invitees, user_id=user_id)
+            yield "availability", {
+                "free": False,
+                "alternates": [slot_start.isoformat() for slot_start, _ in alternates],
+            }
+            yield "result", _slot_taken() if reservation is not None else _slot_in_progress()
+            return
+        yield "availability", {"free": True, "alternates": []}
+
+        result = await abook_event_at(start, _minutes(start, end), parsed.get("description", user_input), invitees, user_id=user_id)
+        reservation.confirm()
+    yield "result", _booked_in_session(result, user_id, session_id)
+
+# 📦 Bulk booking: one parse stage, one free/busy query and batched inserts
+async def abook_batch(user_inputs: list, user_id: str = DEFAULT_USER) -> list:
+    results = [None] * len(user_inputs)
+    candidates = []  # (index, start, end, invitees)
+
+    for i, parsed in enumerate(await arun_langgraph_agent_batch(user_inputs)):
+        try:
+            start, end, invitees = _booking_fields(parsed)
+        except Exception as e:
+            results[i] = {"success": False, "message": f"Could not understand request: {e}"}
+            continue
+        candidates.append((i, start, end, invitees))
+
+    # Items earlier in the batch win when two of them overlap
+    reserved = []  # (index, start, end, invitees, reservation)
+    for i, start, end, invitees in candidates:
+        clash = next((j for j, s, e, _, _ in reserved if s < end and e > start), None)
+        if clash is not None:
+            results[i] = {"success": False, "message": f"Overlaps item {clash} in this batch."}
+            continue
+        reservation = get_reservation_manager().reserve(user_id, start, end)
+        if reservation is None:
+            results[i] = _slot_in_progress()
+            continue
+        reserved.append((i, start, end, invitees, reservation))
+
+    try:
+        free = await acheck_slots([(start, end) for _, start, end, _, _ in reserved], user_id=user_id)
+        accepted = []
+        for item, is_free in zip(reserved, free):
+            if is_free:
+                accepted.append(item)
+            else:
+                results[item[0]] = _slot_taken()
+
+        booked = await abook_events_batch(
+            [(start, _minutes(start, end), user_inputs[i], invitees) for i, start, end, invitees, _ in accepted],
+            user_id=user_id,
+        )
+        for (i, _, _, _, reservation), result in zip(accepted, booked):
+            if "error" in result:
+                results[i] = {"success": False, "message": f"Booking failed: {result['error']}"}
+            else:
+                reservation.confirm()
+                results[i] = _booked(result)
+    finally:
+        for _, _, _, _, reservation in reserved:
+            if not reservation.confirmed:
+                reservation.release()
+    return results
@@ -0,0 +1,201 @@
+# busy_index.py
+# In-memory free/busy index per calendar, kept current with Calendar incremental sync.
+
+import os
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from dateutil.parser import isoparse
+
+import metrics
+from credential_store import DEFAULT_USER
+
+# ✅ Max age (seconds) of the index before a check re-syncs; 0 disables the index
+BUSY_INDEX_MAX_STALENESS = float(os.getenv("BUSY_INDEX_MAX_STALENESS", "30"))
+# ✅ How far back the initial full sync reaches
+BUSY_INDEX_LOOKBACK_DAYS = int(os.getenv("BUSY_INDEX_LOOKBACK_DAYS", "1"))
+# Same setting as calendar_utils (which imports this module); used until Calendar reports the zone
+CALENDAR_TIMEZONE = os.getenv("CALENDAR_TIMEZONE", "Asia/Kolkata")
+
+
+def _to_timestamp(value, time_zone=None):
+    # dateTime values carry an offset; naive ones, like all-day `date` values, are wall-clock
+    # times in `time_zone` (the event's or calendar's), never the server's local time
+    if isinstance(value, str):
+        value = isoparse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=ZoneInfo(time_zone or CALENDAR_TIMEZONE))
+    return value.astimezone(timezone.utc).timestamp()
+
+def _event_span(event, time_zone=None):
+    if event.get("status") == "cancelled":
+        return None
+    start, end = event.get("start", {}), event.get("end", {})
+    start_value = start.get("dateTime") or start.get("date")
+    end_value = end.get("dateTime") or end.get("date")
+    if not start_value or not end_value:
+        return None
+    return (_to_timestamp(start_value, start.get("timeZone") or time_zone),
+            _to_timestamp(end_value, end.get("timeZone") or time_zone))
+
+
+class BusyIndex:
+    def __init__(self, calendar_id):
+        self.calendar_id = calendar_id
+        self.time_zone = None  # the calendar's zone, from events().list; all-day events use it
+        self.sync_token = None
+        self.window_start = None
+        self.last_sync = None
+        self._spans = {}
+        self._merged_starts = []
+        self._merged_ends = []
+        self._dirty = False
+        self._recorded = None  # events written through while a sync is fetching
+        self._lock = threading.Lock()  # guards the index data, never held across network I/O
+        self._sync_lock = threading.Lock()  # one sync at a time
+
+    def age(self):
+        return float("inf") if self.last_sync is None else time.monotonic() - self.last_sync
+
+    # 🔄 Full sync on first use (or after a 410), incremental syncToken sync afterwards.
+    # With `max_age`, callers that waited for another thread's sync skip their own once the
+    # index is fresh again; returns whether this call synced.
+    def sync(self, service, max_age=None):
+        from googleapiclient.errors import HttpError
+
+        with self._sync_lock:
+            if max_age is not None and self.age() <= max_age:
+                return False
+            with self._lock:
+                self._recorded = []
+            try:
+                if self.sync_token:
+                    try:
+                        events, sync_token, time_zone = self._fetch(service, {"syncToken": self.sync_token})
+                        self._swap(events, sync_token, time_zone, reset=False)
+                        return True
+                    except HttpError as e:
+                        if e.resp.status != 410:
+                            raise
+                        print("🔄 Sync token expired, running a full sync.")
+                window_start = datetime.now(timezone.utc) - timedelta(days=BUSY_INDEX_LOOKBACK_DAYS)
+                events, sync_token, time_zone = self._fetch(service, {"timeMin": window_start.isoformat()})
+                self._swap(events, sync_token, time_zone, reset=True, window_start=window_start.timestamp())
+                return True
+            finally:
+                with self._lock:
+                    self._recorded = None
+
+    def _fetch(self, service, params):
+        """Every event page for `params`, the next sync token and the calendar's time zone.
+        Runs without the data lock."""
+        from calendar_utils import _execute  # calendar_utils imports this module
+
+        events, page_token = [], None
+        while True:
+            response = _execute(service.events().list(
+                calendarId=self.calendar_id,
+                singleEvents=True,
+                showDeleted=True,
+                pageToken=page_token,
+                **params
+            ))
+            events.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return events, response.get("nextSyncToken"), response.get("timeZone")
+
+    def _swap(self, events, sync_token, time_zone, reset, window_start=None):
+        with self._lock:
+            self.time_zone = time_zone or self.time_zone
+            spans = {} if reset else self._spans
+            # Our own inserts during the fetch may be missing from it, so they go on top
+            for event in events + self._recorded:
+                self._apply(spans, event)
+            self._spans = spans
+            self._dirty = True
+            # Without a sync token the next refresh simply falls back to a full sync
+            self.sync_token = sync_token
+            if window_start is not None:
+                self.window_start = window_start
+            self.last_sync = time.monotonic()
+
+    def _apply(self, spans, event):
+        span = _event_span(event, self.time_zone)
+        if span is None:
+            spans.pop(event.get("id"), None)
+        else:
+            spans[event.get("id")] = span
+
+    # ✍️ Write-through for events we create ourselves
+    def record(self, event):
+        with self._lock:
+            self._apply(self._spans, event)
+            self._dirty = True
+            if self._recorded is not None:
+                self._recorded.append(event)
+
+    def _rebuild(self):
+        starts, ends = [], []
+        for start, end in sorted(self._spans.values()):
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._merged_starts, self._merged_ends = starts, ends
+        self._dirty = False
+
+    def is_free(self, start, end):
+        """True/False from memory, or None when the range is outside the synced window."""
+        start_ts, end_ts = _to_timestamp(start), _to_timestamp(end)
+        with self._lock:
+            if self.last_sync is None or self.window_start is None or start_ts < self.window_start:
+                return None
+            if self._dirty:
+                self._rebuild()
+            # Merged spans are disjoint, so only the span starting right before end_ts can overlap
+            i = bisect.bisect_left(self._merged_starts, end_ts) - 1
+            return i < 0 or self._merged_ends[i] <= start_ts
+
+
+_indexes = {}  # (owner, calendar_id) -> BusyIndex; "primary" differs per user
+_indexes_lock = threading.Lock()
+stats = {"hits": 0, "fallbacks": 0, "syncs": 0}
+
+def get_index(calendar_id="primary", owner=DEFAULT_USER):
+    with _indexes_lock:
+        key = (owner, calendar_id)
+        if key not in _indexes:
+            _indexes[key] = BusyIndex(calendar_id)
+        return _indexes[key]
+
+def lookup(service, start, end, calendar_id="primary", owner=DEFAULT_USER):
+    """Answer from the index, or None so the caller does a live check."""
+    if BUSY_INDEX_MAX_STALENESS <= 0:
+        return None
+    index = get_index(calendar_id, owner)
+    if index.age() > BUSY_INDEX_MAX_STALENESS:
+        try:
+            with metrics.span("busy_index_sync"):
+                synced = index.sync(service, max_age=BUSY_INDEX_MAX_STALENESS)
+            if synced:
+                stats["syncs"] += 1
+        except Exception as e:
+            print(f"❌ Busy index sync failed, using a live check: {e}")
+            stats["fallbacks"] += 1
+            return None
+    free = index.is_free(start, end)
+    stats["hits" if free is not None else "fallbacks"] += 1
+    return free
+
+metrics.gauge("tailortalk_busy_index_hit_ratio", "Availability checks answered from the busy index",
+              lambda: metrics.hit_ratio(stats["hits"], stats["fallbacks"]))
+
+def record_event(event, calendar_id="primary", owner=DEFAULT_USER):
+    if BUSY_INDEX_MAX_STALENESS > 0:
+        get_index(calendar_id, owner).record(event)
@@ -1,165 +1,517 @@
 import os
-import pickle
+import sys
 import json
-import streamlit as st
+import queue
+import asyncio
+import functools
+import contextvars
+import urllib.parse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from tempfile import NamedTemporaryFile
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
-from googleapiclient.errors import HttpError
 from dateutil.parser import isoparse
 from datetime import timezone, datetime, timedelta
+from zoneinfo import ZoneInfo
 
-# ✅ Load REDIRECT_URI and SCOPES from Streamlit secrets or fallback to .env
-REDIRECT_URI = st.secrets.get("GOOGLE_REDIRECT_URI") or os.getenv("GOOGLE_REDIRECT_URI")
-SCOPES = [st.secrets.get("SCOPES") or os.getenv("SCOPES")]
+import busy_index
+import metrics
+from credential_store import get_store, DEFAULT_USER
+from metrics import timed
+from rate_limit import AdaptiveLimiter, RateLimited
 
-# ✅ Write credentials JSON from secrets to a temp file
-with NamedTemporaryFile(delete=False, suffix=".json") as tmp:
-    tmp.write(st.secrets["GOOGLE_CREDENTIALS_JSON"].encode())
-    CLIENT_SECRETS_FILE = tmp.name
+# 💤 streamlit, googleapiclient, google_auth_oauthlib and numpy are imported on first
+# use, so importing this module (and cold-starting the API) stays cheap.
 
-# ✅ Step 1: Auth URL
-def get_auth_url():
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI
+# ✅ Settings come from Streamlit secrets inside the Streamlit app, else from .env
+def _secret(name):
+    if "streamlit" in sys.modules:
+        import streamlit as st
+        try:
+            value = st.secrets.get(name)
+        except Exception:
+            value = None
+        if value:
+            return value
+    return os.getenv(name)
+
+@functools.lru_cache(maxsize=None)
+def _oauth_settings():
+    return _secret("GOOGLE_REDIRECT_URI"), [_secret("SCOPES")]
+
+# ✅ Calendar client tuning (override the endpoint to point at a local fake Calendar)
+CALENDAR_API_ENDPOINT = os.getenv("CALENDAR_API_ENDPOINT")
+CALENDAR_HTTP_TIMEOUT = float(os.getenv("CALENDAR_HTTP_TIMEOUT", "30"))
+CALENDAR_MAX_CONCURRENCY = int(os.getenv("CALENDAR_MAX_CONCURRENCY", "32"))
+# One idle service per Calendar worker thread, so a full executor does not build new clients
+CALENDAR_POOL_SIZE = int(os.getenv("CALENDAR_POOL_SIZE", str(CALENDAR_MAX_CONCURRENCY)))
+CALENDAR_BATCH_LIMIT = 50  # max requests per Calendar batch call
+
+# 🚦 Calendar quota: requests per minute across users (0 = no bucket), and the latency
+# above which a call counts as a sign of overload. Concurrency starts at CALENDAR_MAX_CONCURRENCY.
+CALENDAR_RPM = float(os.getenv("CALENDAR_RPM", "0"))
+CALENDAR_LATENCY_TARGET = float(os.getenv("CALENDAR_LATENCY_TARGET", "5"))
+
+calendar_limiter = AdaptiveLimiter(
+    "calendar",
+    rate=CALENDAR_RPM / 60,
+    burst=max(1.0, CALENDAR_RPM / 10),
+    max_concurrency=CALENDAR_MAX_CONCURRENCY,
+    latency_target=CALENDAR_LATENCY_TARGET,
+)
+
+def _execute(request):
+    """Every Calendar API request goes through the limiter; a persistent 429 raises RateLimited."""
+    return calendar_limiter.call(request.execute)
+
+# ✅ Scheduling defaults for slot suggestions
+CALENDAR_TIMEZONE = os.getenv("CALENDAR_TIMEZONE", "Asia/Kolkata")
+WORKDAY_START_HOUR = int(os.getenv("WORKDAY_START_HOUR", "9"))
+WORKDAY_END_HOUR = int(os.getenv("WORKDAY_END_HOUR", "18"))
+SUGGESTION_WINDOW_DAYS = int(os.getenv("SUGGESTION_WINDOW_DAYS", "14"))
+
+# ✅ Write credentials JSON from secrets to a temp file (once, when OAuth is first needed)
+@functools.lru_cache(maxsize=None)
+def _client_secrets_file():
+    client_json = _secret("GOOGLE_CREDENTIALS_JSON")
+    if not client_json:
+        raise Exception("❌ GOOGLE_CREDENTIALS_JSON not found in Streamlit secrets or environment variables.")
+    with NamedTemporaryFile(delete=False, suffix=".json") as tmp:
+        tmp.write(client_json.encode())
+        return tmp.name
+
+def _oauth_flow():
+    from google_auth_oauthlib.flow import Flow
+
+    redirect_uri, scopes = _oauth_settings()
+    return Flow.from_client_secrets_file(
+        _client_secrets_file(),
+        scopes=scopes,
+        redirect_uri=redirect_uri
     )
-    auth_url, _ = flow.authorization_url(prompt='consent')
+
+# ✅ Step 1: Auth URL
+def get_auth_url(state=None):
+    flow = _oauth_flow()
+    auth_url, _ = flow.authorization_url(prompt='consent', state=state)
     return auth_url
 
 # ✅ Step 2: Exchange code for token
-def exchange_code_for_token(code):
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI
-    )
+def exchange_code_for_token(code, user_id=DEFAULT_USER):
+    flow = _oauth_flow()
     flow.fetch_token(code=code)
     credentials = flow.credentials
-    with open("token.pkl", "wb") as token_file:
-        pickle.dump(credentials, token_file)
+    get_store().put(user_id, credentials)
     return credentials
 
-# ✅ Step 3: Load credentials
-def load_credentials():
-    if os.path.exists("token.pkl"):
-        with open("token.pkl", "rb") as token_file:
-            credentials = pickle.load(token_file)
+# ✅ Step 3: Load credentials (per user, from the credential store's in-memory cache)
+def load_credentials(user_id=DEFAULT_USER):
+    return get_store().get_fresh(user_id)
+
+# ✅ Step 4: Build Calendar service from the bundled (offline) discovery document
+_discovery_doc = None
+
+def _get_discovery_doc():
+    global _discovery_doc
+    if _discovery_doc is None:
+        from googleapiclient.discovery_cache import get_static_doc
+        _discovery_doc = get_static_doc("calendar", "v3")
+    return _discovery_doc
 
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-            with open("token.pkl", "wb") as token_file:
-                pickle.dump(credentials, token_file)
+def _build_service(creds):
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build_from_document
 
-        return credentials
-    return None
+    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT))
+    client_options = {"api_endpoint": CALENDAR_API_ENDPOINT} if CALENDAR_API_ENDPOINT else None
+    return build_from_document(_get_discovery_doc(), http=http, client_options=client_options)
 
-# ✅ Step 4: Build Calendar service
-def get_calendar_service():
-    creds = load_credentials()
+def get_calendar_service(user_id=DEFAULT_USER):
+    creds = load_credentials(user_id)
     if creds:
-        return build("calendar", "v3", credentials=creds)
+        return _build_service(creds)
     else:
         print("❌ Warning: Calendar service not available (no credentials)")
         return None
 
+# ♻️ Pool of authorised services: each checkout gets its own keep-alive httplib2
+# connection, so concurrent threads never share one.
+class CalendarServicePool:
+    def __init__(self, max_idle=CALENDAR_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle = {}  # user_id -> LifoQueue of (credentials, service)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _queue(self, user_id):
+        with self._lock:
+            return self._idle.setdefault(user_id, queue.LifoQueue())
+
+    def checkout(self, user_id=DEFAULT_USER):
+        """Return (credentials, service), or (None, None) when the user is not authenticated."""
+        creds = load_credentials(user_id)
+        if creds is None:
+            return None, None
+        idle = self._queue(user_id)
+        while True:
+            try:
+                idle_creds, service = idle.get_nowait()
+            except queue.Empty:
+                self.misses += 1
+                return creds, _build_service(creds)
+            # Services bound to credentials that were since refreshed or replaced are dropped
+            if idle_creds is creds:
+                self.hits += 1
+                return creds, service
+
+    def checkin(self, user_id, creds, service):
+        idle = self._queue(user_id)
+        if service is not None and idle.qsize() < self.max_idle:
+            idle.put((creds, service))
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
+
+_service_pool = CalendarServicePool()
+metrics.gauge("tailortalk_calendar_pool_hit_ratio", "Calendar service checkouts served from the pool",
+              lambda: metrics.hit_ratio(_service_pool.hits, _service_pool.misses))
+
+@contextmanager
+def calendar_service(user_id=DEFAULT_USER):
+    creds, service = _service_pool.checkout(user_id)
+    try:
+        yield service
+    finally:
+        _service_pool.checkin(user_id, creds, service)
+
 # ✅ Helper to check if authenticated
-def is_authenticated():
-    return os.path.exists("token.pkl")
+def is_authenticated(user_id=DEFAULT_USER):
+    return get_store().has(user_id)
 
-# ✅ List events
-def list_events():
-    service = get_calendar_service()
-    if service is None:
-        print("❌ Calendar service not available. Cannot list events.")
-        return []
+# 🩺 Cheap health check: credentials present and a service can be built (no API call)
+def health_check(user_id=DEFAULT_USER):
     try:
-        events_result = service.events().list(
-            calendarId='primary',
-            maxResults=10,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        return events_result.get('items', [])
+        with calendar_service(user_id) as service:
+            return service is not None
     except Exception as e:
-        print(f'An error occurred while listing events: {e}')
-        return []
+        print(f"❌ Calendar health check failed: {e}")
+        return False
 
-# ✅ Create event
-def create_event(start_time, end_time, summary="TailorTalk Meeting", description="Auto-booked by TailorTalk Bot", invitees=None):
-    service = get_calendar_service()
-    if service is None:
-        raise Exception("❌ Cannot create event: Calendar service not available.")
+# ✅ List events
+def list_events(user_id=DEFAULT_USER):
+    with calendar_service(user_id) as service:
+        if service is None:
+            print("❌ Calendar service not available. Cannot list events.")
+            return []
+        try:
+            events_result = _execute(service.events().list(
+                calendarId='primary',
+                maxResults=10,
+                singleEvents=True,
+                orderBy='startTime'
+            ))
+            return events_result.get('items', [])
+        except Exception as e:
+            print(f'An error occurred while listing events: {e}')
+            return []
 
+# ✅ Create event
+@timed("insert")
+def create_event(start_time, end_time, summary="TailorTalk Meeting", description="Auto-booked by TailorTalk Bot", invitees=None, user_id=DEFAULT_USER):
     event = {
         'summary': summary,
         'description': description,
-        'start': {'dateTime': start_time, 'timeZone': 'Asia/Kolkata'},
-        'end': {'dateTime': end_time, 'timeZone': 'Asia/Kolkata'},
+        'start': {'dateTime': start_time, 'timeZone': CALENDAR_TIMEZONE},
+        'end': {'dateTime': end_time, 'timeZone': CALENDAR_TIMEZONE},
     }
 
     if invitees:
         event['attendees'] = [{'email': email.strip()} for email in invitees if email]
 
-    try:
-        event = service.events().insert(calendarId='primary', body=event).execute()
-        return event.get('htmlLink')
-    except Exception as e:
-        print(f"❌ Failed to create event: {e}")
-        raise
+    with calendar_service(user_id) as service:
+        if service is None:
+            raise Exception("❌ Cannot create event: Calendar service not available.")
+        try:
+            event = _execute(service.events().insert(calendarId='primary', body=event))
+            busy_index.record_event(event, owner=user_id)
+            return event.get('htmlLink')
+        except Exception as e:
+            print(f"❌ Failed to create event: {e}")
+            raise
+
+# ✅ One event by id; None when there is no such event or it was deleted
+def get_event(event_id, user_id=DEFAULT_USER):
+    from googleapiclient.errors import HttpError
+
+    with calendar_service(user_id) as service:
+        if service is None:
+            raise Exception("❌ Cannot read event: Calendar service not available.")
+        try:
+            event = _execute(service.events().get(calendarId='primary', eventId=event_id))
+        except HttpError as e:
+            if e.resp.status in (404, 410):
+                return None
+            raise
+    return None if event.get("status") == "cancelled" else event
 
 # ✅ Time availability check
-def is_time_slot_free(start_time, end_time):
-    service = get_calendar_service()
+@timed("availability")
+def is_time_slot_free(start_time, end_time, user_id=DEFAULT_USER):
+    with calendar_service(user_id) as service:
+        if service is None:
+            print("❌ Calendar service unavailable. Assuming time is free.")
+            return True  # fallback to prevent breaking
+
+        try:
+            # ⚡ Answer from the in-memory busy index when it is fresh enough
+            start, end = _as_datetime(start_time), _as_datetime(end_time)
+            free = busy_index.lookup(service, start, end, owner=user_id)
+            if free is not None:
+                return free
+
+            time_min = start.astimezone(timezone.utc).isoformat()
+            time_max = end.astimezone(timezone.utc).isoformat()
+
+            events_result = _execute(service.events().list(
+                calendarId='primary',
+                timeMin=time_min,
+                timeMax=time_max,
+                singleEvents=True,
+                orderBy='startTime'
+            ))
+
+            events = events_result.get('items', [])
+            return len(events) == 0
+        except RateLimited:
+            raise  # never guess "free" because we were throttled
+        except Exception as e:
+            print(f'An error occurred while checking time slot: {e}')
+            return True
+
+def _as_datetime(value):
+    """Datetime from a datetime or ISO string; naive times are in CALENDAR_TIMEZONE, like the events we insert."""
+    value = isoparse(value) if isinstance(value, str) else value
+    return value if value.tzinfo else value.replace(tzinfo=ZoneInfo(CALENDAR_TIMEZONE))
+
+# ✅ Free/busy for several calendars over one window, in a single round trip
+@timed("freebusy")
+def query_freebusy(calendar_ids, time_min, time_max, service=None, user_id=DEFAULT_USER):
+    """Return {calendar_id: [(start, end), ...]} of busy spans as aware datetimes."""
+    body = {
+        "timeMin": _as_datetime(time_min).astimezone(timezone.utc).isoformat(),
+        "timeMax": _as_datetime(time_max).astimezone(timezone.utc).isoformat(),
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+    }
     if service is None:
-        print("❌ Calendar service unavailable. Assuming time is free.")
-        return True  # fallback to prevent breaking
+        with calendar_service(user_id) as service:
+            if service is None:
+                raise Exception("❌ Cannot query free/busy: Calendar service not available.")
+            response = _execute(service.freebusy().query(body=body))
+    else:
+        response = _execute(service.freebusy().query(body=body))
+
+    busy = {}
+    for calendar_id in calendar_ids:
+        calendar = response.get("calendars", {}).get(calendar_id, {})
+        if calendar.get("errors"):
+            print(f"❌ Free/busy unavailable for {calendar_id}: {calendar['errors']}")
+        busy[calendar_id] = [(isoparse(span["start"]), isoparse(span["end"])) for span in calendar.get("busy", [])]
+    return busy
+
+# ✅ Availability for many candidate slots with at most one API call
+@timed("availability")
+def check_slots(candidates, calendar_id="primary", user_id=DEFAULT_USER):
+    """candidates: [(start, end), ...] as datetimes or ISO strings. Returns [bool, ...]."""
+    slots = [(_as_datetime(start), _as_datetime(end)) for start, end in candidates]
+    if not slots:
+        return []
+
+    with calendar_service(user_id) as service:
+        if service is None:
+            print("❌ Calendar service unavailable. Assuming slots are free.")
+            return [True] * len(slots)
+
+        try:
+            answers = [busy_index.lookup(service, start, end, calendar_id, owner=user_id) for start, end in slots]
+            if all(answer is not None for answer in answers):
+                return answers
+
+            window_start = min(start for start, _ in slots)
+            window_end = max(end for _, end in slots)
+            busy = query_freebusy([calendar_id], window_start, window_end, service)[calendar_id]
+        except RateLimited:
+            raise
+        except Exception as e:
+            print(f'An error occurred while checking slots: {e}')
+            return [True] * len(slots)
+
+    return [not any(busy_start < end and busy_end > start for busy_start, busy_end in busy) for start, end in slots]
+
+def free_slots(candidates, calendar_id="primary", user_id=DEFAULT_USER):
+    """Only the candidates that are actually free, in their original order."""
+    return [slot for slot, free in zip(candidates, check_slots(candidates, calendar_id, user_id)) if free]
+
+# ✅ Earliest common free slots for the organiser and all invitees
+@timed("suggest")
+def suggest_slots(preferred_start, duration_minutes=30, invitees=None, top_k=3, user_id=DEFAULT_USER):
+    """Slots closest to `preferred_start` where the organiser and every invitee are free."""
+    tz = ZoneInfo(CALENDAR_TIMEZONE)
+    preferred_start = _as_datetime(preferred_start)
+    # Search from the start of that day so earlier same-day slots are considered too
+    day_start = preferred_start.astimezone(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    window_start = max(day_start, datetime.now(timezone.utc))
+    window_end = window_start + timedelta(days=SUGGESTION_WINDOW_DAYS)
+    calendar_ids = ["primary"] + [email.strip() for email in (invitees or []) if email and email.strip()]
 
     try:
-        time_min = isoparse(start_time).astimezone(timezone.utc).isoformat()
-        time_max = isoparse(end_time).astimezone(timezone.utc).isoformat()
-
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-
-        events = events_result.get('items', [])
-        return len(events) == 0
+        busy = query_freebusy(calendar_ids, window_start, window_end, user_id=user_id)
+    except RateLimited:
+        raise
     except Exception as e:
-        print(f'An error occurred while checking time slot: {e}')
-        return True
+        print(f'An error occurred while fetching free/busy: {e}')
+        return []
+
+    import slot_finder  # numpy is only needed once suggestions are requested
+
+    return slot_finder.find_common_slots(
+        busy, window_start, window_end,
+        duration_minutes=duration_minutes,
+        top_k=top_k,
+        tz=tz,
+        work_start_hour=WORKDAY_START_HOUR,
+        work_end_hour=WORKDAY_END_HOUR,
+        preferred_start=preferred_start,
+    )
 
 # ✅ Book event
-def book_event_at(start_time_obj, duration_minutes, description, invitees=None):
-    service = get_calendar_service()
-    if service is None:
-        raise Exception("❌ Cannot book event: Calendar service not available.")
+@timed("insert")
+# With an event_id (5-1024 characters a-v/0-9), a second insert of the same booking
+# returns the event the first one created instead of adding another.
+def book_event_at(start_time_obj, duration_minutes, description, invitees=None, user_id=DEFAULT_USER, event_id=None):
+    from googleapiclient.errors import HttpError
 
     end_time_obj = start_time_obj + timedelta(minutes=duration_minutes)
 
     event = {
         'summary': "TailorTalk Meeting",
         'description': description,
-        'start': {'dateTime': start_time_obj.isoformat(), 'timeZone': 'Asia/Kolkata'},
-        'end': {'dateTime': end_time_obj.isoformat(), 'timeZone': 'Asia/Kolkata'},
+        'start': {'dateTime': start_time_obj.isoformat(), 'timeZone': CALENDAR_TIMEZONE},
+        'end': {'dateTime': end_time_obj.isoformat(), 'timeZone': CALENDAR_TIMEZONE},
     }
 
     if invitees:
         event['attendees'] = [{'email': email.strip()} for email in invitees if email]
+    if event_id:
+        event['id'] = event_id
 
-    try:
-        event = service.events().insert(calendarId='primary', body=event).execute()
-        return {
-            "link": event.get("htmlLink"),
+    with calendar_service(user_id) as service:
+        if service is None:
+            raise Exception("❌ Cannot book event: Calendar service not available.")
+        try:
+            try:
+                event = _execute(service.events().insert(calendarId='primary', body=event))
+            except HttpError as e:
+                existing = get_event(event_id, user_id) if event_id and e.resp.status == 409 else None
+                if existing is None:
+                    raise
+                return {"link": existing.get("htmlLink"), "start": start_time_obj.isoformat(), "end": end_time_obj.isoformat()}
+            busy_index.record_event(event, owner=user_id)
+            return {
+                "link": event.get("htmlLink"),
+                "start": start_time_obj.isoformat(),
+                "end": end_time_obj.isoformat()
+            }
+        except Exception as e:
+            print(f"❌ Booking failed: {e}")
+            raise
+
+
+# 📦 Insert many events with Google batch requests (one HTTP call per 50 events)
+def _new_batch(service, callback):
+    from googleapiclient.http import BatchHttpRequest
+
+    if CALENDAR_API_ENDPOINT:
+        # The batch URI comes from the discovery doc's rootUrl, so follow the endpoint override
+        batch_uri = urllib.parse.urljoin(CALENDAR_API_ENDPOINT, "/batch/calendar/v3")
+        return BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+    return service.new_batch_http_request(callback=callback)
+
+@timed("insert_batch")
+def book_events_batch(bookings, user_id=DEFAULT_USER):
+    """
+    bookings: [(start_time_obj, duration_minutes, description, invitees), ...]
+    Returns one dict per booking: {"link", "start", "end"} or {"error": message}. A chunk
+    whose batch call fails marks only its own items; earlier chunks keep their results.
+    """
+    results = [None] * len(bookings)
+
+    def on_response(request_id, response, exception):
+        i = int(request_id)
+        if exception is not None:
+            print(f"❌ Booking failed: {exception}")
+            results[i] = {"error": str(exception)}
+            return
+        busy_index.record_event(response, owner=user_id)
+        start_time_obj, duration_minutes = bookings[i][0], bookings[i][1]
+        results[i] = {
+            "link": response.get("htmlLink"),
             "start": start_time_obj.isoformat(),
-            "end": end_time_obj.isoformat()
+            "end": (start_time_obj + timedelta(minutes=duration_minutes)).isoformat(),
         }
-    except Exception as e:
-        print(f"❌ Booking failed: {e}")
-        raise
+
+    with calendar_service(user_id) as service:
+        if service is None:
+            raise Exception("❌ Cannot book events: Calendar service not available.")
+
+        for chunk_start in range(0, len(bookings), CALENDAR_BATCH_LIMIT):
+            batch = _new_batch(service, on_response)
+            for i in range(chunk_start, min(chunk_start + CALENDAR_BATCH_LIMIT, len(bookings))):
+                start_time_obj, duration_minutes, description, invitees = bookings[i]
+                end_time_obj = start_time_obj + timedelta(minutes=duration_minutes)
+                event = {
+                    'summary': "TailorTalk Meeting",
+                    'description': description,
+                    'start': {'dateTime': start_time_obj.isoformat(), 'timeZone': CALENDAR_TIMEZONE},
+                    'end': {'dateTime': end_time_obj.isoformat(), 'timeZone': CALENDAR_TIMEZONE},
+                }
+                if invitees:
+                    event['attendees'] = [{'email': email.strip()} for email in invitees if email]
+                batch.add(service.events().insert(calendarId='primary', body=event), request_id=str(i))
+            try:
+                _execute(batch)
+            except Exception as e:
+                print(f"❌ Batch booking failed: {e}")
+                for i in range(chunk_start, min(chunk_start + CALENDAR_BATCH_LIMIT, len(bookings))):
+                    if results[i] is None:
+                        results[i] = {"error": str(e)}
+
+    return results
+
+# ⚡ Async wrappers: Calendar calls run on a dedicated, bounded executor so they never
+# starve the event loop or the default threadpool
+_calendar_executor = ThreadPoolExecutor(max_workers=CALENDAR_MAX_CONCURRENCY, thread_name_prefix="calendar")
+
+async def _run_calendar(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Carry the request id (and trace context) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_calendar_executor, context.run, functools.partial(fn, *args, **kwargs))
+
+async def ais_time_slot_free(start_time, end_time, user_id=DEFAULT_USER):
+    return await _run_calendar(is_time_slot_free, start_time, end_time, user_id=user_id)
+
+async def acheck_slots(candidates, calendar_id="primary", user_id=DEFAULT_USER):
+    return await _run_calendar(check_slots, candidates, calendar_id, user_id=user_id)
+
+async def asuggest_slots(preferred_start, duration_minutes=30, invitees=None, top_k=3, user_id=DEFAULT_USER):
+    return await _run_calendar(suggest_slots, preferred_start, duration_minutes, invitees, top_k, user_id=user_id)
+
+async def abook_events_batch(bookings, user_id=DEFAULT_USER):
+    return await _run_calendar(book_events_batch, bookings, user_id=user_id)
+
+async def abook_event_at(start_time_obj, duration_minutes, description, invitees=None, user_id=DEFAULT_USER):
+    return await _run_calendar(book_event_at, start_time_obj, duration_minutes, description, invitees, user_id=user_id)
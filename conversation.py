@@ -0,0 +1,210 @@
+# conversation.py
+# Multi-turn slot filling. A LangGraph graph with a checkpointer keyed by session keeps the
+# booking fields between turns, so "make it 4pm instead" changes the time and keeps the
+# date, invitees and description. The first turn is a full parse (agent_logic); follow-ups
+# only extract what changed, with the rule parser or a compact Gemini prompt.
+# Conversations are kept in memory, per process.
+
+import os
+import copy
+import threading
+from collections import OrderedDict
+from typing import TypedDict
+
+from dateutil.parser import isoparse
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph
+
+import metrics
+import gemini_chain
+from agent_logic import run_langgraph_agent, arun_langgraph_agent
+from credential_store import DEFAULT_USER
+from fast_parser import fast_parse_changes
+from json_extract import extract_first_object, validate_booking
+from rate_limit import RateLimited
+
+# ✅ Least recently used conversations beyond this are forgotten
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+# Below this, a rule-parsed edit ("Saturday" said on a Saturday) goes to Gemini instead
+FOLLOWUP_MIN_CONFIDENCE = float(os.getenv("FOLLOWUP_MIN_CONFIDENCE", "0.9"))
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+# Conversation state; `booking` persists across turns, `result` and `route` are per turn
+class ConversationState(TypedDict, total=False):
+    input: str
+    booking: dict  # start_time, end_time, invitees, description
+    result: dict
+    route: str
+    booked: dict  # the event the last successful turn created; set by record_booked
+
+def _first_turn(user_text, parsed):
+    if "error" in parsed:
+        return {"result": parsed, "route": "parse"}
+    booking = {**parsed, "description": user_text}
+    return {"booking": booking, "result": copy.deepcopy(booking), "route": "parse"}
+
+def _apply(booking, changes):
+    """The booking with `changes` applied; start moves keep the meeting's length."""
+    start, end = isoparse(booking["start_time"]), isoparse(booking["end_time"])
+    length = end - start
+    if "date" in changes:
+        start = start.replace(year=changes["date"].year, month=changes["date"].month, day=changes["date"].day)
+    if "time" in changes:
+        start = start.replace(hour=changes["time"][0], minute=changes["time"][1], second=0)
+    if changes.get("start_time"):
+        start = isoparse(changes["start_time"])
+    end = isoparse(changes["end_time"]) if changes.get("end_time") else start + length
+
+    removed = {email.lower() for email in changes.get("remove_invitees") or []}
+    invitees = [email for email in booking.get("invitees", []) if email.lower() not in removed]
+    for email in changes.get("add_invitees") or []:
+        if email.lower() not in {known.lower() for known in invitees}:
+            invitees.append(email)
+
+    updated = validate_booking({
+        "start_time": start.strftime(TIME_FORMAT) if start.tzinfo is None else start.isoformat(),
+        "end_time": end.strftime(TIME_FORMAT) if end.tzinfo is None else end.isoformat(),
+        "invitees": invitees,
+    })
+    return {**updated, "description": booking.get("description", "")}
+
+def _rule_changes(user_text):
+    changes, confidence = fast_parse_changes(user_text, now=gemini_chain.now())
+    return changes if changes is not None and confidence >= FOLLOWUP_MIN_CONFIDENCE else None
+
+def _current(booking):
+    # Only what the model needs to resolve an edit; the description stays out of the prompt
+    return {key: booking[key] for key in ("start_time", "end_time", "invitees")}
+
+def _followup(booking, changes, route):
+    try:
+        updated = _apply(booking, changes)
+    except (ValueError, TypeError) as e:
+        return {"result": {"error": f"Could not apply the change: {e}"}, "route": route}
+    return {"booking": updated, "result": copy.deepcopy(updated), "route": route}
+
+def _llm_changes(output):
+    changes = extract_first_object(output)
+    if not isinstance(changes, dict):
+        raise ValueError("No JSON found")
+    return changes
+
+# 🔁 One turn: full parse when nothing is known yet, otherwise only the changes.
+# RateLimited propagates (the API answers 503) and leaves the saved booking as it was.
+def turn_node(state: ConversationState) -> ConversationState:
+    user_text, booking = state["input"], state.get("booking")
+    if not booking:
+        return _first_turn(user_text, run_langgraph_agent(user_text))
+    changes = _rule_changes(user_text)
+    if changes is not None:
+        return _followup(booking, changes, "followup_rules")
+    try:
+        changes = _llm_changes(gemini_chain.run_followup_chain(_current(booking), user_text))
+    except RateLimited:
+        raise
+    except Exception as e:
+        return {"result": {"error": str(e)}, "route": "followup_llm"}
+    return _followup(booking, changes, "followup_llm")
+
+async def aturn_node(state: ConversationState) -> ConversationState:
+    user_text, booking = state["input"], state.get("booking")
+    if not booking:
+        return _first_turn(user_text, await arun_langgraph_agent(user_text))
+    changes = _rule_changes(user_text)
+    if changes is not None:
+        return _followup(booking, changes, "followup_rules")
+    try:
+        changes = _llm_changes(await gemini_chain.arun_followup_chain(_current(booking), user_text))
+    except RateLimited:
+        raise
+    except Exception as e:
+        return {"result": {"error": str(e)}, "route": "followup_llm"}
+    return _followup(booking, changes, "followup_llm")
+
+
+checkpointer = MemorySaver()
+
+def build_conversation_graph(saver=checkpointer):
+    graph = StateGraph(ConversationState)
+    graph.add_node("turn", RunnableLambda(turn_node, afunc=aturn_node))
+    graph.set_entry_point("turn")
+    graph.set_finish_point("turn")
+    return graph.compile(checkpointer=saver)
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+def get_conversation_graph():
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = build_conversation_graph()
+    return _graph
+
+
+# 🧹 Checkpoints per conversation, least recently used first
+_threads = OrderedDict()
+_threads_lock = threading.Lock()
+
+def _thread_config(session_id, user_id):
+    thread_id = f"{user_id}:{session_id}"
+    with _threads_lock:
+        _threads[thread_id] = True
+        _threads.move_to_end(thread_id)
+        evicted = []
+        while len(_threads) > CONVERSATION_MAX_SESSIONS:
+            evicted.append(_threads.popitem(last=False)[0])
+    for old in evicted:
+        checkpointer.delete_thread(old)
+    return {"configurable": {"thread_id": thread_id}}
+
+# 📊 How turns were answered: full parse, rule-parsed edit or Gemini edit
+conversation_stats = {"parse": 0, "followup_rules": 0, "followup_llm": 0}
+_stats_lock = threading.Lock()
+
+def _finish(state):
+    route = state.get("route", "parse")
+    with _stats_lock:
+        conversation_stats[route] = conversation_stats.get(route, 0) + 1
+    metrics.CONVERSATION_TURNS.labels(route).inc()
+    return copy.deepcopy(state.get("result", {"error": "No result returned"}))
+
+def get_conversation_stats() -> dict:
+    with _stats_lock:
+        return {**conversation_stats, "sessions": len(_threads)}
+
+
+# Public functions: the booking after this turn (with its description), or {"error": ...}
+def run_conversation_turn(user_input: str, session_id, user_id: str = DEFAULT_USER) -> dict:
+    with metrics.span("conversation_turn"):
+        return _finish(get_conversation_graph().invoke({"input": user_input}, _thread_config(session_id, user_id)))
+
+async def arun_conversation_turn(user_input: str, session_id, user_id: str = DEFAULT_USER) -> dict:
+    with metrics.span("conversation_turn"):
+        state = await get_conversation_graph().ainvoke({"input": user_input}, _thread_config(session_id, user_id))
+    return _finish(state)
+
+def get_conversation(session_id, user_id: str = DEFAULT_USER):
+    """The booking fields saved for this session, or None."""
+    state = get_conversation_graph().get_state({"configurable": {"thread_id": f"{user_id}:{session_id}"}})
+    return copy.deepcopy(state.values.get("booking")) if state.values else None
+
+# 📅 A follow-up books a new event; the one an earlier turn created is not moved or deleted
+def record_booked(session_id, user_id: str, booked: dict):
+    """Save the event this turn created; returns the one an earlier turn created, or None."""
+    config = {"configurable": {"thread_id": f"{user_id}:{session_id}"}}
+    graph = get_conversation_graph()
+    previous = graph.get_state(config).values.get("booked")
+    graph.update_state(config, {"booked": booked}, as_node="turn")
+    return copy.deepcopy(previous)
+
+def reset_conversation(session_id, user_id: str = DEFAULT_USER):
+    thread_id = f"{user_id}:{session_id}"
+    with _threads_lock:
+        _threads.pop(thread_id, None)
+    checkpointer.delete_thread(thread_id)
@@ -0,0 +1,244 @@
+# credential_store.py
+# Per-user Google OAuth credentials: SQLite by default, cached in memory per row version,
+# refreshed ahead of expiry with a cross-process lock so only one worker refreshes.
+
+import os
+import abc
+import json
+import time
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import timezone
+
+from dateutil.parser import isoparse
+
+from metrics import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# ✅ Store settings
+CREDENTIAL_DB = os.getenv("CREDENTIAL_DB", "credentials.db")
+CREDENTIAL_REFRESH_MARGIN = float(os.getenv("CREDENTIAL_REFRESH_MARGIN", "300"))  # seconds before expiry
+CREDENTIAL_REFRESH_INTERVAL = float(os.getenv("CREDENTIAL_REFRESH_INTERVAL", "60"))
+DEFAULT_USER = "default"
+LEGACY_TOKEN_FILE = "token.pkl"
+
+
+def _expiry_timestamp(creds):
+    # google-auth keeps expiry as a naive UTC datetime
+    if creds.expiry is None:
+        return None
+    return creds.expiry.replace(tzinfo=timezone.utc).timestamp()
+
+def _from_json(data):
+    # Credentials.from_authorized_user_info insists on a refresh token; be lenient
+    from google.oauth2.credentials import Credentials
+
+    info = json.loads(data)
+    expiry = isoparse(info["expiry"]).astimezone(timezone.utc).replace(tzinfo=None) if info.get("expiry") else None
+    return Credentials(
+        token=info.get("token"),
+        refresh_token=info.get("refresh_token"),
+        token_uri=info.get("token_uri"),
+        client_id=info.get("client_id"),
+        client_secret=info.get("client_secret"),
+        scopes=info.get("scopes"),
+        expiry=expiry,
+    )
+
+def needs_refresh(creds, margin=CREDENTIAL_REFRESH_MARGIN):
+    expiry = _expiry_timestamp(creds)
+    if expiry is None:
+        return False
+    return bool(creds.refresh_token) and expiry - time.time() < margin
+
+
+class CredentialStore(abc.ABC):
+    """Interface for credential backends."""
+
+    @abc.abstractmethod
+    def get(self, user_id):
+        ...
+
+    @abc.abstractmethod
+    def put(self, user_id, creds):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, user_id):
+        ...
+
+    @abc.abstractmethod
+    def users(self):
+        ...
+
+    def has(self, user_id):
+        return self.get(user_id) is not None
+
+    @contextmanager
+    def refresh_lock(self, user_id):
+        yield
+
+    def _load_uncached(self, user_id):
+        return self.get(user_id)
+
+    # 🔄 Refresh under a lock, re-reading first in case another worker already did it
+    def get_fresh(self, user_id=DEFAULT_USER):
+        creds = self.get(user_id)
+        if creds is None or not needs_refresh(creds):
+            return creds
+        with self.refresh_lock(user_id):
+            latest = self._load_uncached(user_id)
+            if latest is not None and needs_refresh(latest):
+                from google.auth.transport.requests import Request
+
+                with span("credential_refresh"):
+                    latest.refresh(Request())
+                self.put(user_id, latest)
+            return latest
+
+
+class SQLiteCredentialStore(CredentialStore):
+    def __init__(self, db_path=CREDENTIAL_DB):
+        self.db_path = db_path
+        self._cache = {}  # user_id -> (updated_at, credentials)
+        self._lock = threading.Lock()
+        self._thread_locks = {}
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS credentials ("
+                "user_id TEXT PRIMARY KEY, data TEXT NOT NULL, expiry REAL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _load_uncached(self, user_id):
+        row = self._connect().execute(
+            "SELECT data, updated_at FROM credentials WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        creds = _from_json(row[0]) if row else None
+        with self._lock:
+            if creds is None:
+                self._cache.pop(user_id, None)
+            else:
+                self._cache[user_id] = (row[1], creds)
+        return creds
+
+    def get(self, user_id):
+        # Another process may have refreshed or replaced the row; only its version is read
+        # here, and the cached credentials are used while it is unchanged
+        row = self._connect().execute(
+            "SELECT updated_at FROM credentials WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        with self._lock:
+            cached = self._cache.get(user_id)
+        if row is not None and cached is not None and cached[0] == row[0]:
+            return cached[1]
+        return self._load_uncached(user_id)
+
+    def put(self, user_id, creds):
+        updated_at = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO credentials (user_id, data, expiry, updated_at) VALUES (?, ?, ?, ?)",
+                (user_id, creds.to_json(), _expiry_timestamp(creds), updated_at),
+            )
+        with self._lock:
+            self._cache[user_id] = (updated_at, creds)
+
+    def delete(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def users(self):
+        return [row[0] for row in self._connect().execute("SELECT user_id FROM credentials")]
+
+    @contextmanager
+    def refresh_lock(self, user_id):
+        with self._lock:
+            thread_lock = self._thread_locks.setdefault(user_id, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.db_path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# 🔁 Proactive background refresh so requests never wait on a token refresh
+class BackgroundRefresher:
+    def __init__(self, store, interval=CREDENTIAL_REFRESH_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="credential-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for user_id in self.store.users():
+                try:
+                    self.store.get_fresh(user_id)
+                except Exception as e:
+                    print(f"❌ Background token refresh failed for {user_id}: {e}")
+
+
+def _migrate_legacy_token(store):
+    """Import the single-user token.pkl once, as the default user."""
+    if os.path.exists(LEGACY_TOKEN_FILE) and not store.has(DEFAULT_USER):
+        with open(LEGACY_TOKEN_FILE, "rb") as token_file:
+            store.put(DEFAULT_USER, pickle.load(token_file))
+        print(f"✅ Imported {LEGACY_TOKEN_FILE} into the credential store.")
+
+
+_store = None
+_store_lock = threading.Lock()
+_refresher = None
+
+def get_store() -> CredentialStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = SQLiteCredentialStore()
+                _migrate_legacy_token(store)
+                _store = store
+    return _store
+
+def set_store(store: CredentialStore):
+    """Plug in a different backend (call before the first request)."""
+    global _store
+    _store = store
+
+def start_background_refresh():
+    global _refresher
+    if _refresher is None:
+        _refresher = BackgroundRefresher(get_store())
+    _refresher.start()
+    return _refresher
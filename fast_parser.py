@@ -0,0 +1,181 @@
+# fast_parser.py
+# Rule-based extractor for simple booking requests, tried before the LLM.
+
+import re
+from datetime import datetime, timedelta
+
+from dateutil.parser import parse as parse_date
+
+MEETING_MINUTES = 30
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+
+RELATIVE_DAY_RE = re.compile(r"\b(day after tomorrow|tomorrow|today)\b")
+WEEKDAY_RE = re.compile(r"\b(?:(this|next|coming)\s+)?(" + "|".join(WEEKDAYS) + r")\b")
+ISO_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+MONTH_DATE_RE = re.compile(
+    r"\b(?:" + MONTHS + r"\.?\s+\d{1,2}(?:st|nd|rd|th)?|\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?" + MONTHS + r")\b(?:,?\s+\d{4})?"
+)
+MERIDIEM_TIME_RE = re.compile(r"\b(\d{1,2})(?::([0-5]\d))?\s*([ap])\.?m\b\.?")
+CLOCK_TIME_RE = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+NAMED_TIME_RE = re.compile(r"\b(noon|midnight)\b")
+BARE_HOUR_RE = re.compile(r"\bat\s+\d{1,2}\b")
+DATE_PATTERNS = (RELATIVE_DAY_RE, WEEKDAY_RE, ISO_DATE_RE, MONTH_DATE_RE)
+TIME_PATTERNS = (MERIDIEM_TIME_RE, CLOCK_TIME_RE, NAMED_TIME_RE, BARE_HOUR_RE)
+
+# Anything that needs judgement (ranges, vague times, durations, edits) goes to the LLM
+AMBIGUOUS_RE = re.compile(
+    r"\b(between|until|till|from|morning|afternoon|evening|tonight|night|lunch|"
+    r"free|available|availability|every|weekly|daily|hours?|mins?|minutes?|"
+    r"reschedule|move|cancel|instead|(?<!day )after|before|around|or)\b|\?|\bto\b\s+\d"
+)
+# A time zone other than the calendar's changes the instant; the LLM converts it
+TIMEZONE_RE = re.compile(
+    r"\b(utc|gmt|est|edt|cst|cdt|mst|mdt|pst|pdt|ist|bst|cet|cest|eet|aest|jst|sgt|time ?zone)\b"
+)
+
+
+def _find_date(text, now):
+    """Return (date, confidence) for exactly one date expression, else (None, 0)."""
+    found = []
+
+    for match in RELATIVE_DAY_RE.finditer(text):
+        offset = {"today": 0, "tomorrow": 1, "day after tomorrow": 2}[match.group(1)]
+        found.append(((now + timedelta(days=offset)).date(), 1.0))
+
+    for match in WEEKDAY_RE.finditer(text):
+        qualifier, weekday = match.group(1), WEEKDAYS.index(match.group(2))
+        days_ahead = (weekday - now.weekday()) % 7
+        confidence = 1.0
+        if days_ahead == 0:
+            # "Friday" said on a Friday could mean today or next week
+            days_ahead = 7
+            confidence = 1.0 if qualifier == "next" else 0.5
+        elif qualifier == "next":
+            # "next Friday" said on a Thursday: tomorrow, or Friday of the following week?
+            confidence = 0.5
+        found.append(((now + timedelta(days=days_ahead)).date(), confidence))
+
+    for regex in (ISO_DATE_RE, MONTH_DATE_RE):
+        for match in regex.finditer(text):
+            try:
+                parsed = parse_date(match.group(0), default=now.replace(hour=0, minute=0, second=0, microsecond=0))
+            except (ValueError, OverflowError):
+                return None, 0.0
+            if parsed.date() < now.date() and not re.search(r"\d{4}", match.group(0)):
+                parsed = parsed.replace(year=parsed.year + 1)
+            found.append((parsed.date(), 1.0))
+
+    if len(found) != 1:
+        return None, 0.0
+    return found[0]
+
+def _find_time(text):
+    """Return ((hour, minute), confidence) for exactly one time expression, else (None, 0)."""
+    found = []
+
+    for match in MERIDIEM_TIME_RE.finditer(text):
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if not 1 <= hour <= 12:
+            return None, 0.0
+        hour = hour % 12 + (12 if match.group(3) == "p" else 0)
+        found.append((hour, minute))
+    text = MERIDIEM_TIME_RE.sub(" ", text)
+
+    for match in CLOCK_TIME_RE.finditer(text):
+        hour = int(match.group(1))
+        if hour <= 12 and not match.group(1).startswith("0"):
+            # "5:00" without am/pm; only 13:00-23:59 and zero-padded "09:00" read as 24-hour
+            return None, 0.0
+        found.append((hour, int(match.group(2))))
+    text = CLOCK_TIME_RE.sub(" ", text)
+
+    for match in NAMED_TIME_RE.finditer(text):
+        found.append((12, 0) if match.group(1) == "noon" else (0, 0))
+
+    if BARE_HOUR_RE.search(text):
+        # "at 5" without am/pm
+        return None, 0.0
+    if len(found) != 1:
+        return None, 0.0
+    return found[0], 1.0
+
+def _unexplained_digits(text):
+    # A number no date or time pattern accounted for ("the 13th", "make it 4") needs the LLM
+    for regex in DATE_PATTERNS + TIME_PATTERNS:
+        text = regex.sub(" ", text)
+    return re.search(r"\d", text) is not None
+
+def fast_parse(user_text, now=None):
+    """
+    Extract {start_time, end_time, invitees} without the LLM.
+
+    Returns (result, confidence). `result` is None when the text is not a plain
+    "<date> at <time> with <emails>" request.
+    """
+    now = now or datetime.now()
+    invitees = EMAIL_RE.findall(user_text)
+    text = EMAIL_RE.sub(" ", user_text).lower()
+
+    if AMBIGUOUS_RE.search(text) or TIMEZONE_RE.search(text):
+        return None, 0.0
+
+    day, date_confidence = _find_date(text, now)
+    clock, time_confidence = _find_time(text)
+    if day is None or clock is None or _unexplained_digits(text):
+        return None, 0.0
+
+    start = datetime(day.year, day.month, day.day, clock[0], clock[1])
+    end = start + timedelta(minutes=MEETING_MINUTES)
+    result = {
+        "start_time": start.strftime("%Y-%m-%dT%H:%M:%S"),
+        "end_time": end.strftime("%Y-%m-%dT%H:%M:%S"),
+        "invitees": invitees,
+    }
+    return result, min(date_confidence, time_confidence)
+
+
+# Follow-up turns: edit words are expected here ("make it 4pm instead", "move it to Friday"),
+# but anything relative, removing someone or replacing the list still needs the LLM
+FOLLOWUP_AMBIGUOUS_RE = re.compile(
+    r"\b(between|until|till|from|morning|afternoon|evening|tonight|night|lunch|"
+    r"free|available|availability|every|weekly|daily|hours?|mins?|minutes?|"
+    r"cancel|earlier|later|push|back|forward|(?<!day )after|before|around|or|"
+    r"remove|drop|without|except|only|not|don'?t|instead of|replace)\b|\?"
+)
+
+def fast_parse_changes(user_text, now=None):
+    """
+    Extract what a follow-up turn changes, without the LLM.
+
+    Returns (changes, confidence). `changes` holds any of "date" (a date), "time"
+    ((hour, minute)) and "add_invitees"; it is None when the text is not a plain edit
+    such as "make it 4pm instead", "Friday at 10am" or "also invite bob@example.com".
+    """
+    now = now or datetime.now()
+    invitees = EMAIL_RE.findall(user_text)
+    text = EMAIL_RE.sub(" ", user_text).lower()
+
+    if FOLLOWUP_AMBIGUOUS_RE.search(text) or TIMEZONE_RE.search(text):
+        return None, 0.0
+
+    changes, confidence = {}, 1.0
+    if any(regex.search(text) for regex in DATE_PATTERNS):
+        day, confidence = _find_date(text, now)
+        if day is None:
+            return None, 0.0
+        changes["date"] = day
+    if any(regex.search(text) for regex in TIME_PATTERNS):
+        clock, time_confidence = _find_time(text)
+        if clock is None:
+            return None, 0.0
+        changes["time"] = clock
+        confidence = min(confidence, time_confidence)
+    if invitees:
+        changes["add_invitees"] = invitees
+
+    if not changes or _unexplained_digits(text):
+        return None, 0.0
+    return changes, confidence
@@ -1,27 +1,91 @@
 # backend/services/gemini_chain.py
 
 import os
+import json
+import time
+import asyncio
+import hashlib
+import functools
+import threading
+from contextlib import aclosing
 from datetime import datetime
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.output_parsers import StrOutputParser
-from langchain.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
+
+import metrics
+import llm_cassette
+from rate_limit import AdaptiveLimiter, is_unavailable
+from llm_routing import (
+    LatencyStats, CircuitBreaker, CircuitOpen, HedgeBudget, LostRace, hedged_call, ahedged_call,
+)
+from json_extract import IncrementalJSONExtractor
 load_dotenv()
 
+# ✅ Gemini model name (also part of the cassette key, see prompt_id)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
 
-# 🔐 Validate that the Gemini API key is set
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise EnvironmentError("❌ GEMINI_API_KEY not found in .env file or environment variables.")
+# 🚦 Gemini quota: requests per minute (0 = no bucket), max in-flight calls, and the
+# latency above which a call counts as a sign of overload
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "0"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", os.getenv("LLM_MAX_CONCURRENCY", "16")))
+GEMINI_LATENCY_TARGET = float(os.getenv("GEMINI_LATENCY_TARGET", "10"))
 
-# ✅ Configure Gemini LLM via API key
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    google_api_key=api_key,
-    temperature=0.4,
+gemini_limiter = AdaptiveLimiter(
+    "gemini",
+    rate=GEMINI_RPM / 60,
+    burst=max(1.0, GEMINI_RPM / 10),
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    latency_target=GEMINI_LATENCY_TARGET,
 )
 
+# 🛟 Model used while the primary's circuit breaker is open (or after a primary failure);
+# empty means the caller falls back to the rule parser instead
+GEMINI_FALLBACK_MODEL = os.getenv("GEMINI_FALLBACK_MODEL", "")
+
+fallback_limiter = AdaptiveLimiter(
+    "gemini_fallback",
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    latency_target=GEMINI_LATENCY_TARGET,
+)
+
+# 📊 Latency per route drives the hedge delay; the breaker watches the primary model
+latency_stats = LatencyStats()
+gemini_breaker = CircuitBreaker("gemini")
+hedge_budget = HedgeBudget()
+
+_llm = None
+_chain = None
+_fallback_llm = None
+_fallback_chain = None
+_client_lock = threading.Lock()
+
+def _make_llm(model):
+    # 🔐 Validate that the Gemini API key is set
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise EnvironmentError("❌ GEMINI_API_KEY not found in .env file or environment variables.")
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=api_key,
+        temperature=0.4,
+        max_retries=1,  # no SDK retries: gemini_limiter retries 429s itself
+    )
+
+# ✅ Configure Gemini LLM via API key (built on first use, not at import)
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _client_lock:
+            if _llm is None:
+                _llm = _make_llm(GEMINI_MODEL)
+    return _llm
+
 # 💬 Prompt template to extract structured calendar data
 prompt = ChatPromptTemplate.from_messages([
     ("system", """You are a calendar agent. Extract structured info from user input.
@@ -38,10 +102,355 @@ Meeting is 30 minutes. Today is {today}."""),
     ("user", "{input}")
 ])
 
+# 💬 Follow-up turns (conversation.py): only the current fields and what changed, so a
+# "make it 4pm instead" costs a fraction of a full parse
+followup_prompt = ChatPromptTemplate.from_messages([
+    ("system", """Edit a meeting. Today is {today}. Current: {current}
+Reply with JSON holding only what the user changes, from: start_time, end_time (YYYY-MM-DDTHH:MM:SS), add_invitees, remove_invitees."""),
+    ("user", "{input}")
+])
+
+# 🔢 Token usage → metrics. Streams report usage per chunk (so streams closed early still
+# count); anything that did not stream is counted from the final result.
+class TokenUsageHandler(BaseCallbackHandler):
+    run_inline = True
+
+    def __init__(self):
+        self._streamed = set()
+
+    @staticmethod
+    def _record(message):
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            metrics.record_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+            return True
+        return False
+
+    def on_llm_new_token(self, token, *, chunk=None, run_id=None, **kwargs):
+        if chunk is not None and self._record(getattr(chunk, "message", None)):
+            self._streamed.add(run_id)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        if run_id in self._streamed:
+            self._streamed.discard(run_id)
+            return
+        for generations in response.generations:
+            for generation in generations:
+                self._record(getattr(generation, "message", None))
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._streamed.discard(run_id)
+
+token_usage = TokenUsageHandler()
+
 # 🔗 Combine prompt → Gemini model → parser
-chain = prompt | llm | StrOutputParser()
+def get_chain():
+    global _chain
+    if _chain is None:
+        llm = get_llm()
+        with _client_lock:
+            if _chain is None:
+                _chain = (prompt | llm | StrOutputParser()).with_config(callbacks=[token_usage])
+    return _chain
+
+_followup_chain = None
+
+def get_followup_chain():
+    global _followup_chain
+    if _followup_chain is None:
+        llm = get_llm()
+        with _client_lock:
+            if _followup_chain is None:
+                _followup_chain = (followup_prompt | llm | StrOutputParser()).with_config(callbacks=[token_usage])
+    return _followup_chain
+
+# 🔌 Swap in another chat model (e.g. a fake one for offline benchmarks)
+def set_llm(llm):
+    global _llm, _chain, _followup_chain
+    with _client_lock:
+        _llm = llm
+        _chain = None
+        _followup_chain = None
+
+# 🛟 Fallback chain, or None when no fallback model is configured
+def get_fallback_chain():
+    global _fallback_llm, _fallback_chain
+    if _fallback_chain is None and (_fallback_llm is not None or GEMINI_FALLBACK_MODEL):
+        with _client_lock:
+            if _fallback_llm is None:
+                _fallback_llm = _make_llm(GEMINI_FALLBACK_MODEL)
+            if _fallback_chain is None:
+                _fallback_chain = (prompt | _fallback_llm | StrOutputParser()).with_config(callbacks=[token_usage])
+    return _fallback_chain
+
+def set_fallback_llm(llm):
+    """Install a fallback chat model without going through GEMINI_FALLBACK_MODEL (None removes it)."""
+    global _fallback_llm, _fallback_chain
+    with _client_lock:
+        _fallback_llm = llm
+        _fallback_chain = None
+
+# `gemini_chain.llm` / `gemini_chain.chain` still work, built lazily on first access
+def __getattr__(name):
+    if name == "llm":
+        return get_llm()
+    if name == "chain":
+        return get_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# ✅ Entry point: Call this from agent_logic
+# 🔖 Identifies the prompt + model, so recorded calls are only replayed for the same pair
+@functools.lru_cache(maxsize=None)
+def prompt_id() -> str:
+    templates = "|".join(message.prompt.template for message in prompt.messages)
+    return hashlib.sha256(f"{GEMINI_MODEL}|{templates}".encode()).hexdigest()[:12]
+
+# 🕰️ Current time for the parser; benchmarks pin it so relative dates stay comparable
+_frozen_now = None
+
+def now() -> datetime:
+    return _frozen_now or datetime.now()
+
+def freeze_now(value):
+    """Pin now() (and so today_str()) to `value`; None goes back to the real clock."""
+    global _frozen_now
+    _frozen_now = value
+
+# 📅 The "today" value injected into the prompt (also part of parse cache keys)
+def today_str() -> str:
+    return now().strftime("%A, %Y-%m-%d")
+
+# ✅ Streaming entry point: yields text chunks as Gemini produces them
+async def astream_gemini_chain(user_text: str, today: str = None):
+    async for chunk in get_chain().astream({"input": user_text, "today": today or today_str()}):
+        yield chunk
+
+def _object_closed(extractor, chunk):
+    # Malformed JSON ends the stream like a closed object: the model answered, and the
+    # caller's validation turns the text into a parse error
+    try:
+        return extractor.feed(chunk) is not None
+    except ValueError:
+        return True
+
+def _stream_first_object(chain, route, inputs):
+    started = time.perf_counter()
+    extractor = IncrementalJSONExtractor()
+    parts = []
+    stream = chain.stream(inputs)
+    try:
+        for chunk in stream:
+            parts.append(chunk)
+            if _object_closed(extractor, chunk):
+                break
+    finally:
+        stream.close()
+    latency_stats.record(route, time.perf_counter() - started)
+    return "".join(parts)
+
+async def _astream_first_object(chain, route, inputs, on_chunk=None):
+    started = time.perf_counter()
+    extractor = IncrementalJSONExtractor()
+    parts = []
+    async with aclosing(chain.astream(inputs)) as stream:
+        async for chunk in stream:
+            if on_chunk is not None:
+                on_chunk(chunk)
+            parts.append(chunk)
+            if _object_closed(extractor, chunk):
+                break
+    latency_stats.record(route, time.perf_counter() - started)
+    return "".join(parts)
+
+def _record_error(error):
+    # Only an unreachable, failing or timed-out model counts against the breaker
+    if is_unavailable(error):
+        gemini_breaker.record_failure()
+    else:
+        gemini_breaker.record_ignored()
+
+def _no_fallback():
+    # Primary failing and nowhere to send the call: agent_logic then tries the rule parser
+    return CircuitOpen("gemini", gemini_breaker.retry_after())
+
+# 🛣️ Routing: the primary model (hedged) while its breaker allows, else the fallback model.
+# Returns (output, route).
+def _route(user_text, today):
+    inputs = {"input": user_text, "today": today}
+    if gemini_breaker.allow():
+        started = time.perf_counter()
+        try:
+            output = hedged_call(
+                lambda: gemini_limiter.call(_stream_first_object, get_chain(), "primary", inputs),
+                latency_stats.hedge_delay("primary"), hedge_budget,
+            )
+        except Exception as e:
+            _record_error(e)
+            if get_fallback_chain() is None:
+                raise
+            print(f"⚠️ Gemini primary failed, using the fallback model: {e}")
+        else:
+            gemini_breaker.record_call(time.perf_counter() - started)
+            return output, "primary"
+    fallback = get_fallback_chain()
+    if fallback is None:
+        raise _no_fallback()
+    return fallback_limiter.call(_stream_first_object, fallback, "fallback", inputs), "fallback"
+
+async def _aroute(user_text, today, on_chunk=None):
+    inputs = {"input": user_text, "today": today}
+    if gemini_breaker.allow():
+        chain = get_chain()
+        owner = []
+
+        def attempt(n):
+            sink = on_chunk
+            if on_chunk is not None:
+                # Only the attempt that streams first reaches the caller; the other stops
+                def sink(chunk):
+                    if not owner:
+                        owner.append(n)
+                    if owner[0] != n:
+                        raise LostRace()
+                    on_chunk(chunk)
+            return gemini_limiter.acall(lambda: _astream_first_object(chain, "primary", inputs, sink))
+
+        started = time.perf_counter()
+        try:
+            output = await ahedged_call(attempt, latency_stats.hedge_delay("primary"), hedge_budget)
+        except Exception as e:
+            _record_error(e)
+            if get_fallback_chain() is None:
+                raise
+            print(f"⚠️ Gemini primary failed, using the fallback model: {e}")
+        else:
+            gemini_breaker.record_call(time.perf_counter() - started)
+            return output, "primary"
+    fallback = get_fallback_chain()
+    if fallback is None:
+        raise _no_fallback()
+    output = await fallback_limiter.acall(
+        lambda: _astream_first_object(fallback, "fallback", inputs, on_chunk))
+    return output, "fallback"
+
+# ✅ Entry point: Call this from agent_logic.
+# Output is streamed and generation is cancelled as soon as the first JSON object
+# closes, so trailing chatter costs no tokens or latency.
+# With GEMINI_CASSETTE_MODE=record|replay, calls are recorded to / served from a cassette.
+# Live calls go through gemini_limiter (a persistent 429 raises rate_limit.RateLimited),
+# are hedged past the primary's p95, and move to the fallback model while the primary
+# is unhealthy (llm_routing.py).
+@metrics.timed("llm")
 def run_gemini_chain(user_text: str) -> str:
-    today = datetime.now().strftime("%A, %Y-%m-%d")
-    return chain.invoke({"input": user_text, "today": today})
+    today = today_str()
+    cassette = llm_cassette.get_cassette()
+    if cassette is not None and cassette.replaying:
+        return cassette.replay(user_text, today, prompt_id())
+
+    started = time.perf_counter()
+    output, route = _route(user_text, today)
+    if cassette is not None and route == "primary":
+        cassette.record(user_text, today, prompt_id(), output, time.perf_counter() - started)
+    return output
+
+# ✅ Async entry point; `on_chunk` sees every chunk as it arrives
+@metrics.timed("llm")
+async def arun_gemini_chain(user_text: str, on_chunk=None) -> str:
+    today = today_str()
+    cassette = llm_cassette.get_cassette()
+    if cassette is not None and cassette.replaying:
+        output = await cassette.areplay(user_text, today, prompt_id())
+        if on_chunk is not None:
+            on_chunk(output)
+        return output
+
+    started = time.perf_counter()
+    output, route = await _aroute(user_text, today, on_chunk)
+    if cassette is not None and route == "primary":
+        cassette.record(user_text, today, prompt_id(), output, time.perf_counter() - started)
+    return output
+
+# ✅ Batch entry point: many inputs, bounded concurrency, per-item exceptions.
+# Each item is admitted by gemini_limiter on its own, so a batch cannot overrun the quota.
+@metrics.timed("llm_batch")
+async def arun_gemini_chain_batch(user_texts: list, max_concurrency: int = 8) -> list:
+    today = today_str()
+    cassette = llm_cassette.get_cassette()
+    if cassette is not None and cassette.replaying:
+        async def replay(text):
+            try:
+                return await cassette.areplay(text, today, prompt_id())
+            except llm_cassette.CassetteMiss as e:
+                return e
+        return await asyncio.gather(*(replay(text) for text in user_texts))
+
+    # The whole batch goes to one model: the fallback while the primary's breaker is open
+    primary = gemini_breaker.allow()
+    fallback = None if primary else get_fallback_chain()
+    if not primary and fallback is None:
+        return [_no_fallback() for _ in user_texts]
+    chain, limiter = (get_chain(), gemini_limiter) if primary else (fallback, fallback_limiter)
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def parse(text):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                output = await limiter.acall(lambda: chain.ainvoke({"input": text, "today": today}))
+            except Exception as e:
+                if primary:
+                    _record_error(e)
+                raise
+            if primary:
+                gemini_breaker.record_call(time.perf_counter() - started)
+            return output
+
+    started = time.perf_counter()
+    outputs = await asyncio.gather(*(parse(text) for text in user_texts), return_exceptions=True)
+    if cassette is not None:
+        # Items ran concurrently, so each is recorded with the batch's wall time
+        elapsed = time.perf_counter() - started
+        for text, output in zip(user_texts, outputs):
+            if isinstance(output, str) and fallback is None:
+                cassette.record(text, today, prompt_id(), output, elapsed)
+    return outputs
+
+# ✅ Follow-up entry points (conversation.py): `current` is the booking so far.
+# Primary model only, but still behind gemini_limiter and the circuit breaker.
+def _followup_inputs(current, user_text):
+    return {"input": user_text, "today": today_str(), "current": json.dumps(current, separators=(",", ":"))}
+
+@metrics.timed("llm_followup")
+def run_followup_chain(current: dict, user_text: str) -> str:
+    if not gemini_breaker.allow():
+        raise _no_fallback()
+    started = time.perf_counter()
+    try:
+        output = gemini_limiter.call(
+            _stream_first_object, get_followup_chain(), "followup", _followup_inputs(current, user_text))
+    except Exception as e:
+        _record_error(e)
+        raise
+    gemini_breaker.record_call(time.perf_counter() - started)
+    return output
+
+@metrics.timed("llm_followup")
+async def arun_followup_chain(current: dict, user_text: str) -> str:
+    if not gemini_breaker.allow():
+        raise _no_fallback()
+    chain, inputs = get_followup_chain(), _followup_inputs(current, user_text)
+    started = time.perf_counter()
+    try:
+        output = await gemini_limiter.acall(lambda: _astream_first_object(chain, "followup", inputs))
+    except Exception as e:
+        _record_error(e)
+        raise
+    gemini_breaker.record_call(time.perf_counter() - started)
+    return output
+
+def get_routing_stats() -> dict:
+    return {
+        "latency": latency_stats.summary(),
+        "hedging": hedge_budget.snapshot(),
+        "breaker": gemini_breaker.snapshot(),
+        "fallback_model": GEMINI_FALLBACK_MODEL or (type(_fallback_llm).__name__ if _fallback_llm else None),
+    }
@@ -0,0 +1,85 @@
+# json_extract.py
+# Incremental extraction of the first top-level JSON object from streamed LLM output,
+# plus validation of the booking schema.
+
+import re
+import json
+
+from dateutil.parser import isoparse
+
+EMAIL_RE = re.compile(r"^[\w.+-]+@[\w-]+(?:\.[\w-]+)+$")
+
+
+class IncrementalJSONExtractor:
+    """Feed text chunks; `feed` returns the object as soon as its closing brace arrives."""
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.done = False
+
+    def feed(self, chunk: str):
+        if self.done:
+            return None
+        for char in chunk:
+            if self._depth == 0:
+                # Skip chatter and code fences before the object starts
+                if char != "{":
+                    continue
+                self._depth = 1
+                self._buffer.append(char)
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+                    return json.loads("".join(self._buffer))
+        return None
+
+
+def extract_first_object(text: str):
+    """Whole-string convenience wrapper; returns None when no complete object is found."""
+    return IncrementalJSONExtractor().feed(text)
+
+def validate_booking(obj) -> dict:
+    """Check the {start_time, end_time, invitees} schema; raises ValueError when invalid."""
+    if not isinstance(obj, dict):
+        raise ValueError("Expected a JSON object")
+    if "error" in obj:
+        raise ValueError(str(obj["error"]))
+
+    times = {}
+    for field in ("start_time", "end_time"):
+        value = obj.get(field)
+        if not isinstance(value, str):
+            raise ValueError(f"Missing or invalid {field}")
+        try:
+            times[field] = isoparse(value)
+        except ValueError:
+            raise ValueError(f"{field} is not an ISO datetime: {value!r}")
+    if (times["start_time"].tzinfo is None) != (times["end_time"].tzinfo is None):
+        raise ValueError("start_time and end_time must both have, or both omit, a UTC offset")
+    if times["end_time"] <= times["start_time"]:
+        raise ValueError("end_time must be after start_time")
+
+    invitees = obj.get("invitees") or []
+    if not isinstance(invitees, list):
+        raise ValueError("invitees must be a list")
+    invitees = [email.strip() for email in invitees if isinstance(email, str) and EMAIL_RE.match(email.strip())]
+
+    return {"start_time": obj["start_time"], "end_time": obj["end_time"], "invitees": invitees}
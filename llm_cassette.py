@@ -0,0 +1,111 @@
+# llm_cassette.py
+# Record/replay of Gemini calls, so parser benchmarks are reproducible and run offline.
+# A cassette is JSON lines (gzipped when the path ends in .gz), one recorded call per line.
+
+import os
+import gzip
+import json
+import time
+import asyncio
+import hashlib
+import threading
+
+# ✅ GEMINI_CASSETTE_MODE: off | record | replay
+GEMINI_CASSETTE_MODE = os.getenv("GEMINI_CASSETTE_MODE", "off").lower()
+GEMINI_CASSETTE_PATH = os.getenv("GEMINI_CASSETTE_PATH", "gemini_cassette.jsonl.gz")
+# "recorded" replays each call's own latency; a number replays that many seconds instead
+GEMINI_CASSETTE_LATENCY = os.getenv("GEMINI_CASSETTE_LATENCY", "recorded")
+
+
+class CassetteMiss(LookupError):
+    """Replay mode was asked for a call that was never recorded."""
+
+
+def _open(path, mode):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    def __init__(self, path=GEMINI_CASSETTE_PATH, mode=GEMINI_CASSETTE_MODE, latency=GEMINI_CASSETTE_LATENCY):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with _open(path, "r") as cassette_file:
+                for line in cassette_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    @staticmethod
+    def key(user_text, today, prompt_id):
+        """A prompt or model change gives new keys, so stale recordings are never replayed."""
+        return hashlib.sha256(f"{prompt_id}|{today}|{user_text}".encode()).hexdigest()[:24]
+
+    def lookup(self, user_text, today, prompt_id):
+        """(output, seconds to wait) for a recorded call; raises CassetteMiss otherwise."""
+        entry = self._entries.get(self.key(user_text, today, prompt_id))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            raise CassetteMiss(f"No recorded Gemini call for {user_text!r} (today={today}) in {self.path}")
+        delay = entry["latency"] if self.latency == "recorded" else float(self.latency)
+        return entry["output"], delay
+
+    def replay(self, user_text, today, prompt_id):
+        output, delay = self.lookup(user_text, today, prompt_id)
+        time.sleep(delay)
+        return output
+
+    async def areplay(self, user_text, today, prompt_id):
+        output, delay = self.lookup(user_text, today, prompt_id)
+        await asyncio.sleep(delay)
+        return output
+
+    def record(self, user_text, today, prompt_id, output, latency):
+        key = self.key(user_text, today, prompt_id)
+        entry = {"key": key, "prompt": prompt_id, "today": today, "input": user_text,
+                 "output": output, "latency": round(latency, 4)}
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            with _open(self.path, "a") as cassette_file:
+                cassette_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cassette = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+def get_cassette():
+    """The configured cassette, or None when GEMINI_CASSETTE_MODE is off."""
+    global _cassette, _cassette_loaded
+    if not _cassette_loaded:
+        with _cassette_lock:
+            if not _cassette_loaded:
+                if GEMINI_CASSETTE_MODE != "off":
+                    _cassette = Cassette()
+                _cassette_loaded = True
+    return _cassette
+
+def set_cassette(cassette):
+    """Install a cassette (or None to disable) without going through the environment."""
+    global _cassette, _cassette_loaded
+    _cassette, _cassette_loaded = cassette, True
@@ -0,0 +1,242 @@
+# llm_routing.py
+# Tail-latency and failure handling for LLM calls: per-route latency windows, hedged
+# requests that fire a backup call once the first is slower than the route's p95, and a
+# circuit breaker that sends traffic elsewhere while the primary model is unhealthy.
+
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import asyncio
+
+import metrics
+from rate_limit import RateLimited
+
+# ✅ Hedging: fire a second call once the first is slower than this quantile of recent calls
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "10"))
+# Used until a route has LLM_HEDGE_MIN_SAMPLES latencies
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "3"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# At most this share of calls may be hedged (0 turns hedging off), so a slow model cannot double our load
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "500"))
+
+# ✅ Circuit breaker: open after this many failures in a row (transport errors, timeouts, 5xx
+# and slow calls count; bad output does not), retry after the reset time
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "20"))
+
+
+class CircuitOpen(RateLimited):
+    """The primary model is failing and there is no fallback model; the API answers 503."""
+
+    def __init__(self, dependency, retry_after):
+        super().__init__(dependency, retry_after)
+        self.args = (f"{dependency} is failing; retry after {retry_after:.0f}s",)
+
+
+# 📊 Rolling latency window per route ("primary", "fallback", ...)
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds):
+        with self._lock:
+            self._samples.setdefault(route, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, route, q):
+        with self._lock:
+            samples = sorted(self._samples.get(route, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def count(self, route):
+        with self._lock:
+            return len(self._samples.get(route, ()))
+
+    def hedge_delay(self, route):
+        """The route's recent p95 (LLM_HEDGE_QUANTILE), clamped; a default until there is enough data."""
+        if self.count(route) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY
+        return min(LLM_HEDGE_MAX_DELAY, max(LLM_HEDGE_MIN_DELAY, self.quantile(route, LLM_HEDGE_QUANTILE)))
+
+    def summary(self):
+        with self._lock:
+            routes = list(self._samples)
+        return {
+            route: {
+                "count": self.count(route),
+                "p50_ms": round(self.quantile(route, 0.5) * 1000, 1),
+                "p95_ms": round(self.quantile(route, 0.95) * 1000, 1),
+                "p99_ms": round(self.quantile(route, 0.99) * 1000, 1),
+                "hedge_delay_ms": round(self.hedge_delay(route) * 1000, 1),
+            }
+            for route in routes
+        }
+
+
+# 🔌 closed → (LLM_BREAKER_FAILURES in a row) → open → (LLM_BREAKER_RESET s) → half-open:
+# one trial call, which closes the breaker on success or re-opens it on failure
+class CircuitBreaker:
+    def __init__(self, name, failures=LLM_BREAKER_FAILURES, reset_after=LLM_BREAKER_RESET):
+        self.name = name
+        self.max_failures = failures
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+        metrics.LLM_CIRCUIT_OPEN.labels(name).set_function(lambda: self.state != "closed")
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = "half-open"
+            # A trial that never reported back (e.g. its request was cancelled) is replaced
+            if self.state == "half-open" and (not self._trial_running or time.monotonic() - self._trial_started >= self.reset_after):
+                self._trial_running = True
+                self._trial_started = time.monotonic()
+                return True
+            return False
+
+    def retry_after(self):
+        return max(1.0, self.reset_after - (time.monotonic() - self.opened_at))
+
+    def record_call(self, seconds):
+        """A call that returned; slower than LLM_BREAKER_SLOW_SECONDS still counts against the model."""
+        if seconds > LLM_BREAKER_SLOW_SECONDS:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.max_failures:
+                if self.state != "open":
+                    self.times_opened += 1
+                    print(f"⚠️ {self.name} circuit open after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def record_ignored(self):
+        """A call that failed for a reason that says nothing about the model's health."""
+        with self._lock:
+            self._trial_running = False
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "times_opened": self.times_opened}
+
+
+# 🪙 Share of calls allowed to fire a hedge
+class HedgeBudget:
+    def __init__(self, ratio=LLM_HEDGE_BUDGET):
+        self.ratio = ratio
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def call(self):
+        with self._lock:
+            self.calls += 1
+
+    def take(self):
+        with self._lock:
+            if self.ratio <= 0 or self.hedged + 1 > self.ratio * max(self.calls, 1):
+                return False
+            self.hedged += 1
+        metrics.LLM_HEDGES.labels("fired").inc()
+        return True
+
+    def won(self):
+        with self._lock:
+            self.hedge_wins += 1
+        metrics.LLM_HEDGES.labels("won").inc()
+
+    def snapshot(self):
+        with self._lock:
+            return {"calls": self.calls, "hedged": self.hedged, "hedge_wins": self.hedge_wins, "budget": self.ratio}
+
+
+class LostRace(Exception):
+    """Raised inside a hedged attempt that another attempt has already overtaken."""
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+def hedged_call(attempt, delay, budget):
+    """
+    Run `attempt()` on a worker thread; if it has not finished after `delay` seconds and the
+    budget allows, start a second one and return whichever succeeds first. The loser runs
+    to completion in the background (a sync stream cannot be interrupted from outside).
+    """
+    if budget.ratio <= 0:
+        return attempt()
+    budget.call()
+    first = _hedge_executor.submit(contextvars.copy_context().run, attempt)
+    done, _ = wait([first], timeout=delay)
+    if done or not budget.take():
+        return first.result()
+    second = _hedge_executor.submit(contextvars.copy_context().run, attempt)
+    pending, error = {first, second}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    budget.won()
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+async def ahedged_call(attempt, delay, budget):
+    """
+    Async twin of hedged_call: `attempt(n)` makes attempt number n (0 or 1). The loser is
+    cancelled, which closes its stream so it stops generating.
+    """
+    if budget.ratio <= 0:
+        return await attempt(0)
+    budget.call()
+    tasks = [asyncio.ensure_future(attempt(0))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not budget.take():
+            return await tasks[0]
+        tasks.append(asyncio.ensure_future(attempt(1)))
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is tasks[1]:
+                        budget.won()
+                    return task.result()
+                if not isinstance(task.exception(), LostRace):
+                    error = error or task.exception()
+        raise error or LostRace()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
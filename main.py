@@ -1,17 +1,53 @@
 # backend/main.py
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 
-# ✅ Correct relative imports inside backend/
-from .services.agent_logic import run_langgraph_agent
-from .services.calendar_utils import is_time_slot_free, book_event_at
+import os
+import json
+import math
+import time
+import uuid
+from typing import List, Optional
 
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response as FastAPIResponse
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from fastapi.middleware.cors import CORSMiddleware
 from dateutil.parser import isoparse
-from datetime import timedelta
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+# ✅ Service modules live next to this file
+from auth_tokens import new_state, state_user, issue_token, token_user
+from agent_logic import warm_up, is_ready, get_parser_stats
+from booking_pipeline import (
+    abook_from_text_once, abook_batch, abook_at_slot, astream_booking, get_booking_flight_stats,
+    ParseError, IdempotencyConflict, MEETING_MINUTES,
+)
+from booking_jobs import get_booking_queue, QueueFull
+from conversation import get_conversation, reset_conversation, get_conversation_stats
+from calendar_utils import is_authenticated, health_check, get_auth_url, exchange_code_for_token
+from credential_store import DEFAULT_USER, start_background_refresh
+from metrics import request_id, new_request_id, observe_request
+from rate_limit import RateLimited, limiter_stats
+from gemini_chain import get_routing_stats
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+# Whose calendar a request without a bearer token uses; set it empty to require a token
+ANONYMOUS_USER = os.getenv("ANONYMOUS_USER", DEFAULT_USER)
+
 
-app = FastAPI(title="TailorTalk AI API")
+# 🔥 Compile the LangGraph and build the Gemini client once, before serving traffic
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(warm_up)
+    start_background_refresh()
+    # Queued bookings (POST /bookings); also resumes jobs left over in the durable store
+    await run_in_threadpool(get_booking_queue().start)
+    yield
+    await run_in_threadpool(get_booking_queue().stop)
+
+app = FastAPI(title="TailorTalk AI API", lifespan=lifespan)
 
 # Allow all origins for dev
 app.add_middleware(
@@ -22,9 +58,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 🧭 Request id (from X-Request-ID or generated) for every span, plus per-route latency
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    rid = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id.set(rid)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        route = request.scope.get("route")
+        observe_request(route.path if route else "unmatched", status, time.perf_counter() - started)
+        request_id.reset(token)
+    response.headers["X-Request-ID"] = rid
+    return response
+
+# 🔐 The caller's user_id comes from the bearer token issued by POST /auth/callback, never the request
+def _bearer_user(authorization: Optional[str]):
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    user_id = token_user(token) if scheme.lower() == "bearer" else None
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user_id
+
+def current_user(authorization: Optional[str] = Header(None)):
+    user_id = _bearer_user(authorization) or ANONYMOUS_USER
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return user_id
+
 # 📦 Input Model
 class BookingRequest(BaseModel):
     user_input: str
+    session_id: Optional[str] = None  # follow-ups in a session keep the earlier fields (not used by /bookings)
 
 # 📦 Output Model
 class BookingResponse(BaseModel):
@@ -33,39 +104,203 @@ class BookingResponse(BaseModel):
     start_time: str = None
     end_time: str = None
     calendar_link: str = None
+    previous_booking: Optional[dict] = None  # in a conversation: the earlier turn's event, still booked
+
+# 📦 Bulk booking models
+class BatchBookingRequest(BaseModel):
+    user_inputs: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+class BatchBookingResponse(BaseModel):
+    results: List[BookingResponse]
+
+# 📦 Book an exact start time (e.g. a suggested alternate)
+class SlotBookingRequest(BaseModel):
+    start_time: str
+    description: str = "Meeting"
+    invitees: List[str] = []
+    duration_minutes: int = Field(MEETING_MINUTES, gt=0, le=24 * 60)  # keep the parsed meeting's length
+
+
+# 📦 Queued booking job, as reported by GET /bookings/{id}
+class BookingJob(BaseModel):
+    id: str
+    status: str  # queued | running | succeeded | failed
+    user_input: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[BookingResponse] = None
+    error: Optional[dict] = None  # {"status": http status, "detail": message}
+
+
+# 🩺 Readiness probe: only ready once the agent runtime is warm
+@app.get("/ready")
+def ready():
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="Agent runtime is warming up")
+    return {"ready": True}
+
+# 🩺 Calendar status for the UI (no Calendar API call)
+@app.get("/health")
+async def health(user_id: str = Depends(current_user)):
+    return {
+        "ready": is_ready(),
+        "authenticated": is_authenticated(user_id),
+        "calendar": await run_in_threadpool(health_check, user_id),
+    }
+
+# 🔐 Google authorisation, so a thin client (TAILORTALK_API_URL) stores the token here.
+# The user is bound to the signed OAuth `state`, so the callback cannot name someone else.
+class AuthCodeRequest(BaseModel):
+    code: str
+    state: str
+
+@app.get("/auth/url")
+def auth_url(authorization: Optional[str] = Header(None)):
+    # Re-authorising keeps the token's user; otherwise the anonymous user, or a new one
+    user_id = _bearer_user(authorization) or ANONYMOUS_USER or uuid.uuid4().hex
+    return {"auth_url": get_auth_url(new_state(user_id))}
+
+@app.post("/auth/callback")
+def auth_callback(request: AuthCodeRequest):
+    user_id = state_user(request.state)
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="Authorisation failed: invalid or expired state")
+    try:
+        exchange_code_for_token(request.code, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Authorisation failed: {str(e)}")
+    return {"authenticated": is_authenticated(user_id), "token": issue_token(user_id)}
+
+# 📈 Prometheus scrape endpoint (stage latencies, tokens, cache and pool hit ratios)
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# 📊 How much traffic the parse cache and rule parser take off Gemini
+@app.get("/stats/parser")
+def parser_stats():
+    return {
+        **get_parser_stats(),
+        "book_single_flight": get_booking_flight_stats(),
+        "conversation": get_conversation_stats(),
+    }
+
+# 🚦 Live Gemini/Calendar limits: concurrency limit, in flight, queued, throttles
+@app.get("/stats/limits")
+def limits_stats():
+    return limiter_stats()
+
+@app.get("/stats/llm")
+def llm_stats():
+    return get_routing_stats()
+
+# Gemini or Calendar kept answering 429: tell the client when to come back
+def _rate_limited(e: RateLimited):
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
 
 
 @app.post("/book", response_model=BookingResponse)
-def book_meeting(request: BookingRequest):
-    parsed = run_langgraph_agent(request.user_input)
+async def book_meeting(request: BookingRequest, idempotency_key: Optional[str] = Header(None),
+                       user_id: str = Depends(current_user)):
+    # Fully async: Gemini via ainvoke, Calendar on its own bounded executor.
+    # Duplicates (double clicks, retries) share one booking; see abook_from_text_once.
+    try:
+        return BookingResponse(**await abook_from_text_once(
+            request.user_input, user_id, idempotency_key, request.session_id))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RateLimited as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 📡 Server-Sent Events: parsed fields, availability (+ alternates), then the booking
+async def _booking_events(user_input: str, user_id: str, session_id: Optional[str]):
+    try:
+        async for event, data in astream_booking(user_input, user_id, session_id):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    except RateLimited as e:
+        yield f"event: error\ndata: {json.dumps({'status': 503, 'detail': str(e), 'retry_after': e.retry_after})}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'status': 500, 'detail': str(e)})}\n\n"
+    yield "event: done\ndata: {}\n\n"
 
-    if "error" in parsed:
-        raise HTTPException(status_code=400, detail=parsed["error"])
+def _event_stream(user_input: str, user_id: str, session_id: Optional[str] = None):
+    return StreamingResponse(
+        _booking_events(user_input, user_id, session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
+@app.get("/book/stream")
+async def book_stream_get(user_input: str, session_id: Optional[str] = None, user_id: str = Depends(current_user)):
+    return _event_stream(user_input, user_id, session_id)
+
+@app.post("/book/stream")
+async def book_stream_post(request: BookingRequest, user_id: str = Depends(current_user)):
+    return _event_stream(request.user_input, user_id, request.session_id)
+
+# 💬 What a conversation has filled in so far, and starting it over
+@app.get("/conversations/{session_id}")
+def conversation_state(session_id: str, user_id: str = Depends(current_user)):
+    booking = get_conversation(session_id, user_id)
+    if booking is None:
+        raise HTTPException(status_code=404, detail="No conversation for this session")
+    return booking
+
+@app.delete("/conversations/{session_id}", status_code=204)
+def conversation_reset(session_id: str, user_id: str = Depends(current_user)):
+    reset_conversation(session_id, user_id)
+
+# 📦 Book many meetings at once; results are reported per item, in input order
+@app.post("/book/batch", response_model=BatchBookingResponse)
+async def book_batch(request: BatchBookingRequest, user_id: str = Depends(current_user)):
     try:
-        start = isoparse(parsed["start_time"])
-        end = isoparse(parsed["end_time"])
-        invitees = parsed.get("invitees", [])
-
-        if not is_time_slot_free(start.isoformat(), end.isoformat()):
-            return BookingResponse(
-                success=False,
-                message="Time slot is already booked. Try another.",
-            )
-
-        result = book_event_at(start, 30, request.user_input, invitees)
-
-        return BookingResponse(
-            success=True,
-            message="Meeting booked successfully!",
-            start_time=result["start"],
-            end_time=result["end"],
-            calendar_link=result["link"]
-        )
+        results = await abook_batch(request.user_inputs, user_id)
+    except RateLimited as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return BatchBookingResponse(results=[BookingResponse(**result) for result in results])
 
+@app.post("/book/slot", response_model=BookingResponse)
+async def book_slot(request: SlotBookingRequest, user_id: str = Depends(current_user)):
+    try:
+        start = isoparse(request.start_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid start_time: {request.start_time}")
+    try:
+        return BookingResponse(**await abook_at_slot(
+            start, request.invitees, request.description, user_id, request.duration_minutes))
+    except RateLimited as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 📥 Queued mode: accept now, book in the worker pool, poll GET /bookings/{id}
+@app.post("/bookings", response_model=BookingJob, status_code=202)
+def submit_booking(request: BookingRequest, response: FastAPIResponse, idempotency_key: Optional[str] = Header(None),
+                   user_id: str = Depends(current_user)):
+    try:
+        job = get_booking_queue().submit(request.user_input, user_id, idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    response.headers["Location"] = f"/bookings/{job['id']}"
+    return BookingJob(**job)
+
+@app.get("/bookings/{job_id}", response_model=BookingJob)
+def booking_status(job_id: str, user_id: str = Depends(current_user)):
+    # Another user's job is reported as unknown, not forbidden, so ids cannot be probed
+    job = get_booking_queue().get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown booking job")
+    return BookingJob(**job)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
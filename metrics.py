@@ -0,0 +1,126 @@
+# metrics.py
+# Per-stage latency histograms, counters and trace spans for the booking pipeline.
+# Prometheus text format is served on /metrics by main.py; spans also go to
+# OpenTelemetry when it is installed and configured.
+
+import os
+import time
+import uuid
+import asyncio
+import functools
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+try:
+    from opentelemetry import trace as _otel_trace
+    _tracer = _otel_trace.get_tracer("tailortalk")
+except ImportError:  # spans are still timed and counted, just not exported
+    _tracer = None
+
+# ✅ Print one line per finished span (request id, stage, duration)
+TRACE_SPANS = os.getenv("TRACE_SPANS", "").lower() in ("1", "true", "yes")
+
+# 🧵 Set per API request; copied into executor threads so Calendar calls carry it too
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+# 📊 Metrics
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "tailortalk_stage_seconds", "Time spent in each booking pipeline stage", ["stage"], buckets=_LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter("tailortalk_stage_errors_total", "Stages that raised", ["stage"])
+REQUEST_SECONDS = Histogram(
+    "tailortalk_request_seconds", "HTTP request latency (time to first byte for streams)", ["route"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUESTS = Counter("tailortalk_requests_total", "HTTP requests", ["route", "status"])
+LLM_TOKENS = Counter("tailortalk_llm_tokens_total", "Gemini tokens used", ["kind"])
+PARSE_ROUTES = Counter("tailortalk_parse_route_total", "Which path answered each parse", ["route"])
+CONVERSATION_TURNS = Counter("tailortalk_conversation_turns_total", "Conversation turns by how they were parsed", ["route"])
+SINGLE_FLIGHT = Counter(
+    "tailortalk_single_flight_total", "Calls run, joined in flight, or answered from stored results",
+    ["name", "outcome"],
+)
+SLOT_RESERVATIONS = Counter(
+    "tailortalk_slot_reservations_total", "Slot reservations granted, refused, confirmed or released", ["outcome"],
+)
+LIMITER_LIMIT = Gauge("tailortalk_limiter_concurrency_limit", "Current adaptive concurrency limit", ["dependency"])
+LIMITER_IN_FLIGHT = Gauge("tailortalk_limiter_in_flight", "Calls currently running", ["dependency"])
+LIMITER_WAITING = Gauge("tailortalk_limiter_waiting", "Calls queued for the limiter", ["dependency"])
+LIMITER_THROTTLED = Counter("tailortalk_limiter_throttled_total", "Rate-limit (429) responses", ["dependency"])
+LLM_HEDGES = Counter("tailortalk_llm_hedges_total", "Backup LLM calls fired, and how many of them won", ["outcome"])
+LLM_CIRCUIT_OPEN = Gauge("tailortalk_llm_circuit_open", "1 while the model's circuit breaker is open or half-open", ["model"])
+
+def observe_request(route, status, seconds):
+    REQUESTS.labels(route, str(status)).inc()
+    REQUEST_SECONDS.labels(route).observe(seconds)
+
+def record_tokens(input_tokens=0, output_tokens=0):
+    if input_tokens:
+        LLM_TOKENS.labels("input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels("output").inc(output_tokens)
+
+def hit_ratio(hits, misses):
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+def gauge(name, documentation, fn):
+    """A gauge read from `fn` at scrape time (cache and pool hit ratios)."""
+    metric = Gauge(name, documentation)
+    metric.set_function(fn)
+    return metric
+
+
+_span_listeners = []
+
+def add_span_listener(callback):
+    """callback(stage, seconds, request_id) for every finished span (e.g. the load-test harness)."""
+    _span_listeners.append(callback)
+
+# 🧭 Spans: time a stage, count its failures and tag it with the request id
+@contextmanager
+def span(stage, **attributes):
+    rid = request_id.get()
+    otel = (
+        _tracer.start_as_current_span(stage, attributes={"request_id": rid, **attributes})
+        if _tracer is not None else nullcontext()
+    )
+    started = time.perf_counter()
+    with otel:
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(stage).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            STAGE_SECONDS.labels(stage).observe(elapsed)
+            for callback in _span_listeners:
+                callback(stage, elapsed, rid)
+            if TRACE_SPANS:
+                print(f"🧭 [{rid}] {stage} {elapsed * 1000:.1f} ms")
+
+def timed(stage):
+    """Decorator form of `span` for plain and async functions."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,144 @@
+# parse_cache.py
+# Bounded LRU/TTL cache for parsed booking requests, with an optional shared SQLite tier.
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# ✅ Cache tuning
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "1024"))
+PARSE_CACHE_TTL = float(os.getenv("PARSE_CACHE_TTL", "86400"))
+PARSE_CACHE_DB = os.getenv("PARSE_CACHE_DB")  # e.g. "parse_cache.db" to share across workers
+
+
+def normalise(user_input):
+    return re.sub(r"\s+", " ", user_input).strip().lower()
+
+def make_key(user_input, today):
+    """Relative dates ("tomorrow at 5") depend on the day, so it is part of the key."""
+    return f"{today}|{normalise(user_input)}"
+
+
+class LRUTTLCache:
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ParseCache(LRUTTLCache):
+    """In-memory LRU in front of an optional SQLite file shared by all workers."""
+
+    def __init__(self, max_entries=PARSE_CACHE_SIZE, ttl_seconds=PARSE_CACHE_TTL, db_path=PARSE_CACHE_DB):
+        super().__init__(max_entries, ttl_seconds)
+        self.db_path = db_path
+        self.disk_hits = 0
+        self._local = threading.local()
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS parse_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _disk_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        value = super().get(key)
+        if value is not None or not self.db_path:
+            return value
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM parse_cache WHERE key = ?", (self._disk_key(key),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"❌ Parse cache read failed: {e}")
+            return None
+        # Disk rows use wall-clock expiry since they are shared between processes
+        if row is None or row[1] <= time.time():
+            return None
+        value = json.loads(row[0])
+        super().set(key, value)
+        with self._lock:
+            self.misses -= 1
+            self.hits += 1
+            self.disk_hits += 1
+        return value
+
+    def set(self, key, value):
+        super().set(key, value)
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (self._disk_key(key), json.dumps(value), time.time() + self.ttl_seconds),
+                )
+                conn.execute("DELETE FROM parse_cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"❌ Parse cache write failed: {e}")
+
+    def stats(self):
+        stats = super().stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
@@ -0,0 +1,275 @@
+# rate_limit.py
+# One adaptive limiter per external dependency (Gemini, Calendar): a token bucket for the
+# known quota, an AIMD concurrency limit that halves on 429s and shrinks when latency goes
+# over target, and Retry-After aware retries with jitter. Per process.
+
+import re
+import time
+import random
+import asyncio
+import threading
+
+import metrics
+
+# Concurrency is cut at most once per this many seconds, so a burst of 429s from calls
+# that were already in flight counts as one signal
+DECREASE_COOLDOWN = 1.0
+
+_RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "RESOURCE_EXHAUSTED", "Resource has been exhausted")
+_RETRY_HINTS = (
+    re.compile(r"retry in ([0-9.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_?delay[^0-9]*([0-9.]+)", re.IGNORECASE),
+)
+
+
+class RateLimited(Exception):
+    """A dependency kept answering 429 (or asked us to wait too long); try again after `retry_after` seconds."""
+
+    def __init__(self, dependency, retry_after):
+        super().__init__(f"{dependency} is rate limited; retry after {retry_after:.0f}s")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+def _status_and_headers(exc):
+    resp = getattr(exc, "resp", None)  # googleapiclient HttpError (httplib2 response)
+    if resp is not None and getattr(resp, "status", None):
+        return int(resp.status), resp
+    response = getattr(exc, "response", None)  # google-genai / httpx / requests
+    status = getattr(exc, "code", None) or getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    try:
+        status = int(status) if status is not None else None
+    except (TypeError, ValueError):
+        status = None
+    return status, getattr(response, "headers", None) or {}
+
+def throttle_delay(exc):
+    """
+    None if `exc` is not a rate-limit response; otherwise the server's Retry-After hint in
+    seconds (0.0 when there is none). Looks through wrapped causes, since LangChain
+    re-raises SDK errors.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        status, headers = _status_and_headers(exc)
+        text = str(exc)
+        if status == 429 or (status == 403 and "ateLimitExceeded" in text) or any(r in text for r in _RATE_LIMIT_REASONS):
+            retry_after = headers.get("retry-after") or headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return max(0.0, float(retry_after))
+                except ValueError:
+                    pass
+            for hint in _RETRY_HINTS:
+                match = hint.search(text)
+                if match:
+                    return float(match.group(1))
+            return 0.0
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+# Exception classes (or their bases) from HTTP clients and SDKs that mean "not reached"
+# or "no answer in time", matched by name so no client library has to be imported
+_UNAVAILABLE_TYPES = ("ConnectionError", "TransportError", "Timeout", "TimeoutError", "DeadlineExceeded", "ServiceUnavailable")
+
+def is_unavailable(exc):
+    """
+    True for transport errors, timeouts and 5xx answers: the dependency is down, not the
+    request or its output. Looks through wrapped causes like throttle_delay.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+            return True
+        if any(cls.__name__ in _UNAVAILABLE_TYPES for cls in type(exc).__mro__):
+            return True
+        status, _ = _status_and_headers(exc)
+        if status is not None and 500 <= status < 600:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class AdaptiveLimiter:
+    """
+    `call(fn)` / `await acall(factory)` run a request once the token bucket (`rate`
+    requests/second, `burst` deep; 0 disables it) and the concurrency limit allow.
+    The limit grows by about one per round of successful calls up to `max_concurrency`,
+    halves on a 429 and shrinks by 10% on calls slower than `latency_target`. A 429 is
+    retried up to `max_retries` times after its Retry-After (or exponential backoff), with
+    jitter, and pauses new calls for that long; a hint longer than `max_wait` is not
+    waited out but raised as RateLimited, as is the last failed retry.
+    """
+
+    def __init__(self, name, rate=0.0, burst=None, max_concurrency=16, min_concurrency=1,
+                 latency_target=0.0, max_retries=3, backoff=0.5, max_wait=10.0):
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self.stats = {"calls": 0, "throttled": 0, "retries": 0, "rejected": 0, "slow": 0}
+        _limiters[name] = self
+        metrics.LIMITER_LIMIT.labels(name).set_function(lambda: self.limit)
+        metrics.LIMITER_IN_FLIGHT.labels(name).set_function(lambda: self._in_flight)
+        metrics.LIMITER_WAITING.labels(name).set_function(lambda: self._waiting)
+
+    # 🎟️ Admission: 0 when a slot was taken, else seconds to wait (None: until a release)
+    def _try_acquire(self):
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self.limit):
+            return None
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self._in_flight += 1
+        self.stats["calls"] += 1
+        return 0
+
+    def acquire(self):
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    wait = self._try_acquire()
+                    if wait == 0:
+                        return
+                    self._cond.wait(1.0 if wait is None else wait)
+            finally:
+                self._waiting -= 1
+
+    async def aacquire(self):
+        # Polls rather than blocking the event loop on the (thread) condition
+        with self._cond:
+            self._waiting += 1
+        try:
+            poll = 0.005
+            while True:
+                with self._cond:
+                    wait = self._try_acquire()
+                if wait == 0:
+                    return
+                await asyncio.sleep(min(poll if wait is None else wait, 1.0))
+                poll = min(poll * 2, 0.1)
+        finally:
+            with self._cond:
+                self._waiting -= 1
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._last_decrease >= DECREASE_COOLDOWN:
+            self.limit = max(self.min_concurrency, self.limit * factor)
+            self._last_decrease = now
+
+    def release(self, seconds=None, retry_after=None):
+        """`seconds`: latency of a completed call; `retry_after`: the call was throttled."""
+        with self._cond:
+            self._in_flight -= 1
+            if retry_after is not None:
+                self.stats["throttled"] += 1
+                metrics.LIMITER_THROTTLED.labels(self.name).inc()
+                self._decrease(0.5)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + min(retry_after, self.max_wait))
+            elif seconds is not None:
+                if self.latency_target and seconds > self.latency_target:
+                    self.stats["slow"] += 1
+                    self._decrease(0.9)
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _retry_wait(self, attempt, retry_after):
+        """Seconds to sleep before retry `attempt`, or None to give up with RateLimited."""
+        if attempt >= self.max_retries or (retry_after or 0) > self.max_wait:
+            with self._cond:
+                self.stats["rejected"] += 1
+            return None
+        with self._cond:
+            self.stats["retries"] += 1
+        if retry_after:
+            return retry_after + random.uniform(0, 0.1 * retry_after + self.backoff)
+        return random.uniform(0, min(self.max_wait, self.backoff * 2 ** attempt))  # full jitter
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                retry_after = throttle_delay(e) if isinstance(e, Exception) else None
+                self.release(retry_after=retry_after)
+                if retry_after is None:
+                    raise
+                wait = self._retry_wait(attempt, retry_after)
+                if wait is None:
+                    raise RateLimited(self.name, retry_after or self.backoff * 2 ** attempt) from e
+                time.sleep(wait)
+                attempt += 1
+                continue
+            self.release(seconds=time.monotonic() - started)
+            return result
+
+    async def acall(self, factory):
+        """`factory()` returns a fresh awaitable for each attempt."""
+        attempt = 0
+        while True:
+            await self.aacquire()
+            started = time.monotonic()
+            try:
+                result = await factory()
+            except BaseException as e:
+                retry_after = throttle_delay(e) if isinstance(e, Exception) else None
+                self.release(retry_after=retry_after)
+                if retry_after is None:
+                    raise
+                wait = self._retry_wait(attempt, retry_after)
+                if wait is None:
+                    raise RateLimited(self.name, retry_after or self.backoff * 2 ** attempt) from e
+                await asyncio.sleep(wait)
+                attempt += 1
+                continue
+            self.release(seconds=time.monotonic() - started)
+            return result
+
+    def snapshot(self):
+        with self._cond:
+            paused = max(0.0, self._paused_until - time.monotonic())
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "rate_per_s": self.rate or None,
+                "tokens": round(self._tokens, 2) if self.rate else None,
+                "paused_s": round(paused, 2),
+                **self.stats,
+            }
+
+
+_limiters = {}
+
+def limiter_stats():
+    """Live limits and queue depth of every limiter, for /stats/limits."""
+    return {name: limiter.snapshot() for name, limiter in _limiters.items()}
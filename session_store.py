@@ -0,0 +1,142 @@
+# session_store.py
+# Chat sessions for the Streamlit UI: append-only messages in SQLite, indexed by user,
+# loaded a page at a time, with old sessions evicted.
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# ✅ Store settings
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+SESSION_MAX_PER_USER = int(os.getenv("SESSION_MAX_PER_USER", "50"))
+SESSION_MAX_AGE_DAYS = float(os.getenv("SESSION_MAX_AGE_DAYS", "30"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+
+
+class SessionStore:
+    def __init__(self, db_path=SESSION_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            # Must be set before the first table exists so evictions can give space back
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT NOT NULL, title TEXT NOT NULL, "
+                "preview TEXT NOT NULL DEFAULT '', message_count INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user, updated_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "session_id INTEGER NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+                "content TEXT NOT NULL, extra TEXT, created_at REAL NOT NULL, "
+                "PRIMARY KEY (session_id, seq))"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create_session(self, user, title):
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO sessions (user, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (user, title, now, now),
+            )
+        self.evict(user)
+        return cursor.lastrowid
+
+    def get_session(self, session_id):
+        row = self._connect().execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_sessions(self, user, limit=20, offset=0):
+        """Newest first; only the index row, never the messages."""
+        rows = self._connect().execute(
+            "SELECT * FROM sessions WHERE user = ? ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+            (user, limit, offset),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # ✍️ One insert per message; earlier messages are never rewritten
+    def append_message(self, session_id, message):
+        extra = {k: v for k, v in message.items() if k not in ("role", "content")}
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # seq is read and written in one transaction
+            seq = conn.execute(
+                "SELECT message_count FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO messages (session_id, seq, role, content, extra, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, seq, message["role"], message["content"], json.dumps(extra) if extra else None, now),
+            )
+            conn.execute(
+                "UPDATE sessions SET message_count = ?, updated_at = ?, "
+                "preview = CASE WHEN preview = '' THEN ? ELSE preview END WHERE id = ?",
+                (seq + 1, now, message["content"][:100], session_id),
+            )
+        return seq
+
+    def load_messages(self, session_id, limit=HISTORY_PAGE_SIZE, before=None):
+        """The `limit` messages before sequence number `before` (default: the latest), oldest first."""
+        if before is None:
+            before = float("inf")
+        rows = self._connect().execute(
+            "SELECT seq, role, content, extra FROM messages WHERE session_id = ? AND seq < ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (session_id, before, limit),
+        ).fetchall()
+        messages = []
+        for row in reversed(rows):
+            message = {"role": row["role"], "content": row["content"], "seq": row["seq"]}
+            if row["extra"]:
+                message.update(json.loads(row["extra"]))
+            messages.append(message)
+        return messages
+
+    def delete_session(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    # 🧹 Keep the newest sessions per user and drop anything idle for too long
+    def evict(self, user=None, max_sessions=SESSION_MAX_PER_USER, max_age_days=SESSION_MAX_AGE_DAYS):
+        conn = self._connect()
+        cutoff = time.time() - max_age_days * 86400
+        stale = [row[0] for row in conn.execute("SELECT id FROM sessions WHERE updated_at < ?", (cutoff,))]
+        users = [user] if user is not None else [row[0] for row in conn.execute("SELECT DISTINCT user FROM sessions")]
+        for name in users:
+            stale += [row[0] for row in conn.execute(
+                "SELECT id FROM sessions WHERE user = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?",
+                (name, max_sessions),
+            )]
+        stale = set(stale)
+        if not stale:
+            return 0
+        with conn:
+            conn.executemany("DELETE FROM messages WHERE session_id = ?", [(i,) for i in stale])
+            conn.executemany("DELETE FROM sessions WHERE id = ?", [(i,) for i in stale])
+        conn.execute("PRAGMA incremental_vacuum")
+        return len(stale)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore()
+    return _store
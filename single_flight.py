@@ -0,0 +1,68 @@
+# single_flight.py
+# Coalesce concurrent identical async calls into one execution, and keep finished
+# results for a while so retries carrying the same idempotency key get the same answer.
+
+import os
+import copy
+import asyncio
+import functools
+
+import metrics
+from parse_cache import LRUTTLCache
+
+# ✅ How many finished results to keep, and for how long (seconds)
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request."""
+
+
+class SingleFlight:
+    """
+    `run(key, factory)` starts `factory()` once per key; concurrent callers await the
+    same task. With `remember=True` a successful result is kept for `ttl` seconds and
+    handed to later callers too. Failures are never kept, so a retry runs again.
+    Coalescing is per event loop (per worker process).
+    """
+
+    def __init__(self, name, max_entries=IDEMPOTENCY_MAX_ENTRIES, ttl=IDEMPOTENCY_TTL):
+        self.name = name
+        self.results = LRUTTLCache(max_entries, ttl)
+        self._inflight = {}  # key -> (fingerprint, task)
+        self.stats = {"executed": 0, "coalesced": 0, "replayed": 0}
+
+    def _count(self, outcome):
+        self.stats[outcome] += 1
+        metrics.SINGLE_FLIGHT.labels(self.name, outcome).inc()
+
+    async def run(self, key, factory, fingerprint=None, remember=True):
+        stored = self.results.get(key)
+        if stored is not None:
+            stored_fingerprint, result = stored
+            if stored_fingerprint != fingerprint:
+                raise IdempotencyConflict("This idempotency key was already used for a different request")
+            self._count("replayed")
+            return copy.deepcopy(result)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if inflight[0] != fingerprint:
+                raise IdempotencyConflict("This idempotency key is in use by a different request")
+            self._count("coalesced")
+            task = inflight[1]
+        else:
+            # Its own task, so a caller disconnecting does not cancel the shared work
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = (fingerprint, task)
+            task.add_done_callback(functools.partial(self._finish, key, fingerprint, remember))
+            self._count("executed")
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _finish(self, key, fingerprint, remember, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if remember:
+            self.results.set(key, (fingerprint, task.result()))
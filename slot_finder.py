@@ -0,0 +1,93 @@
+# slot_finder.py
+# Common free-slot search across many calendars using minute-resolution bitmaps.
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+
+def _minute_floor(value):
+    return value.replace(second=0, microsecond=0)
+
+def _working_mask(window_start, n_minutes, tz, work_start_hour, work_end_hour, workdays):
+    """Boolean array marking the minutes that fall inside working hours in `tz`."""
+    mask = np.zeros(n_minutes, dtype=bool)
+    local_day = window_start.astimezone(tz).date()
+    last_day = (window_start + timedelta(minutes=n_minutes)).astimezone(tz).date()
+    while local_day <= last_day:
+        if local_day.weekday() in workdays:
+            day_start = datetime(local_day.year, local_day.month, local_day.day, work_start_hour, tzinfo=tz)
+            day_end = datetime(local_day.year, local_day.month, local_day.day, work_end_hour, tzinfo=tz)
+            lo = int((day_start - window_start).total_seconds() // 60)
+            hi = int((day_end - window_start).total_seconds() // 60)
+            mask[max(lo, 0):max(min(hi, n_minutes), 0)] = True
+        local_day += timedelta(days=1)
+    return mask
+
+def free_bitmap(busy_by_calendar, window_start, n_minutes):
+    """
+    Minutes where every calendar is free.
+
+    Intersecting per-calendar free bitmaps is the same as asking where the busy
+    coverage count over all calendars is zero, so one difference array does it.
+    """
+    base = window_start.timestamp()
+    starts, ends = [], []
+    for spans in busy_by_calendar.values():
+        for start, end in spans:
+            starts.append(start.timestamp())
+            ends.append(end.timestamp())
+    if not starts:
+        return np.ones(n_minutes, dtype=bool)
+
+    # Partially covered minutes count as busy
+    starts = np.clip(np.floor((np.asarray(starts) - base) / 60).astype(np.int64), 0, n_minutes)
+    ends = np.clip(np.ceil((np.asarray(ends) - base) / 60).astype(np.int64), 0, n_minutes)
+    diff = np.bincount(starts, minlength=n_minutes + 1) - np.bincount(ends, minlength=n_minutes + 1)
+    return np.cumsum(diff[:n_minutes]) == 0
+
+def find_common_slots(busy_by_calendar, window_start, window_end, duration_minutes=30, top_k=3,
+                      step_minutes=30, tz="UTC", work_start_hour=9, work_end_hour=18,
+                      workdays=(0, 1, 2, 3, 4), preferred_start=None):
+    """
+    Return up to `top_k` non-overlapping (start, end) slots where every calendar is free.
+
+    busy_by_calendar: {calendar_id: [(start, end), ...]} with aware datetimes.
+    Slots start on `step_minutes` boundaries inside working hours. They are the earliest
+    ones, or the ones closest to `preferred_start` when it is given.
+    """
+    tz = ZoneInfo(tz) if isinstance(tz, str) else tz
+    window_start = _minute_floor(window_start if window_start.tzinfo else window_start.replace(tzinfo=tz))
+    window_end = window_end if window_end.tzinfo else window_end.replace(tzinfo=tz)
+    n_minutes = int((window_end - window_start).total_seconds() // 60)
+    if n_minutes < duration_minutes:
+        return []
+
+    allowed = free_bitmap(busy_by_calendar, window_start, n_minutes)
+    allowed &= _working_mask(window_start, n_minutes, tz, work_start_hour, work_end_hour, workdays)
+
+    # A start minute fits when the next `duration_minutes` are all allowed
+    runs = np.concatenate(([0], np.cumsum(allowed, dtype=np.int32)))
+    fits = (runs[duration_minutes:] - runs[:-duration_minutes]) == duration_minutes
+    epoch_minute = int(window_start.timestamp() // 60)
+    aligned = (np.arange(fits.size) + epoch_minute) % step_minutes == 0
+    candidates = np.flatnonzero(fits & aligned)
+
+    if preferred_start is not None:
+        preferred = preferred_start if preferred_start.tzinfo else preferred_start.replace(tzinfo=tz)
+        offset = (preferred - window_start).total_seconds() // 60
+        candidates = candidates[np.argsort(np.abs(candidates - offset), kind="stable")]
+
+    picked = []
+    for minute in candidates:
+        if all(abs(minute - other) >= duration_minutes for other in picked):
+            picked.append(int(minute))
+            if len(picked) == top_k:
+                break
+
+    return [
+        ((window_start + timedelta(minutes=m)).astimezone(tz),
+         (window_start + timedelta(minutes=m + duration_minutes)).astimezone(tz))
+        for m in sorted(picked)
+    ]
@@ -1,13 +1,36 @@
 import streamlit as st
-from agent_logic import run_langgraph_agent
-from calendar_utils import is_time_slot_free, book_event_at
+from api_client import get_api_client
+from credential_store import DEFAULT_USER
+from session_store import get_session_store, HISTORY_PAGE_SIZE
 from dateutil.parser import isoparse
 from datetime import timedelta
+import html
 import json
 import os
 
 st.set_page_config(page_title="TailorTalk AI", layout="wide")
 
+# 🌐 With TAILORTALK_API_URL set, the UI is a thin client of main.py and runs no pipeline itself
+api_client = get_api_client()
+
+if api_client is None:
+    from agent_logic import warm_up
+    from calendar_utils import (
+        is_time_slot_free, book_event_at, suggest_slots, is_authenticated, health_check,
+        get_auth_url, exchange_code_for_token,
+    )
+    from conversation import run_conversation_turn, record_booked
+    from credential_store import start_background_refresh
+    from slot_reservations import reserve_slot
+
+    # 🔥 Compile the agent graph and Gemini client once per server process
+    @st.cache_resource
+    def get_agent_runtime():
+        start_background_refresh()
+        return warm_up()
+
+    get_agent_runtime()
+
 # 🧠 Chat history state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -18,33 +41,229 @@ if "options" not in st.session_state:
 if "last_input" not in st.session_state:
     st.session_state.last_input = ""
 
-if "chat_sessions" not in st.session_state:
-    st.session_state.chat_sessions = []
+if "last_invitees" not in st.session_state:
+    st.session_state.last_invitees = []
+
+# Length of the last parsed meeting, so suggested slots are booked for as long
+if "last_duration" not in st.session_state:
+    st.session_state.last_duration = 30
+
+if "history_limit" not in st.session_state:
+    st.session_state.history_limit = HISTORY_PAGE_SIZE
 
 if "current_user" not in st.session_state:
     st.session_state.current_user = ""
 
-if "selected_session" not in st.session_state:
-    st.session_state.selected_session = None
-
 if "current_session_id" not in st.session_state:
     st.session_state.current_session_id = None
 
 if "calendar_available" not in st.session_state:
     st.session_state.calendar_available = None
 
-# Function to check calendar availability
-def check_calendar_availability():
+# API mode: the backend's token for this browser session (from POST /auth/callback)
+if "api_token" not in st.session_state:
+    st.session_state.api_token = None
+
+# 💾 Sessions live in SQLite; session_state only holds the loaded page of messages
+session_store = get_session_store()
+
+def add_message(role, content, kind="text", **fields):
+    """
+    Append a message to the current session, creating the session on the first message.
+
+    `kind` and `fields` (time_range, link, demo) are stored with the message so the
+    history can be rendered without parsing `content` again.
+    """
+    if st.session_state.current_session_id is None:
+        st.session_state.current_session_id = session_store.create_session(
+            st.session_state.current_user, f"Booking by {st.session_state.current_user}"
+        )
+    message = {"role": role, "content": content, "kind": kind, **fields}
+    message["seq"] = session_store.append_message(st.session_state.current_session_id, message)
+    st.session_state.messages.append(message)
+    # Keep only the window being shown; older messages stay on disk
+    if len(st.session_state.messages) > st.session_state.history_limit:
+        del st.session_state.messages[0]
+
+def open_session(session_id):
+    st.session_state.current_session_id = session_id
+    st.session_state.history_limit = HISTORY_PAGE_SIZE
+    st.session_state.messages = session_store.load_messages(session_id, limit=HISTORY_PAGE_SIZE) if session_id else []
+
+def load_older_messages():
+    first_seq = st.session_state.messages[0]["seq"]
+    older = session_store.load_messages(st.session_state.current_session_id, limit=HISTORY_PAGE_SIZE, before=first_seq)
+    st.session_state.messages = older + st.session_state.messages
+    st.session_state.history_limit += HISTORY_PAGE_SIZE
+
+# 🎨 Conversation history HTML, built from the structured message fields
+def message_html(message):
+    if message["role"] == "user":
+        return f"""
+        <div style="background-color: #f0f2f6; padding: 12px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #4CAF50; color: #1a1a1a;">
+            <strong style="color: #2d5016;">🧑‍💼 You:</strong><br>
+            <span style="color: #333333; font-size: 14px;">{html.escape(message['content'])}</span>
+        </div>
+        """
+
+    kind = message.get("kind", "text")
+    content = html.escape(message["content"])
+    if kind == "booking":
+        # Format as a booking confirmation card
+        demo_text = " (Demo Mode)" if message.get("demo") else ""
+        action_text = "Add to" if message.get("demo") else "View on"
+        return f"""
+        <div style="background-color: #e8f5e8; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #4CAF50; color: #1a1a1a;">
+            <strong style="color: #2d5016;">🤖 TailorTalk AI:</strong><br>
+            <div style="margin-top: 8px;">
+                <span style="color: #155724; font-weight: bold;">✅ Meeting Successfully Scheduled{demo_text}!</span><br>
+                <span style="color: #333333;"><strong>📅 Time:</strong> {message.get('time_range', 'Meeting scheduled')}</span><br>
+                <a href="{html.escape(message.get('link') or '#')}" target="_blank" style="color: #1976d2; text-decoration: none; font-weight: bold;">
+                    🔗 {action_text} Google Calendar →
+                </a>
+            </div>
+        </div>
+        """
+    if kind == "suggestion":
+        return f"""
+        <div style="background-color: #fff3cd; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #ffc107; color: #1a1a1a;">
+            <strong style="color: #856404;">🤖 TailorTalk AI:</strong><br>
+            <div style="margin-top: 8px;">
+                <span style="color: #856404; font-weight: bold;">⚠️ Time Conflict Detected</span><br>
+                <span style="color: #333333; font-size: 14px;">{content}</span>
+            </div>
+        </div>
+        """
+    if kind == "error":
+        return f"""
+        <div style="background-color: #f8d7da; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #dc3545; color: #1a1a1a;">
+            <strong style="color: #721c24;">🤖 TailorTalk AI:</strong><br>
+            <div style="margin-top: 8px;">
+                <span style="color: #721c24; font-weight: bold;">❌ Error:</span><br>
+                <span style="color: #333333; font-size: 14px;">{content}</span>
+            </div>
+        </div>
+        """
+    # Regular assistant message
+    return f"""
+    <div style="background-color: #e3f2fd; padding: 12px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #2196F3; color: #1a1a1a;">
+        <strong style="color: #0d47a1;">🤖 TailorTalk AI:</strong><br>
+        <div style="margin-top: 8px;">
+            <span style="color: #333333; font-size: 14px;">{content}</span>
+        </div>
+    </div>
+    """
+
+# A fragment, so "Load older messages" reruns only the history. The window's HTML is
+# reused across full reruns (booking clicks) until a message is added or loaded.
+@st.fragment
+def conversation_history():
+    messages = st.session_state.messages
+    st.markdown("---")
+    st.subheader("💬 Conversation History")
+
+    # Older messages stay on disk until asked for
+    if messages[0]["seq"] > 0:
+        st.button("⬆️ Load older messages", on_click=load_older_messages)
+
+    window = (st.session_state.current_session_id, messages[0]["seq"], messages[-1]["seq"])
+    if st.session_state.get("history_window") != window:
+        st.session_state.history_window = window
+        st.session_state.history_html = "".join(message_html(message) for message in messages)
+    st.markdown(st.session_state.history_html, unsafe_allow_html=True)
+
+# Function to check calendar availability (cached, no Calendar API call)
+@st.cache_data(ttl=60, show_spinner=False)
+def check_calendar_availability(token=None):
     """Check if calendar service is available"""
+    if api_client is None:
+        return health_check()
+    try:
+        return api_client.health(token)["calendar"]
+    except Exception as e:
+        st.error(f"Booking service unavailable: {str(e)}")
+        return False
+
+@st.cache_data(ttl=60, show_spinner=False)
+def check_authenticated(token=None):
+    if api_client is None:
+        return is_authenticated()
+    try:
+        return api_client.health(token)["authenticated"]
+    except Exception:
+        return False
+
+# 🌐 API mode: parse, availability and booking run on the backend and stream back as SSE
+def submit_via_api(user_input):
+    status = st.empty()
+    status.info("Understanding your request...")
     try:
-        # Try to import and test calendar functions
-        from calendar_utils import is_time_slot_free
-        # Test with a simple call
-        test_result = is_time_slot_free("2024-01-01T10:00:00", "2024-01-01T11:00:00")
-        return True
+        for event, data in api_client.stream_booking(user_input, st.session_state.api_token,
+                                                 session_id=str(st.session_state.current_session_id)):
+            if event == "stage":
+                status.info("Checking availability...")
+            elif event == "parsed":
+                st.session_state.last_invitees = data.get("invitees", [])
+                st.session_state.last_input = data.get("description", user_input)
+                st.session_state.last_duration = int(
+                    (isoparse(data["end_time"]) - isoparse(data["start_time"])).total_seconds() // 60)
+            elif event == "availability" and not data["free"]:
+                # Nearest slots where you and every invitee are free, computed by the backend
+                st.session_state.options = [isoparse(slot) for slot in data["alternates"]]
+            elif event == "result":
+                status.empty()
+                if data["success"]:
+                    start_fmt = isoparse(data['start_time']).strftime("%A, %d %B %Y — %I:%M %p")
+                    end_fmt = isoparse(data['end_time']).strftime("%I:%M %p")
+                    success_msg = f"✅ Meeting booked from **{start_fmt} to {end_fmt}**. [View on Google Calendar]({data['calendar_link']})"
+                    st.success("✅ Meeting booked!")
+                    st.markdown(f"🕒 {start_fmt} to {end_fmt}")
+                    st.markdown(f"🔗 [View on Google Calendar]({data['calendar_link']})")
+                    if data.get("previous_booking"):
+                        st.info(f"📌 The meeting booked earlier in this conversation ({data['previous_booking']['start_time']}) is still on your calendar.")
+                    add_message("assistant", success_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                                link=data['calendar_link'], demo=False)
+                else:
+                    st.warning("⚠️ That time slot is already booked.")
+                    if st.session_state.options:
+                        st.info("Here are some alternate time suggestions:")
+                    add_message("assistant", "Time is busy. Suggested options: " + ", ".join(
+                        slot.strftime("%A %I:%M %p") for slot in st.session_state.options
+                    ), kind="suggestion")
+            elif event == "error":
+                status.empty()
+                error_msg = f"LangGraph Error: {data['detail']}"
+                st.error(error_msg)
+                add_message("assistant", error_msg, kind="error")
     except Exception as e:
-        st.error(f"Calendar service unavailable: {str(e)}")
+        status.empty()
+        error_msg = f"Booking service Error: {str(e)}"
+        st.error(error_msg)
+        add_message("assistant", error_msg, kind="error")
+
+def book_slot_via_api(slot, btn_label):
+    """Book a suggested slot through the backend; False when the slot was taken."""
+    try:
+        data = api_client.book_slot(slot.isoformat(), st.session_state.last_invitees, st.session_state.last_input,
+                                    st.session_state.last_duration, token=st.session_state.api_token)
+    except Exception as e:
+        error_msg = f"Booking service Error: {str(e)}"
+        st.error(error_msg)
+        add_message("assistant", error_msg, kind="error")
         return False
+    if not data["success"]:
+        st.warning(f"Slot {btn_label} is already booked.")
+        add_message("assistant", f"❌ {btn_label} is also booked. Try another slot.")
+        return False
+    start_fmt = isoparse(data['start_time']).strftime("%A, %d %B %Y — %I:%M %p")
+    end_fmt = isoparse(data['end_time']).strftime("%I:%M %p")
+    confirm_msg = f"✅ Meeting rescheduled from **{start_fmt} to {end_fmt}**. [View on Google Calendar]({data['calendar_link']})"
+    st.success(f"✅ Meeting booked at {btn_label}!")
+    st.markdown(f"🕒 {start_fmt} to {end_fmt}")
+    st.markdown(f"🔗 [View on Google Calendar]({data['calendar_link']})")
+    add_message("assistant", confirm_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                link=data['calendar_link'], demo=False)
+    return True
 
 # Function to create a mock booking result for demo purposes
 def create_mock_booking(start_time, duration_minutes, description, invitees):
@@ -77,7 +296,7 @@ def save_booking_locally(booking_data):
 
 # Check calendar availability once
 if st.session_state.calendar_available is None:
-    st.session_state.calendar_available = check_calendar_availability()
+    st.session_state.calendar_available = check_calendar_availability(st.session_state.api_token)
 
 # Create two columns layout
 col1, col2 = st.columns([1, 2])
@@ -91,88 +310,69 @@ with col1:
     if user_name != st.session_state.current_user:
         st.session_state.current_user = user_name
     
-    # New Chat button
+    # New Chat button (messages are already saved as they are added)
     if st.button("➕ New Chat", use_container_width=True):
-        # Save current session if it has messages and user name
-        if st.session_state.messages and st.session_state.current_user:
-            # Only save if it's not already saved
-            if st.session_state.current_session_id is None:
-                session_title = f"Booking by {st.session_state.current_user}"
-                session_data = {
-                    "id": len(st.session_state.chat_sessions),
-                    "title": session_title,
-                    "messages": st.session_state.messages.copy(),
-                    "user": st.session_state.current_user,
-                    "timestamp": st.session_state.messages[0]["content"] if st.session_state.messages else ""
-                }
-                st.session_state.chat_sessions.append(session_data)
-            else:
-                # Update existing session
-                session_idx = st.session_state.current_session_id
-                if session_idx < len(st.session_state.chat_sessions):
-                    st.session_state.chat_sessions[session_idx]["messages"] = st.session_state.messages.copy()
-        
-        # Clear current session
-        st.session_state.messages = []
+        open_session(None)
         st.session_state.options = []
-        st.session_state.selected_session = None
-        st.session_state.current_session_id = None
         st.rerun()
     
     st.markdown("---")
     
-    # Display chat sessions
-    if st.session_state.chat_sessions:
-        for i, session in enumerate(reversed(st.session_state.chat_sessions)):
-            original_index = len(st.session_state.chat_sessions) - 1 - i
-            # Create a button for each chat session
-            session_button_key = f"session_{original_index}"
-            
+    # Display this user's chat sessions (index rows only; messages load on click)
+    chat_sessions = session_store.list_sessions(st.session_state.current_user) if st.session_state.current_user else []
+    if chat_sessions:
+        for session in chat_sessions:
             # Highlight current session
             button_style = ""
-            if st.session_state.current_session_id == original_index:
+            if st.session_state.current_session_id == session["id"]:
                 button_style = "🔵 "
             
             if st.button(
                 f"{button_style}{session['title']}", 
-                key=session_button_key,
+                key=f"session_{session['id']}",
                 use_container_width=True,
-                help=f"Messages: {len(session['messages'])} | Last: {session['timestamp'][:50]}..."
+                help=f"Messages: {session['message_count']} | Last: {session['preview'][:50]}..."
             ):
-                # Load selected session
-                st.session_state.messages = session["messages"].copy()
-                st.session_state.current_user = session["user"]
-                st.session_state.selected_session = original_index
-                st.session_state.current_session_id = original_index
+                # Load the latest page of the selected session
+                open_session(session["id"])
+                st.session_state.options = []
                 st.rerun()
     else:
         st.markdown("*No previous chats. Start a new conversation!*")
     
     # Show current session indicator
     st.markdown("---")
-    if st.session_state.current_session_id is not None:
-        # Existing session
-        current_session = st.session_state.chat_sessions[st.session_state.current_session_id]
+    current_session = session_store.get_session(st.session_state.current_session_id) if st.session_state.current_session_id else None
+    if current_session:
         st.markdown(f"**Current:** {current_session['title']}")
-        st.markdown(f"*Messages: {len(st.session_state.messages)}*")
-    elif st.session_state.messages and st.session_state.current_user:
-        # New unsaved session
-        st.markdown(f"**Current:** New Booking by {st.session_state.current_user}")
-        st.markdown(f"*Messages: {len(st.session_state.messages)}*")
+        st.markdown(f"*Messages: {current_session['message_count']}*")
     else:
         st.markdown("**Current:** No active session")
 
 with col2:
-    from calendar_utils import get_auth_url, exchange_code_for_token
     from urllib.parse import urlparse, parse_qs
 
+    if api_client is not None:
+        # The backend runs the OAuth exchange and keeps the token in its credential store;
+        # it answers with an API token for the user bound to the OAuth state
+        def get_auth_url():
+            return api_client.auth_url(st.session_state.api_token)
+
+        def exchange_code_for_token(code):
+            st.session_state.api_token = api_client.exchange_code(code, st.query_params.get("state"))
+            st.session_state.calendar_available = None
+
     # 🧵 Title
     st.title(" TailorTalk AI - Smart Meeting Booker")
 
     # ✅ Check Google Calendar auth before continuing
-    if not os.path.exists("token.pkl"):
+    if not check_authenticated(st.session_state.api_token):
         st.warning("🔐 You need to connect your Google Calendar to book meetings.")
-        auth_url = get_auth_url()
+        try:
+            auth_url = get_auth_url()
+        except Exception as e:
+            st.error(f"Could not start Google authorisation: {str(e)}")
+            st.stop()
         st.markdown(f"[Click here to authorize Google Calendar access]({auth_url})")
 
         # Try reading code from URL after redirect
@@ -181,7 +381,16 @@ with col2:
             code = query_params["code"]
             if isinstance(code, list):
                 code = code[0]
-            exchange_code_for_token(code)
+            try:
+                exchange_code_for_token(code)
+            except Exception as e:
+                st.error(f"Google authorisation failed: {str(e)}")
+                st.stop()
+            check_authenticated.clear()
+            if api_client is not None:
+                # A browser refresh would drop the API token, so carry on in this session
+                st.query_params.clear()
+                st.rerun()
             st.success("✅ Google Calendar connected! Please refresh the app.")
         st.stop()
     
@@ -189,7 +398,7 @@ with col2:
     if not st.session_state.calendar_available:
         st.warning("⚠️ Calendar service is currently unavailable. Running in demo mode - you'll get calendar links to manually add events.")
     
-    st.markdown("Try: `Book a meeting next Friday at 6 PM with john@example.com`")
+    st.markdown("Try: `Book a meeting next Friday at 6 PM with john@example.com`, then `make it 4pm instead`")
     
     user_input = st.text_input("What would you like to schedule?")
     
@@ -201,58 +410,71 @@ with col2:
             
         st.session_state.options = []
         st.session_state.last_input = user_input
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        add_message("user", user_input)
 
-        if user_input.strip():
+        if user_input.strip() and api_client is not None:
+            submit_via_api(user_input)
+        elif user_input.strip():
             with st.spinner("Understanding your request..."):
                 try:
-                    parsed = run_langgraph_agent(user_input)
+                    # Follow-ups in this chat keep the fields parsed so far (conversation.py)
+                    parsed = run_conversation_turn(user_input, str(st.session_state.current_session_id))
                 except Exception as e:
                     parsed = {"error": f"Agent processing error: {str(e)}"}
 
             if "error" in parsed:
                 error_msg = f"LangGraph Error: {parsed['error']}"
                 st.error(error_msg)
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                add_message("assistant", error_msg, kind="error")
             else:
                 start = isoparse(parsed["start_time"])
                 end = isoparse(parsed["end_time"])
                 invitees = parsed.get("invitees", [])
+                description = parsed.get("description", user_input)
+                minutes = int((end - start).total_seconds() // 60)
+                st.session_state.last_invitees = invitees
+                st.session_state.last_input = description
+                st.session_state.last_duration = minutes
 
                 with st.spinner("Processing booking..."):
                     try:
                         if st.session_state.calendar_available:
-                            # Try real calendar booking
-                            if is_time_slot_free(start.isoformat(), end.isoformat()):
-                                result = book_event_at(start, 30, user_input, invitees)
+                            # Try real calendar booking, under a reservation so concurrent sessions cannot both book the slot
+                            with reserve_slot(DEFAULT_USER, start, end) as reservation:
+                                if reservation is not None and is_time_slot_free(start.isoformat(), end.isoformat()):
+                                    result = book_event_at(start, minutes, description, invitees)
+                                    reservation.confirm()
+                                    # A follow-up books a new event; the earlier turn's one is still there
+                                    previous = record_booked(str(st.session_state.current_session_id), DEFAULT_USER, {
+                                        "start_time": result["start"], "end_time": result["end"], "calendar_link": result["link"],
+                                    })
                                 
-                                start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
-                                end_fmt = isoparse(result['end']).strftime("%I:%M %p")
-
-                                success_msg = f"✅ Meeting booked from **{start_fmt} to {end_fmt}**. [View on Google Calendar]({result['link']})"
-                                st.success("✅ Meeting booked!")
-                                st.markdown(f"🕒 {start_fmt} to {end_fmt}")
-                                st.markdown(f"🔗 [View on Google Calendar]({result['link']})")
-                                st.session_state.messages.append({"role": "assistant", "content": success_msg})
+                                    start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
+                                    end_fmt = isoparse(result['end']).strftime("%I:%M %p")
+
+                                    success_msg = f"✅ Meeting booked from **{start_fmt} to {end_fmt}**. [View on Google Calendar]({result['link']})"
+                                    st.success("✅ Meeting booked!")
+                                    st.markdown(f"🕒 {start_fmt} to {end_fmt}")
+                                    st.markdown(f"🔗 [View on Google Calendar]({result['link']})")
+                                    if previous:
+                                        st.info(f"📌 The meeting booked earlier in this conversation ({previous['start_time']}) is still on your calendar.")
+                                    add_message("assistant", success_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                                                link=result['link'], demo=False)
                                 
-                            else:
-                                st.warning("⚠️ That time slot is already booked.")
-                                st.info("Here are some alternate time suggestions:")
-
-                                st.session_state.options = [
-                                    start + timedelta(hours=1),
-                                    start + timedelta(hours=2),
-                                    start + timedelta(hours=3)
-                                ]
-                                st.session_state.messages.append({
-                                    "role": "assistant",
-                                    "content": "Time is busy. Suggested options: " + ", ".join(
+                                else:
+                                    st.warning("⚠️ That time slot is already booked.")
+                                    st.info("Here are some alternate time suggestions:")
+
+                                    # Nearest slots where you and every invitee are free (one free/busy query)
+                                    st.session_state.options = [
+                                        slot_start for slot_start, _ in suggest_slots(start, minutes, invitees)
+                                    ]
+                                    add_message("assistant", "Time is busy. Suggested options: " + ", ".join(
                                         slot.strftime("%A %I:%M %p") for slot in st.session_state.options
-                                    )
-                                })
+                                    ), kind="suggestion")
                         else:
                             # Demo mode - create mock booking
-                            result = create_mock_booking(start, 30, user_input, invitees)
+                            result = create_mock_booking(start, minutes, description, invitees)
                             save_booking_locally(result)
                             
                             start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
@@ -263,14 +485,15 @@ with col2:
                             st.markdown(f"🕒 {start_fmt} to {end_fmt}")
                             st.markdown(f"🔗 [Add to Google Calendar]({result['link']})")
                             st.info("📝 In demo mode - click the link above to manually add this event to your calendar")
-                            st.session_state.messages.append({"role": "assistant", "content": success_msg})
+                            add_message("assistant", success_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                                        link=result['link'], demo=True)
                             
                     except Exception as e:
                         # Fallback to demo mode if calendar fails
                         st.warning(f"Calendar service error: {str(e)}")
                         st.info("Falling back to demo mode...")
                         
-                        result = create_mock_booking(start, 30, user_input, invitees)
+                        result = create_mock_booking(start, minutes, description, invitees)
                         save_booking_locally(result)
                         
                         start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
@@ -281,25 +504,8 @@ with col2:
                         st.markdown(f"🕒 {start_fmt} to {end_fmt}")
                         st.markdown(f"🔗 [Add to Google Calendar]({result['link']})")
                         st.info("📝 Click the link above to manually add this event to your calendar")
-                        st.session_state.messages.append({"role": "assistant", "content": success_msg})
-                    
-                    # Auto-save session after successful booking
-                    if st.session_state.current_session_id is None:
-                        session_title = f"Booking by {st.session_state.current_user}"
-                        session_data = {
-                            "id": len(st.session_state.chat_sessions),
-                            "title": session_title,
-                            "messages": st.session_state.messages.copy(),
-                            "user": st.session_state.current_user,
-                            "timestamp": st.session_state.messages[0]["content"] if st.session_state.messages else ""
-                        }
-                        st.session_state.chat_sessions.append(session_data)
-                        st.session_state.current_session_id = len(st.session_state.chat_sessions) - 1
-                    else:
-                        # Update existing session
-                        session_idx = st.session_state.current_session_id
-                        if session_idx < len(st.session_state.chat_sessions):
-                            st.session_state.chat_sessions[session_idx]["messages"] = st.session_state.messages.copy()
+                        add_message("assistant", success_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                                    link=result['link'], demo=True)
 
     # ⏱ Suggested time rebooking buttons
     if st.session_state.options:
@@ -308,50 +514,56 @@ with col2:
         for slot in st.session_state.options:
             btn_label = slot.strftime("%A %I:%M %p")
             if st.button(btn_label):
-                end = slot + timedelta(minutes=30)
-                try:
-                    invitees = run_langgraph_agent(st.session_state.last_input).get("invitees", [])
-                except:
-                    invitees = []
+                if api_client is not None:
+                    if book_slot_via_api(slot, btn_label):
+                        st.session_state.options = []
+                        break
+                    continue
+
+                # Invitees and length were parsed on submit; no need to call the agent again
+                minutes = st.session_state.last_duration
+                end = slot + timedelta(minutes=minutes)
+                invitees = st.session_state.last_invitees
                 
                 try:
-                    if st.session_state.calendar_available and is_time_slot_free(slot.isoformat(), end.isoformat()):
-                        result = book_event_at(slot, 30, st.session_state.last_input, invitees)
+                    with reserve_slot(DEFAULT_USER, slot, end) as reservation:
+                        if st.session_state.calendar_available and reservation is not None and is_time_slot_free(slot.isoformat(), end.isoformat()):
+                            result = book_event_at(slot, minutes, st.session_state.last_input, invitees)
+                            reservation.confirm()
                         
-                        start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
-                        end_fmt = isoparse(result['end']).strftime("%I:%M %p")
-
-                        confirm_msg = f"✅ Meeting rescheduled from **{start_fmt} to {end_fmt}**. [View on Google Calendar]({result['link']})"
-                        st.success(f"✅ Meeting booked at {btn_label}!")
-                        st.markdown(f"🕒 {start_fmt} to {end_fmt}")
-                        st.markdown(f"🔗 [View on Google Calendar]({result['link']})")
-                        st.session_state.messages.append({"role": "assistant", "content": confirm_msg})
-                        
-                    else:
-                        # Demo mode or slot busy
-                        if not st.session_state.calendar_available:
-                            result = create_mock_booking(slot, 30, st.session_state.last_input, invitees)
-                            save_booking_locally(result)
-                            
                             start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
                             end_fmt = isoparse(result['end']).strftime("%I:%M %p")
 
-                            confirm_msg = f"✅ Meeting scheduled from **{start_fmt} to {end_fmt}**. [Add to Google Calendar]({result['link']})"
-                            st.success(f"✅ Meeting scheduled at {btn_label}! (Demo Mode)")
+                            confirm_msg = f"✅ Meeting rescheduled from **{start_fmt} to {end_fmt}**. [View on Google Calendar]({result['link']})"
+                            st.success(f"✅ Meeting booked at {btn_label}!")
                             st.markdown(f"🕒 {start_fmt} to {end_fmt}")
-                            st.markdown(f"🔗 [Add to Google Calendar]({result['link']})")
-                            st.session_state.messages.append({"role": "assistant", "content": confirm_msg})
+                            st.markdown(f"🔗 [View on Google Calendar]({result['link']})")
+                            add_message("assistant", confirm_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                                        link=result['link'], demo=False)
+                        
                         else:
-                            st.warning(f"Slot {btn_label} is already booked.")
-                            st.session_state.messages.append({
-                                "role": "assistant",
-                                "content": f"❌ {btn_label} is also booked. Try another slot."
-                            })
-                            continue
+                            # Demo mode or slot busy
+                            if not st.session_state.calendar_available:
+                                result = create_mock_booking(slot, minutes, st.session_state.last_input, invitees)
+                                save_booking_locally(result)
+                            
+                                start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
+                                end_fmt = isoparse(result['end']).strftime("%I:%M %p")
+
+                                confirm_msg = f"✅ Meeting scheduled from **{start_fmt} to {end_fmt}**. [Add to Google Calendar]({result['link']})"
+                                st.success(f"✅ Meeting scheduled at {btn_label}! (Demo Mode)")
+                                st.markdown(f"🕒 {start_fmt} to {end_fmt}")
+                                st.markdown(f"🔗 [Add to Google Calendar]({result['link']})")
+                                add_message("assistant", confirm_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                                            link=result['link'], demo=True)
+                            else:
+                                st.warning(f"Slot {btn_label} is already booked.")
+                                add_message("assistant", f"❌ {btn_label} is also booked. Try another slot.")
+                                continue
                     
                 except Exception as e:
                     # Fallback to demo mode
-                    result = create_mock_booking(slot, 30, st.session_state.last_input, invitees)
+                    result = create_mock_booking(slot, minutes, st.session_state.last_input, invitees)
                     save_booking_locally(result)
                     
                     start_fmt = isoparse(result['start']).strftime("%A, %d %B %Y — %I:%M %p")
@@ -361,110 +573,15 @@ with col2:
                     st.success(f"✅ Meeting scheduled at {btn_label}! (Demo Mode)")
                     st.markdown(f"🕒 {start_fmt} to {end_fmt}")
                     st.markdown(f"🔗 [Add to Google Calendar]({result['link']})")
-                    st.session_state.messages.append({"role": "assistant", "content": confirm_msg})
+                    add_message("assistant", confirm_msg, kind="booking", time_range=f"{start_fmt} to {end_fmt}",
+                                link=result['link'], demo=True)
                 
                 st.session_state.options = []
-                
-                # Auto-save session after successful booking
-                if st.session_state.current_session_id is None:
-                    session_title = f"Booking by {st.session_state.current_user}"
-                    session_data = {
-                        "id": len(st.session_state.chat_sessions),
-                        "title": session_title,
-                        "messages": st.session_state.messages.copy(),
-                        "user": st.session_state.current_user,
-                        "timestamp": st.session_state.messages[0]["content"] if st.session_state.messages else ""
-                    }
-                    st.session_state.chat_sessions.append(session_data)
-                    st.session_state.current_session_id = len(st.session_state.chat_sessions) - 1
-                else:
-                    # Update existing session
-                    session_idx = st.session_state.current_session_id
-                    if session_idx < len(st.session_state.chat_sessions):
-                        st.session_state.chat_sessions[session_idx]["messages"] = st.session_state.messages.copy()
                 break
 
-    # Display chat history in the main area
+    # Display chat history in the main area (its own fragment, see conversation_history)
     if st.session_state.messages:
-        st.markdown("---")
-        st.subheader("💬 Conversation History")
-        
-        for i, message in enumerate(st.session_state.messages):
-            if message["role"] == "user":
-                # User message with better styling
-                st.markdown(f"""
-                <div style="background-color: #f0f2f6; padding: 12px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #4CAF50; color: #1a1a1a;">
-                    <strong style="color: #2d5016;">🧑‍💼 You:</strong><br>
-                    <span style="color: #333333; font-size: 14px;">{message['content']}</span>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                # Assistant message with enhanced formatting
-                content = message['content']
-                
-                # Check if it's a booking confirmation message
-                if "✅ Meeting booked" in content or "✅ Meeting scheduled" in content:
-                    # Extract the calendar link
-                    import re
-                    link_match = re.search(r'\[(?:View on Google Calendar|Add to Google Calendar)\]\((https?://[^\)]+)\)', content)
-                    calendar_link = link_match.group(1) if link_match else "#"
-                    
-                    # Extract booking details
-                    details = content.split('**')[1] if '**' in content else 'Meeting scheduled'
-                    
-                    # Determine if it's demo mode
-                    is_demo = "Add to Google Calendar" in content
-                    demo_text = " (Demo Mode)" if is_demo else ""
-                    action_text = "Add to" if is_demo else "View on"
-                    
-                    # Format as a booking confirmation card
-                    st.markdown(f"""
-                    <div style="background-color: #e8f5e8; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #4CAF50; color: #1a1a1a;">
-                        <strong style="color: #2d5016;">🤖 TailorTalk AI:</strong><br>
-                        <div style="margin-top: 8px;">
-                            <span style="color: #155724; font-weight: bold;">✅ Meeting Successfully Scheduled{demo_text}!</span><br>
-                            <span style="color: #333333;"><strong>📅 Time:</strong> {details}</span><br>
-                            <a href="{calendar_link}" target="_blank" style="color: #1976d2; text-decoration: none; font-weight: bold;">
-                                🔗 {action_text} Google Calendar →
-                            </a>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                elif "Time is busy" in content or "Suggested options" in content:
-                    # Format as a suggestion message
-                    st.markdown(f"""
-                    <div style="background-color: #fff3cd; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #ffc107; color: #1a1a1a;">
-                        <strong style="color: #856404;">🤖 TailorTalk AI:</strong><br>
-                        <div style="margin-top: 8px;">
-                            <span style="color: #856404; font-weight: bold;">⚠️ Time Conflict Detected</span><br>
-                            <span style="color: #333333; font-size: 14px;">{content}</span>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                elif "Error" in content:
-                    # Format error messages
-                    st.markdown(f"""
-                    <div style="background-color: #f8d7da; padding: 15px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #dc3545; color: #1a1a1a;">
-                        <strong style="color: #721c24;">🤖 TailorTalk AI:</strong><br>
-                        <div style="margin-top: 8px;">
-                            <span style="color: #721c24; font-weight: bold;">❌ Error:</span><br>
-                            <span style="color: #333333; font-size: 14px;">{content}</span>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                else:
-                    # Regular assistant message
-                    st.markdown(f"""
-                    <div style="background-color: #e3f2fd; padding: 12px; border-radius: 10px; margin: 10px 0; border-left: 4px solid #2196F3; color: #1a1a1a;">
-                        <strong style="color: #0d47a1;">🤖 TailorTalk AI:</strong><br>
-                        <div style="margin-top: 8px;">
-                            <span style="color: #333333; font-size: 14px;">{content}</span>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+        conversation_history()
 
     # Show local bookings in demo mode
     if not st.session_state.calendar_available and "local_bookings" in st.session_state and st.session_state.local_bookings:
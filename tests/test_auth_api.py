@@ -0,0 +1,68 @@
+# tests/test_auth_api.py
+
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    tokens = {}
+
+    def exchange(code, user_id):
+        if code != "good":
+            raise ValueError("invalid_grant")
+        tokens[user_id] = code
+
+    monkeypatch.setattr(main, "get_auth_url", lambda state=None: f"https://accounts.example/auth?state={state}")
+    monkeypatch.setattr(main, "exchange_code_for_token", exchange)
+    monkeypatch.setattr(main, "is_authenticated", lambda user_id: user_id in tokens)
+    monkeypatch.setattr(main, "health_check", lambda user_id: user_id in tokens)
+    return tokens
+
+
+def _state(client, headers=None):
+    auth_url = client.get("/auth/url", headers=headers).json()["auth_url"]
+    return parse_qs(urlparse(auth_url).query)["state"][0]
+
+
+def test_thin_client_auth_runs_on_the_backend(tokens):
+    # No `with`: the lifespan (warm-up, job workers) is not needed here
+    client = TestClient(main.app)
+    state = _state(client)
+
+    response = client.post("/auth/callback", json={"code": "bad", "state": state})
+    assert response.status_code == 400 and "invalid_grant" in response.json()["detail"]
+
+    response = client.post("/auth/callback", json={"code": "good", "state": state})
+    assert response.json()["authenticated"] is True
+    assert tokens == {main.ANONYMOUS_USER: "good"}
+
+
+def test_callback_user_comes_from_the_state_not_the_body(tokens, monkeypatch):
+    monkeypatch.setattr(main, "ANONYMOUS_USER", "")
+    client = TestClient(main.app)
+
+    response = client.post("/auth/callback", json={"code": "good", "state": "forged", "user_id": "ann"})
+    assert response.status_code == 400 and tokens == {}
+
+    response = client.post("/auth/callback", json={"code": "good", "state": _state(client), "user_id": "ann"})
+    (user_id,) = tokens
+    assert user_id != "ann"
+
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+    assert client.get("/health", headers=headers).json()["authenticated"] is True
+    # Re-authorising with the token keeps the same user
+    client.post("/auth/callback", json={"code": "good", "state": _state(client, headers)})
+    assert list(tokens) == [user_id]
+
+
+def test_tenant_routes_need_a_valid_token_without_an_anonymous_user(tokens, monkeypatch):
+    monkeypatch.setattr(main, "ANONYMOUS_USER", "")
+    client = TestClient(main.app)
+    assert client.get("/health").status_code == 401
+    assert client.get("/health", headers={"Authorization": "Bearer forged"}).status_code == 401
+    assert client.get("/conversations/abc", params={"user_id": "ann"}).status_code == 401
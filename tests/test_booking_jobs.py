@@ -0,0 +1,88 @@
+# tests/test_booking_jobs.py
+
+import time
+
+import pytest
+
+import booking_jobs
+from booking_jobs import (
+    BookingQueue, MemoryJobStore, SqliteJobStore, QueueFull, IdempotencyConflict, FINISHED, SUCCEEDED, _new_job,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemoryJobStore() if request.param == "memory" else SqliteJobStore(str(tmp_path / "jobs.db"))
+
+
+def _wait_finished(store, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while store.get(job_id)["status"] not in FINISHED:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return store.get(job_id)
+
+
+def test_same_key_returns_the_same_job(store):
+    booking_queue = BookingQueue(store, workers=0)
+    first = booking_queue.submit("Book a meeting tomorrow at 3pm", "ann", "key-1")
+    assert booking_queue.submit("Book a meeting tomorrow at 3pm", "ann", "key-1")["id"] == first["id"]
+    # Keys are per user
+    assert booking_queue.submit("Book a meeting tomorrow at 3pm", "bob", "key-1")["id"] != first["id"]
+    with pytest.raises(IdempotencyConflict):
+        booking_queue.submit("Book a meeting tomorrow at 4pm", "ann", "key-1")
+
+
+def test_jobs_are_only_visible_to_their_user(store):
+    booking_queue = BookingQueue(store, workers=0)
+    job = booking_queue.submit("Book a meeting tomorrow at 3pm", "ann")
+    assert booking_queue.get(job["id"], "ann")["id"] == job["id"]
+    assert booking_queue.get(job["id"], "bob") is None
+    assert booking_queue.get("missing", "ann") is None
+
+
+def test_retry_gets_its_job_while_the_queue_is_full(store):
+    booking_queue = BookingQueue(store, workers=0, max_pending=1)
+    first = booking_queue.submit("Book a meeting tomorrow at 3pm", "ann", "key-1")
+    with pytest.raises(QueueFull):
+        booking_queue.submit("Book a meeting tomorrow at 4pm", "ann", "key-2")
+    assert booking_queue.submit("Book a meeting tomorrow at 3pm", "ann", "key-1")["id"] == first["id"]
+
+
+def test_jobs_book_under_their_own_event_id(store):
+    calls = []
+
+    def handler(user_input, user_id, event_id):
+        calls.append(event_id)
+        return {"success": True}
+
+    booking_queue = BookingQueue(store, workers=1, handler=handler, lookup=lambda event_id, user_id: None)
+    booking_queue.start()
+    try:
+        job = booking_queue.submit("Book a meeting tomorrow at 3pm", "ann")
+        assert _wait_finished(store, job["id"])["status"] == SUCCEEDED
+    finally:
+        booking_queue.stop()
+    assert calls == [job["id"]]
+
+
+def test_lost_job_reports_its_event_instead_of_booking_again(store, monkeypatch):
+    calls, looked_up = [], []
+
+    def lookup(event_id, user_id):
+        looked_up.append(event_id)
+        return {"success": True, "message": "Meeting booked successfully!"}
+
+    # A worker claimed the job and was lost before finishing it
+    job = store.create(_new_job("Book a meeting tomorrow at 3pm", "ann", None))
+    store.claim(job["id"])
+    monkeypatch.setattr(booking_jobs, "JOB_STALE_SECONDS", -1)  # every running job counts as stale
+
+    booking_queue = BookingQueue(store, workers=1, handler=lambda *args, **kwargs: calls.append(args), lookup=lookup)
+    booking_queue.start()
+    try:
+        finished = _wait_finished(store, job["id"])
+    finally:
+        booking_queue.stop()
+    assert finished["status"] == SUCCEEDED and finished["result"]["message"] == "Meeting booked successfully!"
+    assert looked_up == [job["id"]] and calls == []
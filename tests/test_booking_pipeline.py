@@ -0,0 +1,54 @@
+# tests/test_booking_pipeline.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import booking_pipeline
+from conversation import reset_conversation
+
+
+def _fake_calendar(monkeypatch, turns):
+    """Conversation turns answered from `turns`, every slot free; returns the inserted lengths."""
+    inserted = []
+
+    async def turn(user_input, session_id, user_id):
+        return turns[user_input]
+
+    async def is_free(start, end, user_id):
+        return True
+
+    async def book(start, minutes, description, invitees, user_id):
+        inserted.append(minutes)
+        end = start + timedelta(minutes=minutes)
+        return {"start": start.isoformat(), "end": end.isoformat(), "link": f"https://example.test/{len(inserted)}"}
+
+    monkeypatch.setattr(booking_pipeline, "arun_conversation_turn", turn)
+    monkeypatch.setattr(booking_pipeline, "ais_time_slot_free", is_free)
+    monkeypatch.setattr(booking_pipeline, "abook_event_at", book)
+    return inserted
+
+
+def test_follow_up_keeps_length_and_reports_the_earlier_event(monkeypatch):
+    inserted = _fake_calendar(monkeypatch, {
+        "Book an hour tomorrow at 3pm": {"start_time": "2025-07-03T15:00:00", "end_time": "2025-07-03T16:00:00"},
+        "make it 4pm instead": {"start_time": "2025-07-03T16:00:00", "end_time": "2025-07-03T17:00:00"},
+    })
+    session = "test-follow-up"
+    try:
+        first = asyncio.run(booking_pipeline.abook_from_text("Book an hour tomorrow at 3pm", session_id=session))
+        second = asyncio.run(booking_pipeline.abook_from_text("make it 4pm instead", session_id=session))
+    finally:
+        reset_conversation(session)
+
+    assert inserted == [60, 60]
+    assert "previous_booking" not in first
+    assert second["end_time"] == "2025-07-03T17:00:00"
+    assert second["previous_booking"]["calendar_link"] == first["calendar_link"]
+    assert "still on your calendar" in second["message"]
+
+
+def test_suggested_slot_is_booked_for_the_requested_length(monkeypatch):
+    inserted = _fake_calendar(monkeypatch, {})
+    result = asyncio.run(booking_pipeline.abook_at_slot(
+        datetime(2025, 7, 3, 16, 0), [], "Planning", "test-slot-length", minutes=60))
+    assert inserted == [60] and result["end_time"] == "2025-07-03T17:00:00"
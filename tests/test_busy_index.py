@@ -0,0 +1,140 @@
+# tests/test_busy_index.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import busy_index
+from busy_index import BusyIndex
+
+
+def _event(event_id, start, minutes=30, status="confirmed"):
+    return {
+        "id": event_id,
+        "status": status,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + timedelta(minutes=minutes)).isoformat()},
+    }
+
+
+class FakeService:
+    """events().list() for a fixed set of events; a syncToken request returns `changes`."""
+
+    def __init__(self, events, latency=0.0, time_zone=None):
+        self.events_ = events
+        self.time_zone = time_zone
+        self.changes = []
+        self.latency = latency
+        self.lists = 0
+        self._lock = threading.Lock()
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        service = self
+
+        class Request:
+            def execute(self):
+                with service._lock:
+                    service.lists += 1
+                time.sleep(service.latency)
+                items = service.changes if "syncToken" in params else service.events_
+                response = {"items": list(items), "nextSyncToken": "token"}
+                if service.time_zone:
+                    response["timeZone"] = service.time_zone
+                return response
+
+        return Request()
+
+
+def _slot(hours):
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=hours)
+
+
+def test_full_then_incremental_sync():
+    busy = _slot(2)
+    service = FakeService([_event("a", busy)])
+    index = BusyIndex("primary")
+    assert index.is_free(busy, busy + timedelta(minutes=30)) is None  # not synced yet
+
+    assert index.sync(service) is True
+    assert index.is_free(busy, busy + timedelta(minutes=30)) is False
+    assert index.is_free(busy + timedelta(minutes=30), busy + timedelta(hours=1)) is True
+
+    service.changes = [_event("a", busy, status="cancelled")]
+    index.sync(service)
+    assert index.is_free(busy, busy + timedelta(minutes=30)) is True
+
+
+@pytest.mark.parametrize("calendar_zone, reported_zone", [
+    ("Asia/Kolkata", None),  # until Calendar reports a zone, CALENDAR_TIMEZONE is used
+    ("Asia/Kolkata", "America/New_York"),
+])
+def test_all_day_event_covers_the_calendar_day(monkeypatch, calendar_zone, reported_zone):
+    monkeypatch.setattr(busy_index, "CALENDAR_TIMEZONE", calendar_zone)
+    zone = ZoneInfo(reported_zone or calendar_zone)
+    day = (datetime.now(zone) + timedelta(days=2)).date()
+    next_day = day + timedelta(days=1)
+    holiday = {"id": "holiday", "status": "confirmed",
+               "start": {"date": day.isoformat()}, "end": {"date": next_day.isoformat()}}
+    index = BusyIndex("primary")
+    index.sync(FakeService([holiday], time_zone=reported_zone))
+
+    starts = datetime(day.year, day.month, day.day, tzinfo=zone)
+    ends = datetime(next_day.year, next_day.month, next_day.day, tzinfo=zone)
+    half_hour = timedelta(minutes=30)
+    assert index.is_free(starts - half_hour, starts) is True
+    assert index.is_free(starts, starts + half_hour) is False
+    assert index.is_free(ends - half_hour, ends) is False
+    assert index.is_free(ends, ends + half_hour) is True
+
+
+def test_fresh_index_skips_sync():
+    service = FakeService([])
+    index = BusyIndex("primary")
+    assert index.sync(service, max_age=30) is True
+    assert index.sync(service, max_age=30) is False
+    assert service.lists == 1
+
+
+def test_record_during_sync_survives_the_swap():
+    busy = _slot(3)
+    service = FakeService([], latency=0.2)
+    index = BusyIndex("primary")
+    syncing = threading.Thread(target=index.sync, args=(service,))
+    syncing.start()
+    time.sleep(0.05)
+    index.record(_event("ours", busy))  # does not wait for the fetch
+    syncing.join()
+    assert index.is_free(busy, busy + timedelta(minutes=30)) is False
+
+
+def test_concurrent_cold_lookups_sync_once(monkeypatch):
+    monkeypatch.setattr(busy_index, "_indexes", {})
+    service = FakeService([], latency=0.1)
+    start = _slot(4)
+
+    with ThreadPoolExecutor(20) as pool:
+        answers = list(pool.map(
+            lambda _: busy_index.lookup(service, start, start + timedelta(minutes=30), owner="tests"), range(20)))
+
+    assert answers == [True] * 20
+    assert service.lists == 1
+
+
+def test_stale_index_resyncs(monkeypatch):
+    monkeypatch.setattr(busy_index, "_indexes", {})
+    service = FakeService([])
+    start = _slot(5)
+    busy_index.lookup(service, start, start + timedelta(minutes=30), owner="tests")
+    busy_index.lookup(service, start, start + timedelta(minutes=30), owner="tests")
+    assert service.lists == 1
+
+    busy_index.get_index(owner="tests").last_sync -= busy_index.BUSY_INDEX_MAX_STALENESS + 1
+    busy_index.lookup(service, start, start + timedelta(minutes=30), owner="tests")
+    assert service.lists == 2
@@ -0,0 +1,62 @@
+# tests/test_calendar_utils.py
+
+from contextlib import nullcontext
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import calendar_utils
+
+
+class FakeBatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.ids = []
+
+    def add(self, request, request_id):
+        self.ids.append(request_id)
+
+
+class FakeService:
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body):
+        return body
+
+
+def test_failed_chunk_keeps_earlier_results(monkeypatch):
+    calls = []
+
+    def execute(batch):
+        calls.append(batch.ids)
+        if len(calls) == 2:
+            raise TimeoutError("batch call timed out")
+        for request_id in batch.ids:
+            batch.callback(request_id, {"htmlLink": f"https://example.test/{request_id}"}, None)
+
+    monkeypatch.setattr(calendar_utils, "CALENDAR_BATCH_LIMIT", 2)
+    monkeypatch.setattr(calendar_utils, "calendar_service", lambda user_id: nullcontext(FakeService()))
+    monkeypatch.setattr(calendar_utils, "_new_batch", lambda service, callback: FakeBatch(callback))
+    monkeypatch.setattr(calendar_utils, "_execute", execute)
+    monkeypatch.setattr(calendar_utils.busy_index, "record_event", lambda event, owner: None)
+
+    bookings = [(datetime(2025, 7, 3, 9 + i), 30, f"meeting {i}", []) for i in range(5)]
+    results = calendar_utils.book_events_batch(bookings)
+
+    assert calls == [["0", "1"], ["2", "3"], ["4"]]
+    assert [result.get("link") for result in results[:2]] == ["https://example.test/0", "https://example.test/1"]
+    assert results[2] == results[3] == {"error": "batch call timed out"}
+    assert results[4]["link"] == "https://example.test/4"
+
+
+def test_naive_candidates_are_read_in_the_calendar_timezone(monkeypatch):
+    tz = ZoneInfo("Asia/Kolkata")
+    busy = [(datetime(2025, 7, 3, 10, tzinfo=tz), datetime(2025, 7, 3, 10, 30, tzinfo=tz))]
+    monkeypatch.setattr(calendar_utils, "CALENDAR_TIMEZONE", "Asia/Kolkata")
+    monkeypatch.setattr(calendar_utils, "calendar_service", lambda user_id: nullcontext(FakeService()))
+    monkeypatch.setattr(calendar_utils.busy_index, "lookup", lambda *args, **kwargs: None)
+    monkeypatch.setattr(calendar_utils, "query_freebusy", lambda ids, start, end, service: {"primary": busy})
+
+    candidates = [(datetime(2025, 7, 3, 10), datetime(2025, 7, 3, 10, 30)),
+                  (datetime(2025, 7, 3, 11), datetime(2025, 7, 3, 11, 30))]
+    assert calendar_utils.check_slots(candidates) == [False, True]
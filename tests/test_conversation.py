@@ -0,0 +1,28 @@
+# tests/test_conversation.py
+
+from datetime import date
+
+from conversation import _apply
+
+BOOKING = {
+    "start_time": "2025-07-03T15:00:00",
+    "end_time": "2025-07-03T16:00:00",
+    "invitees": ["ann@example.com"],
+    "description": "Planning",
+}
+
+
+def test_moving_the_start_keeps_the_meeting_length():
+    updated = _apply(BOOKING, {"time": (16, 0)})  # "make it 4pm"
+    assert (updated["start_time"], updated["end_time"]) == ("2025-07-03T16:00:00", "2025-07-03T17:00:00")
+
+    updated = _apply(BOOKING, {"date": date(2025, 7, 4)})  # "move it to Friday"
+    assert (updated["start_time"], updated["end_time"]) == ("2025-07-04T15:00:00", "2025-07-04T16:00:00")
+
+
+def test_invitee_edits_keep_the_rest_of_the_booking():
+    updated = _apply(BOOKING, {"add_invitees": ["bob@example.com", "ANN@example.com"]})
+    assert updated["invitees"] == ["ann@example.com", "bob@example.com"]
+    assert updated["description"] == "Planning" and updated["end_time"] == BOOKING["end_time"]
+
+    assert _apply(BOOKING, {"remove_invitees": ["Ann@Example.com"]})["invitees"] == []
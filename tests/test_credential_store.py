@@ -0,0 +1,111 @@
+# tests/test_credential_store.py
+
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+import credential_store
+from credential_store import CredentialStore, SQLiteCredentialStore, DEFAULT_USER, _migrate_legacy_token
+
+
+def _utcnow():
+    # google-auth keeps expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def _creds(token, expires_in=3600):
+    expiry = _utcnow() + timedelta(seconds=expires_in)
+    return Credentials(token=token, refresh_token="refresh", token_uri="https://oauth2.example/token",
+                       client_id="client", client_secret="secret", expiry=expiry)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "credentials.db")
+
+
+def test_interface_cannot_be_used_without_a_backend():
+    with pytest.raises(TypeError):
+        CredentialStore()
+
+
+def test_put_get_delete(db_path):
+    store = SQLiteCredentialStore(db_path)
+    store.put("ann", _creds("a1"))
+    assert store.get("ann").token == "a1" and store.has("ann")
+    assert store.users() == ["ann"]
+    store.delete("ann")
+    assert store.get("ann") is None and store.users() == []
+
+
+def test_a_write_from_another_process_is_seen(db_path):
+    worker_a, worker_b = SQLiteCredentialStore(db_path), SQLiteCredentialStore(db_path)
+    worker_a.put("ann", _creds("a1"))
+    assert worker_b.get("ann").token == "a1"
+
+    worker_a.put("ann", _creds("a2"))
+    assert worker_b.get("ann").token == "a2"
+    worker_a.delete("ann")
+    assert worker_b.get("ann") is None
+
+
+def test_legacy_token_is_imported_once(db_path, tmp_path, monkeypatch):
+    legacy = tmp_path / "token.pkl"
+    legacy.write_bytes(pickle.dumps(_creds("legacy")))
+    monkeypatch.setattr(credential_store, "LEGACY_TOKEN_FILE", str(legacy))
+
+    store = SQLiteCredentialStore(db_path)
+    _migrate_legacy_token(store)
+    assert store.get(DEFAULT_USER).token == "legacy"
+
+    # Later logins win over the old file
+    store.put(DEFAULT_USER, _creds("newer"))
+    _migrate_legacy_token(store)
+    assert store.get(DEFAULT_USER).token == "newer"
+
+
+def test_refresh_lock_lets_one_worker_through_at_a_time(db_path):
+    worker_a, worker_b = SQLiteCredentialStore(db_path), SQLiteCredentialStore(db_path)
+    inside, order = threading.Event(), []
+
+    def hold():
+        with worker_a.refresh_lock("ann"):
+            inside.set()
+            time.sleep(0.1)
+            order.append("a")
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    inside.wait()
+    with worker_b.refresh_lock("ann"):
+        order.append("b")
+    thread.join()
+    assert order == ["a", "b"]
+
+
+def test_expiring_token_is_refreshed_by_one_worker(db_path, monkeypatch):
+    refreshes = []
+
+    def refresh(self, request):
+        time.sleep(0.05)
+        refreshes.append(self.token)
+        self.token = "fresh"
+        self.expiry = _utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+    workers = [SQLiteCredentialStore(db_path) for _ in range(4)]
+    workers[0].put("ann", _creds("stale", expires_in=60))
+    for worker in workers:
+        worker.get("ann")  # every worker has the stale token cached
+
+    threads = [threading.Thread(target=worker.get_fresh, args=("ann",)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert refreshes == ["stale"]
+    assert all(worker.get("ann").token == "fresh" for worker in workers)
@@ -0,0 +1,91 @@
+# tests/test_fast_parser.py
+
+from datetime import date, datetime
+
+import pytest
+
+from fast_parser import fast_parse, fast_parse_changes
+
+NOW = datetime(2025, 7, 2, 9, 0)  # a Wednesday
+
+
+def _start(text):
+    result, confidence = fast_parse(text, now=NOW)
+    return (result["start_time"] if result else None), confidence
+
+
+@pytest.mark.parametrize("text, start", [
+    ("Book a meeting tomorrow at 5 pm with a@b.com", "2025-07-03T17:00:00"),
+    ("Book a meeting tomorrow at 17:00 with a@b.com", "2025-07-03T17:00:00"),
+    ("Book a meeting tomorrow at 09:00 with a@b.com", "2025-07-03T09:00:00"),
+    ("Book a meeting tomorrow at 10:30 am with a@b.com", "2025-07-03T10:30:00"),
+    ("Book Monday at noon with lee@example.com", "2025-07-07T12:00:00"),
+    ("Meeting on July 15 at 2pm with team@example.com", "2025-07-15T14:00:00"),
+    ("Book a meeting this Friday at 6 PM", "2025-07-04T18:00:00"),
+    ("Book a meeting next Wednesday at 6 PM", "2025-07-09T18:00:00"),  # said on a Wednesday
+])
+def test_plain_requests_are_confident(text, start):
+    assert _start(text) == (start, 1.0)
+
+
+@pytest.mark.parametrize("text", [
+    "Book a meeting tomorrow at 5:00 with a@b.com",
+    "Book a meeting tomorrow at 3:30 with a@b.com",
+    "Book a meeting tomorrow at 12:15 with a@b.com",
+    "Book a meeting tomorrow at 5 with a@b.com",
+])
+def test_clock_times_without_meridiem_go_to_the_llm(text):
+    assert fast_parse(text, now=NOW) == (None, 0.0)
+
+
+@pytest.mark.parametrize("text", [
+    "Book a meeting next Friday at 6 PM",  # two days away: this week or the next?
+    "Book a meeting Wednesday at 6 PM",  # said on a Wednesday: today or in a week?
+])
+def test_ambiguous_weekdays_are_not_confident(text):
+    result, confidence = fast_parse(text, now=NOW)
+    assert result is not None and confidence < 0.9
+
+
+@pytest.mark.parametrize("text", [
+    "Book a meeting",
+    "Can we meet tomorrow afternoon at 3 with priya@example.com?",
+    "Find a time between 2pm and 4pm tomorrow",
+    "Book a meeting tomorrow at 3pm or 4pm",
+    "Book a meeting tomorrow at 3pm EST",  # another time zone
+    "Book a meeting Friday the 13th at 3pm",  # a day of the month no pattern read
+])
+def test_unclear_requests_are_rejected(text):
+    assert fast_parse(text, now=NOW) == (None, 0.0)
+
+
+def test_invitees_are_extracted():
+    result, _ = fast_parse("Schedule a call tomorrow at 10:30 am with ana@example.com and raj@example.org", now=NOW)
+    assert result["invitees"] == ["ana@example.com", "raj@example.org"]
+    assert result["end_time"] == "2025-07-03T11:00:00"
+
+
+@pytest.mark.parametrize("text, changes", [
+    ("make it 4pm instead", {"time": (16, 0)}),
+    ("actually 15:30", {"time": (15, 30)}),
+    ("move it to Friday", {"date": date(2025, 7, 4)}),
+    ("also invite c@d.com", {"add_invitees": ["c@d.com"]}),
+])
+def test_plain_edits_are_confident(text, changes):
+    assert fast_parse_changes(text, now=NOW) == (changes, 1.0)
+
+
+@pytest.mark.parametrize("text", [
+    "actually 3:30",
+    "make it 5:00 instead",
+    "make it 4 instead",
+    "make it 4pm PST",
+    "can we do it later?",
+])
+def test_unclear_edits_go_to_the_llm(text):
+    assert fast_parse_changes(text, now=NOW) == (None, 0.0)
+
+
+def test_ambiguous_weekday_edit_is_not_confident():
+    changes, confidence = fast_parse_changes("move it to next Friday", now=NOW)
+    assert changes is not None and confidence < 0.9
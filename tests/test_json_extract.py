@@ -0,0 +1,58 @@
+# tests/test_json_extract.py
+
+import pytest
+
+from json_extract import IncrementalJSONExtractor, extract_first_object, validate_booking
+
+BOOKING = '{"start_time": "2025-07-03T15:00:00", "end_time": "2025-07-03T15:30:00", "invitees": ["a@b.com"]}'
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(BOOKING)])
+def test_object_is_returned_when_its_closing_brace_arrives(size):
+    text = "Sure! ```json\n" + BOOKING + "\n``` Anything else?"
+    extractor = IncrementalJSONExtractor()
+    results = [extractor.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    found = [result for result in results if result is not None]
+    assert found == [extract_first_object(BOOKING)] and extractor.done
+    # Nothing after the object is read
+    assert results.index(found[0]) == (text.index(BOOKING) + len(BOOKING) - 1) // size
+
+
+def test_partial_stream_returns_nothing_yet():
+    extractor = IncrementalJSONExtractor()
+    assert extractor.feed(BOOKING[:-1]) is None and not extractor.done
+    assert extractor.feed("}")["invitees"] == ["a@b.com"]
+    assert extractor.feed('{"start_time": "later"}') is None
+
+
+def test_braces_and_quotes_inside_strings_do_not_end_the_object():
+    text = '{"description": "Sync {weekly} \\"planning\\" }", "nested": {"a": 1}} trailing }'
+    assert extract_first_object(text) == {"description": 'Sync {weekly} "planning" }', "nested": {"a": 1}}
+
+
+def test_no_complete_object_gives_none():
+    assert extract_first_object("I could not understand that.") is None
+    assert extract_first_object('{"start_time": "2025-07-03T15:00:00"') is None
+
+
+def test_valid_booking_keeps_only_well_formed_invitees():
+    booking = validate_booking({
+        "start_time": "2025-07-03T15:00:00", "end_time": "2025-07-03T15:30:00",
+        "invitees": [" a@b.com ", "not an email", 42], "description": "dropped",
+    })
+    assert booking == {"start_time": "2025-07-03T15:00:00", "end_time": "2025-07-03T15:30:00", "invitees": ["a@b.com"]}
+    assert validate_booking({"start_time": "2025-07-03T15:00:00", "end_time": "2025-07-03T16:00:00"})["invitees"] == []
+
+
+@pytest.mark.parametrize("obj, message", [
+    (["not", "an", "object"], "Expected a JSON object"),
+    ({"error": "Please give a date"}, "Please give a date"),
+    ({"start_time": "2025-07-03T15:00:00"}, "Missing or invalid end_time"),
+    ({"start_time": "tomorrow", "end_time": "2025-07-03T15:30:00"}, "not an ISO datetime"),
+    ({"start_time": "2025-07-03T15:00:00+05:30", "end_time": "2025-07-03T15:30:00"}, "UTC offset"),
+    ({"start_time": "2025-07-03T15:00:00", "end_time": "2025-07-03T15:00:00"}, "after start_time"),
+    ({"start_time": "2025-07-03T15:00:00", "end_time": "2025-07-03T15:30:00", "invitees": "a@b.com"}, "must be a list"),
+])
+def test_invalid_bookings_are_rejected(obj, message):
+    with pytest.raises(ValueError, match=message):
+        validate_booking(obj)
@@ -0,0 +1,94 @@
+# tests/test_llm_routing.py
+
+import asyncio
+
+import pytest
+
+import gemini_chain
+from agent_logic import _extract_json
+from llm_routing import CircuitBreaker, HedgeBudget
+from rate_limit import is_unavailable
+
+
+class StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeChain:
+    """Streams `output` in small chunks, or raises `error`."""
+
+    def __init__(self, output='{"start_time": "2025-07-03T15:00:00"}', error=None):
+        self.output = output
+        self.error = error
+
+    def stream(self, inputs):
+        if self.error is not None:
+            raise self.error
+        for i in range(0, len(self.output), 4):
+            yield self.output[i:i + 4]
+
+    async def ainvoke(self, inputs):
+        if self.error is not None:
+            raise self.error
+        return self.output
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("test", failures=2, reset_after=60)
+    monkeypatch.setattr(gemini_chain, "gemini_breaker", breaker)
+    monkeypatch.setattr(gemini_chain, "hedge_budget", HedgeBudget(ratio=0))
+    monkeypatch.setattr(gemini_chain, "get_fallback_chain", lambda: None)
+    return breaker
+
+
+def _wrapped(cause):
+    try:
+        raise cause
+    except Exception as e:
+        try:
+            raise RuntimeError("LLM call failed") from e
+        except RuntimeError as wrapper:
+            return wrapper
+
+
+@pytest.mark.parametrize("error, unavailable", [
+    (ConnectionError("reset by peer"), True),
+    (TimeoutError(), True),
+    (StatusError(503), True),
+    (_wrapped(ConnectionError("refused")), True),
+    (StatusError(429), False),
+    (ValueError("Expecting ',' delimiter"), False),
+    (KeyError("start_time"), False),
+])
+def test_only_transport_errors_timeouts_and_5xx_are_unavailable(error, unavailable):
+    assert is_unavailable(error) is unavailable
+
+
+def test_malformed_output_is_a_parse_error_not_a_failure(monkeypatch, breaker):
+    monkeypatch.setattr(gemini_chain, "get_chain", lambda: FakeChain('{"start_time": oops} and more'))
+    for _ in range(3):
+        output = gemini_chain.run_gemini_chain("Book a meeting tomorrow at 3pm")
+        assert "Invalid response from model" in _extract_json(output)["result"]["error"]
+    assert breaker.snapshot()["state"] == "closed" and breaker.failures == 0
+
+
+def test_connection_errors_open_the_circuit(monkeypatch, breaker):
+    monkeypatch.setattr(gemini_chain, "get_chain", lambda: FakeChain(error=ConnectionError("refused")))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            gemini_chain.run_gemini_chain("Book a meeting tomorrow at 3pm")
+    assert breaker.state == "open"
+
+
+def test_batch_parses_are_counted(monkeypatch, breaker):
+    monkeypatch.setattr(gemini_chain, "get_chain", lambda: FakeChain(error=ConnectionError("refused")))
+    outputs = asyncio.run(gemini_chain.arun_gemini_chain_batch(["a", "b"]))
+    assert all(isinstance(output, ConnectionError) for output in outputs)
+    assert breaker.state == "open"
+
+    # While open, a batch is refused without calling the model
+    outputs = asyncio.run(gemini_chain.arun_gemini_chain_batch(["a"]))
+    assert isinstance(outputs[0], gemini_chain.CircuitOpen)
@@ -0,0 +1,70 @@
+# tests/test_parse_cache.py
+
+import pytest
+
+import parse_cache
+from parse_cache import LRUTTLCache, ParseCache, make_key
+
+
+class Clock:
+    """Stands in for the `time` module, so TTLs expire without sleeping."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(parse_cache, "time", clock)
+    return clock
+
+
+def test_key_ignores_case_and_spacing_but_not_the_day():
+    assert make_key("  Book  a Meeting\ttomorrow ", "2025-07-02") == make_key("book a meeting tomorrow", "2025-07-02")
+    assert make_key("book a meeting tomorrow", "2025-07-02") != make_key("book a meeting tomorrow", "2025-07-03")
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = LRUTTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = LRUTTLCache(ttl_seconds=60)
+    cache.set("a", 1)
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None and len(cache) == 0
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_sqlite_tier_is_shared_between_workers(clock, tmp_path):
+    db_path = str(tmp_path / "parse_cache.db")
+    worker_a, worker_b = ParseCache(db_path=db_path, ttl_seconds=60), ParseCache(db_path=db_path, ttl_seconds=60)
+    worker_a.set("key", {"start_time": "2025-07-03T15:00:00"})
+
+    assert worker_b.get("key") == {"start_time": "2025-07-03T15:00:00"}
+    assert worker_b.stats()["disk_hits"] == 1 and worker_b.stats()["hits"] == 1
+    # Now in worker_b's memory tier
+    assert worker_b.get("key") is not None and worker_b.stats()["disk_hits"] == 1
+
+
+def test_sqlite_rows_expire_too(clock, tmp_path):
+    db_path = str(tmp_path / "parse_cache.db")
+    ParseCache(db_path=db_path, ttl_seconds=60).set("key", {"start_time": "2025-07-03T15:00:00"})
+    clock.now += 61
+    worker = ParseCache(db_path=db_path, ttl_seconds=60)
+    assert worker.get("key") is None and worker.stats()["misses"] == 1
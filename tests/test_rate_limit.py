@@ -0,0 +1,155 @@
+# tests/test_rate_limit.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limit
+from rate_limit import AdaptiveLimiter, RateLimited, is_unavailable, throttle_delay
+
+
+class ApiError(Exception):
+    """An SDK error carrying an HTTP response (google-genai / requests style)."""
+
+    def __init__(self, status, headers=None, message=""):
+        super().__init__(message or f"HTTP {status}")
+        self.response = SimpleNamespace(status_code=status, headers=headers or {})
+
+
+class HttpResponse(dict):
+    """httplib2 response: headers in the dict, plus `status`."""
+
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class HttpError(Exception):
+    def __init__(self, status, headers=None, message=""):
+        super().__init__(message or f"HTTP {status}")
+        self.resp = HttpResponse(status, headers)
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+def _wrapped(cause):
+    try:
+        raise cause
+    except Exception:
+        try:
+            raise RuntimeError("LLM call failed")
+        except RuntimeError as wrapper:
+            return wrapper
+
+
+@pytest.mark.parametrize("error, delay", [
+    (HttpError(429, {"retry-after": "7"}), 7.0),
+    (ApiError(429, {"Retry-After": "2.5"}), 2.5),
+    (ApiError(429, {"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}), 0.0),  # dates are not read
+    (ApiError(400, message="429 RESOURCE_EXHAUSTED. Please retry in 3.2s."), 3.2),
+    (ApiError(429, message="{'retryDelay': '12s'}"), 12.0),
+    (HttpError(403, message="userRateLimitExceeded"), 0.0),
+    (_wrapped(ApiError(429, {"Retry-After": "1"})), 1.0),
+    (HttpError(403, message="forbidden"), None),
+    (ApiError(500), None),
+    (ValueError("Expecting ',' delimiter"), None),
+])
+def test_retry_after_is_read_from_headers_or_the_message(error, delay):
+    assert throttle_delay(error) == delay
+
+
+@pytest.mark.parametrize("error, unavailable", [
+    (ServiceUnavailable("backend down"), True),  # matched by class name
+    (HttpError(502), True),
+    (_wrapped(ApiError(504)), True),
+    (HttpError(429), False),
+    (HttpError(404), False),
+])
+def test_unavailable_means_down_not_refused(error, unavailable):
+    assert is_unavailable(error) is unavailable
+
+
+def _limiter(name, **kwargs):
+    kwargs.setdefault("backoff", 0.001)
+    return AdaptiveLimiter(f"test-{name}", max_concurrency=8, **kwargs)
+
+
+def _throttled(retry_after="0"):
+    def fn():
+        raise ApiError(429, {"Retry-After": retry_after})
+    return fn
+
+
+def test_429_halves_the_limit_once_per_cooldown(monkeypatch):
+    limiter = _limiter("halve", max_retries=0)
+    with pytest.raises(RateLimited):
+        limiter.call(_throttled())
+    assert limiter.limit == 4
+    # Another 429 from a call already in flight is the same signal
+    with pytest.raises(RateLimited):
+        limiter.call(_throttled())
+    assert limiter.limit == 4
+
+    monkeypatch.setattr(rate_limit, "DECREASE_COOLDOWN", 0)
+    for _ in range(5):
+        with pytest.raises(RateLimited):
+            limiter.call(_throttled())
+    assert limiter.limit == limiter.min_concurrency == 1
+
+
+def test_successes_grow_the_limit_back_additively():
+    limiter = _limiter("grow")
+    limiter.limit = 2.0
+    for _ in range(2):
+        limiter.call(lambda: None)
+    assert limiter.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)  # about one per round of `limit` calls
+    for _ in range(100):
+        limiter.call(lambda: None)
+    assert limiter.limit == limiter.max_concurrency
+
+
+def test_slow_calls_shrink_the_limit():
+    limiter = _limiter("slow", latency_target=1e-9)
+    limiter.call(lambda: sum(range(1000)))
+    assert limiter.limit == pytest.approx(8 * 0.9) and limiter.stats["slow"] == 1
+
+
+def test_throttled_call_is_retried_then_succeeds():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ApiError(429)
+        return "ok"
+
+    limiter = _limiter("retry")
+    assert limiter.call(flaky) == "ok"
+    assert limiter.stats["retries"] == 2 and limiter.stats["throttled"] == 2 and limiter.snapshot()["in_flight"] == 0
+
+
+def test_long_retry_after_is_raised_not_waited_and_pauses_new_calls():
+    limiter = _limiter("long-wait", max_wait=10)
+    with pytest.raises(RateLimited) as raised:
+        limiter.call(_throttled("120"))
+    assert raised.value.retry_after == 120 and limiter.stats["rejected"] == 1
+    assert 9 < limiter.snapshot()["paused_s"] <= 10  # capped at max_wait
+
+
+def test_async_calls_share_the_same_limits():
+    limiter = _limiter("async", max_retries=1)
+
+    async def throttled():
+        raise ApiError(429, {"Retry-After": "0"})
+
+    with pytest.raises(RateLimited):
+        asyncio.run(limiter.acall(throttled))
+    assert limiter.stats["retries"] == 1 and limiter.limit == 4
+
+    async def answer():
+        return "ok"
+
+    assert asyncio.run(limiter.acall(answer)) == "ok"
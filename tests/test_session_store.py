@@ -0,0 +1,77 @@
+# tests/test_session_store.py
+
+import pytest
+
+import session_store
+from session_store import SessionStore
+
+
+class Clock:
+    """Stands in for the `time` module; every reading is a second later, so orderings never tie."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return SessionStore(str(tmp_path / "sessions.db"))
+
+
+def test_history_loads_a_page_at_a_time(store):
+    session_id = store.create_session("ann", "Booking by ann")
+    for i in range(7):
+        store.append_message(session_id, {"role": "user", "content": f"message {i}", "kind": "text"})
+
+    latest = store.load_messages(session_id, limit=3)
+    assert [message["seq"] for message in latest] == [4, 5, 6]
+    assert latest[0] == {"role": "user", "content": "message 4", "seq": 4, "kind": "text"}
+    older = store.load_messages(session_id, limit=3, before=latest[0]["seq"])
+    assert [message["seq"] for message in older] == [1, 2, 3]
+    assert [message["seq"] for message in store.load_messages(session_id, limit=3, before=1)] == [0]
+
+    session = store.get_session(session_id)
+    assert session["message_count"] == 7 and session["preview"] == "message 0"
+
+
+def test_sessions_are_listed_newest_first_per_user(store):
+    first = store.create_session("ann", "first")
+    second = store.create_session("ann", "second")
+    store.create_session("bob", "other user")
+    store.append_message(first, {"role": "user", "content": "hello again"})
+
+    assert [session["id"] for session in store.list_sessions("ann")] == [first, second]
+    assert [session["id"] for session in store.list_sessions("ann", limit=1, offset=1)] == [second]
+
+
+def test_only_the_newest_sessions_per_user_are_kept(store):
+    ids = [store.create_session("ann", f"session {i}") for i in range(4)]
+    store.append_message(ids[0], {"role": "user", "content": "still here"})
+    store.create_session("bob", "bob's only session")
+
+    assert store.evict("ann", max_sessions=2) == 2
+    assert [session["id"] for session in store.list_sessions("ann")] == [ids[0], ids[3]]
+    assert store.load_messages(ids[1]) == [] and store.get_session(ids[1]) is None
+    assert len(store.list_sessions("bob")) == 1
+
+
+def test_idle_sessions_are_evicted(store, clock):
+    old = store.create_session("ann", "old")
+    store.append_message(old, {"role": "user", "content": "hello"})
+    clock.now += 10 * 86400
+    recent = store.create_session("bob", "recent")
+
+    assert store.evict(max_age_days=5) == 1
+    assert store.get_session(old) is None and store.load_messages(old) == []
+    assert store.get_session(recent) is not None
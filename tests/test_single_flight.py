@@ -0,0 +1,106 @@
+# tests/test_single_flight.py
+
+import asyncio
+
+import pytest
+
+import booking_pipeline
+from single_flight import SingleFlight, IdempotencyConflict
+
+
+def _counting(result="booked", delay=0.05):
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"result": result}
+
+    return work, calls
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    work, calls = _counting()
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("k", work, fingerprint="f", remember=False) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [{"result": "booked"}] * 5
+    assert len(calls) == 1
+    assert flight.stats == {"executed": 1, "coalesced": 4, "replayed": 0}
+
+
+def test_remembered_result_is_replayed():
+    flight = SingleFlight("test")
+    work, calls = _counting()
+
+    async def scenario():
+        first = await flight.run("k", work, fingerprint="f")
+        first["result"] = "mutated by the caller"
+        return await flight.run("k", work, fingerprint="f")
+
+    assert asyncio.run(scenario()) == {"result": "booked"}
+    assert len(calls) == 1
+    assert flight.stats["replayed"] == 1
+
+
+def test_key_reused_for_different_request_conflicts():
+    flight = SingleFlight("test")
+    work, _ = _counting()
+
+    async def scenario():
+        await flight.run("k", work, fingerprint="f")
+        await flight.run("k", work, fingerprint="other")
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(scenario())
+
+
+def test_failures_are_not_remembered():
+    flight = SingleFlight("test")
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("calendar down")
+        return "booked"
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await flight.run("k", flaky, fingerprint="f")
+        return await flight.run("k", flaky, fingerprint="f")
+
+    assert asyncio.run(scenario()) == "booked"
+    assert len(attempts) == 2
+
+
+def test_idempotent_retry_after_midnight_replays(monkeypatch):
+    work, calls = _counting()
+    monkeypatch.setattr(booking_pipeline, "_booking_flights", SingleFlight("test"))
+    monkeypatch.setattr(booking_pipeline, "abook_from_text", lambda *args: work())
+
+    async def scenario():
+        monkeypatch.setattr(booking_pipeline, "today_str", lambda: "Monday, 2025-07-07")
+        first = await booking_pipeline.abook_from_text_once("Book tomorrow at 5pm", "u", "key-1")
+        monkeypatch.setattr(booking_pipeline, "today_str", lambda: "Tuesday, 2025-07-08")
+        retry = await booking_pipeline.abook_from_text_once("Book tomorrow at 5pm", "u", "key-1")
+        return first, retry
+
+    first, retry = asyncio.run(scenario())
+    assert first == retry
+    assert len(calls) == 1
+
+
+def test_idempotency_key_with_different_text_conflicts(monkeypatch):
+    work, _ = _counting()
+    monkeypatch.setattr(booking_pipeline, "_booking_flights", SingleFlight("test"))
+    monkeypatch.setattr(booking_pipeline, "abook_from_text", lambda *args: work())
+
+    async def scenario():
+        await booking_pipeline.abook_from_text_once("Book tomorrow at 5pm", "u", "key-1")
+        await booking_pipeline.abook_from_text_once("Book tomorrow at 6pm", "u", "key-1")
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(scenario())
@@ -0,0 +1,75 @@
+# tests/test_slot_finder.py
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from slot_finder import find_common_slots
+
+IST = ZoneInfo("Asia/Kolkata")
+MONDAY = datetime(2025, 7, 7, tzinfo=IST)
+
+
+def _at(hour, minute=0, day=MONDAY):
+    return day.replace(hour=hour, minute=minute)
+
+
+def _starts(slots):
+    return [start.strftime("%a %H:%M") for start, _ in slots]
+
+
+def _find(busy, duration=30, top_k=3, **kwargs):
+    kwargs.setdefault("tz", "Asia/Kolkata")
+    return find_common_slots(busy, MONDAY, MONDAY + timedelta(days=1), duration_minutes=duration, top_k=top_k,
+                             **kwargs)
+
+
+def test_slots_stay_inside_working_hours_in_the_given_zone():
+    assert _starts(_find({})) == ["Mon 09:00", "Mon 09:30", "Mon 10:00"]
+    # The same instant seen from New York: working hours there start at 09:00 New York time
+    new_york = find_common_slots({}, MONDAY.astimezone(timezone.utc), MONDAY + timedelta(days=1),
+                                 tz="America/New_York", top_k=1)
+    assert _starts(new_york) == ["Mon 09:00"] and new_york[0][0].tzinfo == ZoneInfo("America/New_York")
+
+    # Busy until late afternoon: the last slot ends exactly at 18:00
+    busy = {"ann": [(_at(9), _at(17, 30))]}
+    assert [(start.strftime("%H:%M"), end.strftime("%H:%M")) for start, end in _find(busy)] == [("17:30", "18:00")]
+    assert _find(busy, duration=60) == []
+
+
+def test_weekends_are_skipped():
+    saturday = MONDAY - timedelta(days=2)
+    assert find_common_slots({}, saturday, MONDAY, tz="Asia/Kolkata") == []
+
+
+def test_gap_exactly_as_long_as_the_meeting_fits():
+    busy = {"ann": [(_at(9), _at(10)), (_at(10, 30), _at(18))]}
+    assert _starts(_find(busy)) == ["Mon 10:00"]
+    assert _find(busy, duration=31) == []
+    assert _starts(_find(busy, duration=15, step_minutes=15)) == ["Mon 10:00", "Mon 10:15"]
+
+
+def test_partly_busy_minute_counts_as_busy():
+    busy = {"ann": [(_at(9), _at(10) + timedelta(seconds=30)), (_at(11), _at(18))]}
+    assert _starts(_find(busy)) == ["Mon 10:30"]
+
+
+def test_window_shorter_than_the_meeting_has_no_slots():
+    assert find_common_slots({}, _at(9), _at(9, 20), tz="Asia/Kolkata") == []
+
+
+def test_overlapping_busy_spans_across_calendars():
+    busy = {
+        "ann": [(_at(9), _at(10)), (_at(10, 45), _at(11, 15))],
+        "bob": [(_at(9, 30), _at(11)), (_at(9, 45), _at(10, 15))],
+    }
+    assert _starts(_find(busy, top_k=1)) == ["Mon 11:30"]
+
+
+def test_top_k_slots_do_not_overlap():
+    assert len(_find({}, top_k=5)) == 5
+    assert _starts(_find({}, duration=60, top_k=3)) == ["Mon 09:00", "Mon 10:00", "Mon 11:00"]
+
+
+def test_preferred_start_picks_the_nearest_slots():
+    assert _starts(_find({}, top_k=2, preferred_start=_at(14, 10))) == ["Mon 14:00", "Mon 14:30"]
+    assert _starts(_find({}, duration=60, top_k=2, preferred_start=_at(14, 10))) == ["Mon 14:00", "Mon 15:00"]
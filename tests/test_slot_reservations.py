@@ -0,0 +1,92 @@
+# tests/test_slot_reservations.py
+
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import calendar_utils
+import slot_reservations
+from slot_reservations import ReservationManager, reserve_slot
+
+START = datetime(2025, 7, 3, 15, 0)
+
+
+def _span(minutes_from, minutes):
+    start = START + timedelta(minutes=minutes_from)
+    return start, start + timedelta(minutes=minutes)
+
+
+def test_overlapping_reservation_is_refused():
+    manager = ReservationManager()
+    assert manager.reserve("ann", *_span(0, 60)) is not None
+    # Overlaps the hour in its last bucket only
+    assert manager.reserve("ann", *_span(45, 30)) is None
+    assert manager.stats["conflicts"] == 1
+
+
+def test_adjacent_slots_and_other_calendars_do_not_conflict():
+    manager = ReservationManager()
+    assert manager.reserve("ann", *_span(0, 30)) is not None
+    assert manager.reserve("ann", *_span(30, 30)) is not None
+    assert manager.reserve("bob", *_span(0, 30)) is not None
+
+
+def test_naive_and_aware_requests_for_one_slot_conflict(monkeypatch):
+    monkeypatch.setattr(calendar_utils, "CALENDAR_TIMEZONE", "Asia/Kolkata")
+    manager = ReservationManager()
+    assert manager.reserve("ann", *_span(120, 30)) is not None  # naive 17:00, as the parser returns it
+    aware = START.replace(hour=17, tzinfo=ZoneInfo("Asia/Kolkata"))  # as /book/slot receives it
+    assert manager.reserve("ann", aware, aware + timedelta(minutes=30)) is None
+
+
+def test_concurrent_overlapping_reservations_have_one_winner():
+    manager = ReservationManager(stripes=4)
+    results = []
+    barrier = threading.Barrier(16)
+
+    def reserve(offset):
+        barrier.wait()
+        results.append(manager.reserve("ann", *_span(offset, 30)))
+
+    threads = [threading.Thread(target=reserve, args=(i % 4 * 5,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(result is not None for result in results) == 1
+
+
+def test_released_reservation_frees_the_slot():
+    manager = ReservationManager()
+    manager.reserve("ann", *_span(0, 30)).release()
+    assert manager.reserve("ann", *_span(0, 30)) is not None
+
+
+def test_unconfirmed_reservation_lapses_after_ttl():
+    manager = ReservationManager(ttl=0.05)
+    assert manager.reserve("ann", *_span(0, 30)) is not None
+    assert manager.reserve("ann", *_span(0, 30)) is None
+    time.sleep(0.1)
+    assert manager.active() == 0
+    assert manager.reserve("ann", *_span(0, 30)) is not None
+
+
+def test_confirmed_reservation_is_held_then_lapses():
+    manager = ReservationManager(ttl=60, confirm_hold=0.05)
+    manager.reserve("ann", *_span(0, 30)).confirm()
+    assert manager.reserve("ann", *_span(0, 30)) is None
+    time.sleep(0.1)
+    assert manager.reserve("ann", *_span(0, 30)) is not None
+
+
+def test_reserve_slot_releases_unless_confirmed(monkeypatch):
+    manager = ReservationManager(confirm_hold=60)
+    monkeypatch.setattr(slot_reservations, "_manager", manager)
+
+    with reserve_slot("ann", *_span(0, 30)) as reservation:
+        assert reservation is not None
+    with reserve_slot("ann", *_span(0, 30)) as reservation:
+        reservation.confirm()
+    with reserve_slot("ann", *_span(0, 30)) as reservation:
+        assert reservation is None